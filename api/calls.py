@@ -1,36 +1,37 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from utils.database import database
-from db.models import calls, patients
-from db.queries import get_patient_by_phone_query, get_recent_call_query
+from db.models import calls
+from db.queries import get_recent_call_query
 from core.logic import is_within_five_minutes
+from services.patient_resolver import patient_resolver
+from services.call_stats import default_stats_range, get_call_stats
 from datetime import datetime
+from typing import Optional
 
 call_router = APIRouter()
 
 @call_router.post("/start_call")
 async def start_call(phone_number: str):
     """Start a call session for a patient."""
-    query = get_patient_by_phone_query(phone_number)
-    patient = await database.fetch_one(query)
+    patient_id = await patient_resolver.resolve(phone_number)
 
-    if not patient:
+    if patient_id is None:
         raise HTTPException(status_code=404, detail="Patient not found")
 
     call_start = datetime.now()
-    call_query = calls.insert().values(patient_id=patient["id"], call_start=call_start)
+    call_query = calls.insert().values(patient_id=patient_id, call_start=call_start)
     call_id = await database.execute(call_query)
     return {"message": "Call started", "call_id": call_id}
 
 @call_router.get("/recent_call")
 async def recent_call(phone_number: str):
     """Check if the patient has a call within the last 5 minutes."""
-    patient_query = get_patient_by_phone_query(phone_number)
-    patient = await database.fetch_one(patient_query)
+    patient_id = await patient_resolver.resolve(phone_number)
 
-    if not patient:
+    if patient_id is None:
         raise HTTPException(status_code=404, detail="Patient not found")
 
-    recent_call_query = get_recent_call_query(patient["id"])
+    recent_call_query = get_recent_call_query(patient_id)
     last_call = await database.fetch_one(recent_call_query)
 
     if not last_call:
@@ -40,3 +41,19 @@ async def recent_call(phone_number: str):
         return {"message": "Recent call found", "call_id": last_call["id"]}
 
     return {"message": "No recent calls within 5 minutes"}
+
+@call_router.get("/stats")
+async def call_stats(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+):
+    """
+    Finalized calls per hour or day and duration percentiles over [start, end), from the
+    call rollups. Defaults to today (hourly) or the last 30 days (daily).
+    """
+    default_start, default_end = default_stats_range(granularity=granularity)
+    start, end = start or default_start, end or default_end
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    return await get_call_stats(start, end, granularity)
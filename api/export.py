@@ -0,0 +1,42 @@
+import os
+import secrets
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from services.export import EXPORT_FORMATS, export_pages
+from datetime import datetime
+
+# Bearer token required by GET /export/calls, which returns patient data; unset, the
+# export endpoint is not mounted (the CLI, python -m services.export, still works)
+EXPORT_API_KEY = os.getenv("EXPORT_API_KEY", "")
+
+
+async def require_export_key(request: Request):
+    """
+    Reject requests without `Authorization: Bearer <EXPORT_API_KEY>`.
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if not EXPORT_API_KEY or scheme.lower() != "bearer" or not secrets.compare_digest(token, EXPORT_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid or missing export API key",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+export_router = APIRouter(dependencies=[Depends(require_export_key)])
+
+@export_router.get("/calls")
+async def export_calls(start: datetime, end: datetime, format: str = Query("csv", pattern="^(csv|ndjson)$")):
+    """
+    Stream the calls started in [start, end) with their patient and final consultation
+    summary as CSV or NDJSON.
+
+    Rows are read and sent a page at a time, so memory use does not grow with the range.
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+    media_type, encode = EXPORT_FORMATS[format]
+    filename = f"calls_{start:%Y%m%d}_{end:%Y%m%d}.{format}"
+    return StreamingResponse(
+        encode(export_pages(start, end)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from services.media_stream import MediaStreamSession
+from loguru import logger
+import json
+
+media_stream_router = APIRouter()
+
+def get_media_session() -> MediaStreamSession:
+    """
+    Create the session for a new stream; overridden to plug in local fakes when testing.
+    """
+    return MediaStreamSession()
+
+@media_stream_router.websocket("/audio")
+async def media_stream(websocket: WebSocket, session: MediaStreamSession = Depends(get_media_session)):
+    """
+    Receive a Twilio Media Stream and relay the caller's audio to real-time ASR.
+    """
+    await websocket.accept()
+
+    try:
+        while not session.stopped:
+            message = await websocket.receive_text()
+            await session.handle_event(json.loads(message))
+    except WebSocketDisconnect:
+        logger.info(f"Twilio closed media stream {session.stream_sid}.")
+    except Exception as e:
+        logger.error(f"Error in media stream {session.stream_sid}: {e}")
+    finally:
+        await session.close()
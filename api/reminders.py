@@ -1,8 +1,7 @@
 from fastapi import APIRouter
-from services.twilio_handler import send_reminder_message
-from utils.database import database
-from db.models import appointments, patients
-from db.queries import get_appointments_within_hour_query
+from fastapi.responses import JSONResponse
+from core.dispatch import send_due_reminders
+from core.scheduler import REMINDER_LEAD, reminder_lease
 from datetime import datetime
 
 reminder_router = APIRouter()
@@ -11,17 +10,11 @@ reminder_router = APIRouter()
 async def send_reminders():
     """
     Send reminders for upcoming appointments within the next hour.
-    """
-    appointment_query = get_appointments_within_hour_query()
-    upcoming_appointments = await database.fetch_all(appointment_query)
-
-    for appointment in upcoming_appointments:
-        patient_query = patients.select().where(patients.c.id == appointment["patient_id"])
-        patient = await database.fetch_one(patient_query)
 
-        send_reminder_message(patient["phone_number"], appointment["appointment_time"])
-
-        update_query = appointments.update().where(appointments.c.id == appointment["id"]).values(reminder_sent=True)
-        await database.execute(update_query)
+    Runs only in the worker holding the reminder lease, taking it if it is free.
+    """
+    if not await reminder_lease.acquire():
+        return JSONResponse(status_code=409, content={"message": "Reminders are handled by another worker"})
 
-    return {"message": "Reminders sent successfully"}
+    report = await send_due_reminders(datetime.now() + REMINDER_LEAD)
+    return {"message": "Reminders sent successfully", **report.as_dict()}
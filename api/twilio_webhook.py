@@ -1,27 +1,23 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, BackgroundTasks, Request
 from fastapi.responses import Response
 from services.assembly_ai_handler import stream_audio_to_assembly_ai
-from services.eleven_labs_handler import synthesize_speech
-from services.grok_handler import process_response
-from services.assistant_logic import finalize_call, handle_call_response
-from utils.database import database
-from db.models import calls
-from datetime import datetime
+from services.eleven_labs_handler import synthesize_speech_async
+from services.grok_handler import load_conversation, process_response
+from services.assistant_logic import complete_turn, start_call
+from services.speech_pipeline import (
+    STREAMING_TTS_ENABLED, build_listen_twiml, build_play_twiml, next_pending_audio, register_pending_audio,
+    respond_with_speech,
+)
 from loguru import logger
-from twilio.rest import Client
-import os
 
 # Twilio Webhook Router
 twilio_webhook_router = APIRouter()
 
-# Load Twilio credentials
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+# Spoken when a turn fails; also pre-synthesized at startup
+ERROR_APOLOGY = "Sorry, an error occurred while processing your request."
 
 @twilio_webhook_router.post("/calls")
-async def handle_incoming_call(request: Request):
+async def handle_incoming_call(request: Request, background_tasks: BackgroundTasks):
     """
     Webhook to handle incoming calls from Twilio.
     Steps:
@@ -34,56 +30,70 @@ async def handle_incoming_call(request: Request):
     caller_number = form_data.get("From")
     logger.info(f"Incoming call from: {caller_number}, Call SID: {call_sid}")
 
-    # Step 1: Check for recent calls (within 5 minutes)
-    call_start_time = datetime.now()
-    query = calls.select().where(calls.c.call_sid == call_sid)
-    existing_call = await database.fetch_one(query)
-
-    if existing_call:
-        logger.info(f"Resuming existing call: {existing_call['id']}")
-        call_id = existing_call['id']
-    else:
-        # Start a new call
-        call_id = await database.execute(
-            calls.insert().values(
-                call_sid=call_sid,
-                call_start=call_start_time,
-                patient_id=None,  # Replace with lookup logic if patient data exists
-            )
-        )
-        logger.info(f"Started new call session with ID: {call_id}")
+    # Step 1: Resume the call's session, or start one linked to the patient if we recognise the caller's number
+    call_id = await start_call(call_sid, caller_number)
 
     try:
         # Step 2: Start transcription workflow
         logger.info(f"Starting transcription for call: {call_id}")
-        transcription_text = await stream_audio_to_assembly_ai(call_sid, twilio_client)
+        transcription_text = await stream_audio_to_assembly_ai(call_sid)
+
+        # Continue the call's saved state, which may have been written by another worker
+        conversation = await load_conversation(call_sid)
+
+        if STREAMING_TTS_ENABLED:
+            # Steps 3-4: Stream Grok's reply into ElevenLabs and play the first sentence as soon as it is ready
+            audio_url, remaining_audio, grok_reply = await respond_with_speech(transcription_text, conversation)
+            register_pending_audio(call_sid, remaining_audio)
+            twiml_response = build_play_twiml(audio_url, call_sid) if audio_url else await build_listen_twiml(call_sid)
+
+            # Step 5: Save and finalize after the response has been sent to Twilio, once the streamed reply is complete
+            background_tasks.add_task(_complete_call, call_id, call_sid, grok_reply, conversation)
+            return Response(content=twiml_response, media_type="application/xml")
 
         # Step 3: Process transcription with Grok
-        _, grok_response = await process_response(transcription_text)
+        grok_response, conversation = await process_response(transcription_text, conversation)
         logger.info(f"Grok response: {grok_response}")
 
         # Step 4: Generate speech with ElevenLabs
-        audio_url = synthesize_speech(grok_response)
+        audio_url = await synthesize_speech_async(grok_response)
         logger.info(f"Audio generated at: {audio_url}")
 
-        # Twilio XML Response to play the generated audio
-        twiml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-        <Response>
-            <Play>{audio_url}</Play>
-        </Response>"""
+        # Twilio XML Response to play the generated audio, then keep listening
+        twiml_response = build_play_twiml(audio_url, call_sid)
 
         # Step 5: Save call response to database and finalize
-        await handle_call_response(call_id, transcription_text)
-        await finalize_call(call_id)
+        await _complete_call(call_id, call_sid, grok_response, conversation)
 
         return Response(content=twiml_response, media_type="application/xml")
 
     except Exception as e:
         logger.error(f"Error during call handling: {e}")
         return Response(
-            content="""<?xml version="1.0" encoding="UTF-8"?>
+            content=f"""<?xml version="1.0" encoding="UTF-8"?>
             <Response>
-                <Say>Sorry, an error occurred while processing your request.</Say>
+                <Say>{ERROR_APOLOGY}</Say>
             </Response>""",
             media_type="application/xml",
         )
+
+@twilio_webhook_router.post("/calls/{call_sid}/speech")
+async def play_next_speech(call_sid: str):
+    """
+    Serve the next streamed audio chunk for a call; Twilio follows the redirect until none
+    remain, then the call is held open for the caller's next answer.
+    """
+    audio_url = await next_pending_audio(call_sid)
+    if audio_url is None:
+        return Response(content=await build_listen_twiml(call_sid), media_type="application/xml")
+    return Response(content=build_play_twiml(audio_url, call_sid), media_type="application/xml")
+
+async def _complete_call(call_id: int, call_sid: str, grok_reply, conversation):
+    """
+    Complete the turn (see complete_turn) after the TwiML response is sent; failures are
+    logged rather than raised into the server, which would drop the connection.
+    """
+    try:
+        await complete_turn(call_id, call_sid, grok_reply, conversation)
+    except Exception as e:
+        logger.error(f"Failed to complete call {call_id}: {e}")
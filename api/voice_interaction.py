@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Request
+from fastapi.responses import Response
 from twilio.twiml.voice_response import VoiceResponse
+from services.speech_pipeline import STREAM_PAUSE_SECONDS, media_stream_url
 import os
 
 voice_router = APIRouter()
@@ -11,10 +13,11 @@ async def handle_voice_call(request: Request):
     """
     response = VoiceResponse()
 
-    # AssemblyAI streaming endpoint
-    assembly_stream_url = f"{os.getenv('BASE_URL')}/stream/audio"
+    # Media Streams endpoint (must be a websocket URL)
+    stream_url = media_stream_url(os.getenv("BASE_URL", ""))
 
-    # Forward call audio to AssemblyAI
-    response.start_stream(url=assembly_stream_url)
+    # Fork the caller's audio to /stream/audio and keep the call open while it streams
+    response.start().stream(url=stream_url, track="inbound_track")
+    response.pause(length=STREAM_PAUSE_SECONDS)
 
-    return response.to_xml()
+    return Response(content=response.to_xml(), media_type="application/xml")
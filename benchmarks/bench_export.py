@@ -0,0 +1,125 @@
+"""
+Streaming export: seeds calls with patients and final consultation summaries spread over
+--months, then exports growing date ranges and reports rows/s and peak Python memory for each.
+
+    python -m benchmarks.bench_export --calls 50000 --completed 0.8 --months 6
+
+Peak memory (tracemalloc, measured in a second run since tracing slows the export) should
+stay flat as the range grows, since rows are read and encoded a page of EXPORT_PAGE_SIZE
+calls at a time. Uses a temporary SQLite file.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+BATCH = 10000
+
+
+class CountingSink:
+    """
+    Text file stand-in that keeps only the number of characters and lines written.
+    """
+
+    def __init__(self):
+        self.chars = 0
+        self.lines = 0
+
+    def write(self, chunk: str):
+        self.chars += len(chunk)
+        self.lines += chunk.count("\n")
+
+
+def seed(database_url: str, n_calls: int, completed: float, months: int, end: datetime):
+    from sqlalchemy import create_engine
+    from db.migrations import run_migrations
+    from db.models import calls, consultation_summaries, metadata, patients
+    from db.queries import consultation_summary_values
+
+    rng = random.Random(42)
+    span = timedelta(days=30 * months)
+    n_patients = max(1, n_calls // 5)
+    engine = create_engine(database_url.replace("+aiosqlite", ""))
+    with engine.begin() as connection:
+        metadata.create_all(connection)
+        run_migrations(connection)
+        connection.execute(patients.insert(), [
+            {"id": i, "phone_number": f"+4477{i:08d}", "name": f"Patient {i}"} for i in range(1, n_patients + 1)
+        ])
+        for offset in range(0, n_calls, BATCH):
+            call_rows, summary_rows = [], []
+            for call_id in range(offset + 1, min(offset + BATCH, n_calls) + 1):
+                call_start = end - span * rng.random()
+                call_rows.append({
+                    "id": call_id, "patient_id": rng.randint(1, n_patients), "call_sid": f"CA{call_id:032x}",
+                    "call_start": call_start, "call_end": call_start + timedelta(minutes=4),
+                })
+                if rng.random() < completed:
+                    summary_rows.append(consultation_summary_values(call_id, {
+                        "full_name": f"Patient {call_id}", "date_of_birth": "1982-03-14",
+                        "phone_number": f"07700{call_id:06d}", "reason_for_appointment": "Persistent cough",
+                        "experienced_before": "no", "duration_of_symptoms": "three weeks",
+                        "current_medication": "None", "known_allergies": "Penicillin",
+                        "additional_notes": "Worse at night",
+                    }))
+            connection.execute(calls.insert(), call_rows)
+            if summary_rows:
+                connection.execute(consultation_summaries.insert(), summary_rows)
+    engine.dispose()
+
+
+async def run(args, end: datetime):
+    from services.export import EXPORT_PAGE_SIZE, export_to_file
+    from utils.database import database
+
+    await database.connect()
+    print(f"{'range':>8} {'format':>7} {'rows':>10} {'MB out':>8} {'seconds':>8} {'rows/s':>9} {'peak MB':>8}"
+          f"   (page size {EXPORT_PAGE_SIZE})")
+    for months in range(1, args.months + 1):
+        for export_format in ("csv", "ndjson"):
+            sink = CountingSink()
+            start = end - timedelta(days=30 * months)
+            started = time.perf_counter()
+            await export_to_file(start, end, export_format, sink)
+            elapsed = time.perf_counter() - started
+
+            tracemalloc.start()
+            await export_to_file(start, end, export_format, CountingSink())
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            rows = sink.lines - (export_format == "csv")
+            print(f"{months:>6}mo {export_format:>7} {rows:>10} {sink.chars / 1e6:>8.1f} {elapsed:>8.2f} "
+                  f"{rows / elapsed:>9,.0f} {peak / 1e6:>8.1f}")
+    await database.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure streaming export throughput and memory.")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--completed", type=float, default=0.8, help="Share of calls with a final summary")
+    parser.add_argument("--months", type=int, default=4, help="Months of calls seeded and largest range exported")
+    args = parser.parse_args()
+
+    # Settings are read at import time
+    workdir = tempfile.mkdtemp(prefix="nhs-export-")
+    database_url = f"sqlite+aiosqlite:///{os.path.join(workdir, 'export.db')}"
+    os.environ["DATABASE_URL"] = database_url
+
+    from loguru import logger
+    logger.remove()
+
+    end = datetime.now()
+    started = time.perf_counter()
+    seed(database_url, args.calls, args.completed, args.months, end)
+    print(f"Seeded {args.calls} calls, {args.completed:.0%} with a final summary, over {args.months} months "
+          f"in {time.perf_counter() - started:.1f}s")
+    asyncio.run(run(args, end))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# File: benchmarks/bench_indexes.py
+"""
+Seed a large dataset and compare query plans and timings for the hot lookups
+before and after the schema migration in db/migrations.py.
+
+    python -m benchmarks.bench_indexes --patients 50000 --calls 500000 --appointments 200000
+
+Uses a temporary SQLite file by default; pass --url for another database with a
+synchronous driver (e.g. postgresql+psycopg2://...). The "before" run drops the
+indexes declared in db.models, the "after" run applies run_migrations().
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, text
+from db.migrations import run_migrations
+from db.models import metadata, patients, calls, appointments
+from db.queries import get_recent_call_query, get_due_reminders_page_query
+
+BATCH = 10000
+
+
+def seed(connection, n_patients: int, n_calls: int, n_appointments: int):
+    rng = random.Random(42)
+    now = datetime.now()
+
+    connection.execute(patients.insert(), [
+        {"id": i, "phone_number": f"+4477{i:08d}", "name": f"Patient {i}"} for i in range(1, n_patients + 1)
+    ])
+    for offset in range(0, n_calls, BATCH):
+        connection.execute(calls.insert(), [
+            {
+                "patient_id": rng.randint(1, n_patients),
+                "call_sid": f"CA{i:032x}",
+                "call_start": now - timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+            }
+            for i in range(offset, min(offset + BATCH, n_calls))
+        ])
+    for offset in range(0, n_appointments, BATCH):
+        connection.execute(appointments.insert(), [
+            {
+                "patient_id": rng.randint(1, n_patients),
+                "appointment_time": now + timedelta(minutes=rng.randint(-60 * 24 * 30, 60 * 24 * 30)),
+                # Nearly all past appointments have had their reminder sent
+                "reminder_sent": rng.random() < 0.97,
+            }
+            for _ in range(offset, min(offset + BATCH, n_appointments))
+        ])
+
+
+def drop_declared_indexes(connection):
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+
+def hot_queries(n_patients: int, n_calls: int):
+    rng = random.Random(7)
+    time_limit = datetime.now() + timedelta(hours=1)
+    return {
+        "recent call by patient": lambda: get_recent_call_query(rng.randint(1, n_patients)),
+        "call by call_sid": lambda: calls.select().where(calls.c.call_sid == f"CA{rng.randrange(n_calls):032x}"),
+        "pending reminders page": lambda: get_due_reminders_page_query(time_limit, limit=500),
+    }
+
+
+def explain(connection, statement) -> str:
+    compiled = statement.compile(connection, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN" if connection.dialect.name == "sqlite" else "EXPLAIN"
+    rows = connection.execute(text(f"{prefix} {compiled}")).fetchall()
+    return "\n".join(f"      {row[-1]}" for row in rows)
+
+
+def measure(connection, queries: dict, repeat: int) -> dict:
+    timings = {}
+    for name, build in queries.items():
+        samples = []
+        for _ in range(repeat):
+            statement = build()
+            started = time.perf_counter()
+            connection.execute(statement).fetchall()
+            samples.append(time.perf_counter() - started)
+        timings[name] = statistics.median(samples)
+    return timings
+
+
+def report(label: str, connection, queries: dict, timings: dict):
+    print(f"\n== {label}")
+    for name, build in queries.items():
+        print(f"  {name}: median {timings[name] * 1000:.3f}ms")
+        print(explain(connection, build()))
+
+
+def main(args):
+    url = args.url
+    if url is None:
+        path = os.path.join(tempfile.mkdtemp(), "bench_indexes.db")
+        url = f"sqlite:///{path}"
+
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        metadata.drop_all(connection)
+        metadata.create_all(connection)
+        drop_declared_indexes(connection)
+        started = time.perf_counter()
+        seed(connection, args.patients, args.calls, args.appointments)
+        print(f"Seeded {args.patients} patients, {args.calls} calls, {args.appointments} appointments "
+              f"in {time.perf_counter() - started:.1f}s ({engine.dialect.name})")
+
+    queries = hot_queries(args.patients, args.calls)
+    with engine.connect() as connection:
+        connection.execute(text("ANALYZE"))
+        before = measure(connection, queries, args.repeat)
+        report("before migration", connection, queries, before)
+
+    with engine.begin() as connection:
+        started = time.perf_counter()
+        run_migrations(connection)
+        print(f"\nMigration applied in {time.perf_counter() - started:.2f}s")
+
+    with engine.connect() as connection:
+        connection.execute(text("ANALYZE"))
+        after = measure(connection, queries, args.repeat)
+        report("after migration", connection, queries, after)
+
+    print("\n== speedup")
+    for name in queries:
+        print(f"  {name}: {before[name] / after[name]:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hot query plans before and after indexing.")
+    parser.add_argument("--url", help="SQLAlchemy URL with a synchronous driver; defaults to a temp SQLite file")
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--appointments", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,173 @@
+"""
+Speculative Grok requests: replays scripted turns through a MediaStreamSession with and
+without speculation, and reports the hit rate and the time from final transcript to the
+reply being played.
+
+    python -m benchmarks.bench_speculation --turns 20
+    python -m benchmarks.bench_speculation --turns 20 --grok-latency 0.8 --change-rate 0.3
+
+Each turn sends partial transcripts that grow by a word every --word-ms, repeats the last
+one for --stable-ms (the caller pausing), then sends the final transcript, formatted the
+way AssemblyAI formats finals. With --change-rate, that fraction of finals differ from the
+last partial, which forces a miss. Grok, ElevenLabs and Twilio are the load test's fakes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ANSWERS = [
+    "my name is john smith",
+    "the fourteenth of march nineteen eighty two",
+    "oh seven seven double oh nine one two three four five",
+    "i have had a sore throat and a cough",
+    "no i have not had this before",
+    "about two weeks now",
+    "just paracetamol when i need it",
+    "no known allergies",
+    "no that is everything thank you",
+]
+
+
+class ScriptedASR:
+    """
+    Real-time ASR stand-in that emits the partial and final transcripts it is given.
+    """
+
+    def __init__(self):
+        self.outbox = asyncio.Queue()
+
+    async def connect(self, sample_rate: int = 8000, encoding: str = "pcm_mulaw"):
+        return self
+
+    async def send(self, message: str):
+        if json.loads(message).get("terminate_session"):
+            await self.outbox.put(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.outbox.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def close(self):
+        pass
+
+    def emit(self, message_type: str, text: str):
+        self.outbox.put_nowait(json.dumps({"message_type": message_type, "text": text}))
+
+
+async def run_turns(args, speculative: bool) -> dict:
+    from services.media_stream import MediaStreamSession
+    from services.twilio_handler import twilio_adapter
+
+    played = asyncio.Queue()
+    update_call = twilio_adapter.update_call
+
+    async def recording_update_call(call_sid, twiml):
+        played.put_nowait(time.perf_counter())
+        return await update_call(call_sid, twiml)
+
+    twilio_adapter.update_call = recording_update_call
+
+    asr = ScriptedASR()
+    session = MediaStreamSession(connect_asr=asr.connect)
+    session.speculative = speculative
+    await session.handle_event({
+        "event": "start", "streamSid": "MZbench", "start": {"callSid": f"CAbench{int(speculative)}"},
+    })
+
+    latencies = []
+    for turn in range(args.turns):
+        words = ANSWERS[turn % len(ANSWERS)].split()
+        for count in range(1, len(words) + 1):
+            asr.emit("PartialTranscript", " ".join(words[:count]))
+            await asyncio.sleep(args.word_ms / 1000)
+        stable_until = time.perf_counter() + args.stable_ms / 1000
+        while time.perf_counter() < stable_until:
+            asr.emit("PartialTranscript", " ".join(words))
+            await asyncio.sleep(0.1)
+
+        final = " ".join(words)
+        if random.random() < args.change_rate:
+            final += " actually"
+        final_at = time.perf_counter()
+        asr.emit("FinalTranscript", final[0].upper() + final[1:] + ".")
+        latencies.append(await played.get() - final_at)
+        # Let the rest of the reply finish before the caller speaks again
+        await asyncio.sleep(args.gap_ms / 1000)
+
+    session.buffer.close()
+    await asr.outbox.put(None)
+    await session.close()
+    twilio_adapter.update_call = update_call
+
+    latencies.sort()
+    return {
+        "speculations": session.speculations,
+        "hits": session.speculation_hits,
+        "hit_rate": session.speculation_hits / args.turns,
+        "saved": session.latency_saved / max(1, session.speculation_hits),
+        "p50": latencies[len(latencies) // 2],
+        "mean": sum(latencies) / len(latencies),
+    }
+
+
+async def main_async(args):
+    from benchmarks.load_test import FakeProvider, install_fakes
+    from utils.database import close_database, initialize_database
+
+    providers = {
+        name: FakeProvider(name, latency)
+        for name, latency in (("grok", args.grok_latency), ("elevenlabs", args.tts_latency),
+                              ("assemblyai", 0.0), ("twilio", 0.02), ("sheets", 0.0))
+    }
+    install_fakes(providers)
+    # Each turn saves its reply and finalizes the call record
+    await initialize_database()
+
+    for speculative in (False, True):
+        random.seed(args.seed)
+        result = await run_turns(args, speculative)
+        label = "speculative" if speculative else "baseline"
+        print(f"{label:<12} reply after final: p50 {result['p50'] * 1000:7.1f} ms, mean {result['mean'] * 1000:7.1f} ms"
+              + (f" | {result['speculations']} requests, hit rate {result['hit_rate']:.0%}, "
+                 f"mean saved {result['saved'] * 1000:.0f} ms per hit" if speculative else ""))
+    await close_database()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure speculative Grok requests on partial transcripts.")
+    parser.add_argument("--turns", type=int, default=18)
+    parser.add_argument("--grok-latency", type=float, default=0.5, help="Mean Grok time to first token (s)")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="Mean ElevenLabs latency (s)")
+    parser.add_argument("--word-ms", type=int, default=150, help="Interval between growing partials")
+    parser.add_argument("--stable-ms", type=int, default=400, help="How long the last partial repeats before the final")
+    parser.add_argument("--change-rate", type=float, default=0.1, help="Fraction of finals that differ from the partial")
+    parser.add_argument("--gap-ms", type=int, default=1500, help="Pause between turns")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Settings are read at import time
+    workdir = tempfile.mkdtemp(prefix="nhs-speculation-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "tts")
+    os.environ["VAD_ENABLED"] = "false"
+    os.environ.setdefault("TWILIO_ACCOUNT_SID", "AC" + "0" * 32)
+    os.environ.setdefault("TWILIO_AUTH_TOKEN", "speculation-bench")
+
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Cold start: how long a fresh process takes to import the app and to get through
+app_lifespan to the point where it can take a call.
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --runs 5 --tts-latency 0.8 --top 25
+
+Each run is a new Python process, so imports are cold. It reports, as medians over the runs:
+- import time per module (python -X importtime, cumulative), for the app's own modules
+  and the heaviest third-party packages
+- boot time per service from service_registry.start()
+- the background warm-up time per service, which no longer delays boot
+
+Providers are the load test's fakes, with --tts-latency applied to every ElevenLabs
+request made while pre-warming the TTS cache.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_PACKAGES = ("main", "api", "core", "db", "services", "utils")
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def child(args):
+    """
+    Import the app, boot it with provider fakes and print the timings as one JSON line.
+    """
+    started = time.perf_counter()
+    import main
+    imported = time.perf_counter() - started
+
+    import asyncio
+    from benchmarks.load_test import FakeProvider, install_fakes
+    from loguru import logger
+    from utils.service_registry import service_registry
+
+    logger.remove()
+    providers = {
+        name: FakeProvider(name, latency)
+        for name, latency in (("grok", 0.0), ("elevenlabs", args.tts_latency), ("assemblyai", 0.0),
+                              ("twilio", 0.0), ("sheets", 0.0))
+    }
+    install_fakes(providers)
+
+    async def boot():
+        async with main.app_lifespan(main.app):
+            ready = time.perf_counter() - started
+            await service_registry.wait_warm()
+            warm = time.perf_counter() - started
+        return ready, warm
+
+    ready, warm = asyncio.run(boot())
+    print(json.dumps({"import": imported, "ready": ready, "warm": warm, **service_registry.stats()}))
+
+
+def run_once(args, workdir: str, run: int) -> tuple:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, f'startup-{run}.db')}",
+        "TTS_CACHE_DIR": os.path.join(workdir, f"tts-{run}"),
+        "TWILIO_ACCOUNT_SID": env.get("TWILIO_ACCOUNT_SID", "AC" + "0" * 32),
+        "TWILIO_AUTH_TOKEN": env.get("TWILIO_AUTH_TOKEN", "startup-bench"),
+        "ASR_POOL_SIZE": "0",
+    })
+    command = [sys.executable, "-X", "importtime", "-m", "benchmarks.bench_startup", "--child",
+               "--tts-latency", str(args.tts_latency)]
+    result = subprocess.run(command, env=env, capture_output=True, text=True, cwd=os.getcwd())
+    if result.returncode != 0:
+        sys.exit(f"Startup run failed:\n{result.stderr[-4000:]}")
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            imports[match.group(4)] = int(match.group(2)) / 1e6
+            # Later imports come from the fakes, not the app
+            if match.group(4) == "main":
+                break
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return imports, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import and boot time of the app.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20, help="Modules listed in the import report")
+    parser.add_argument("--tts-latency", type=float, default=0.5, help="Fake ElevenLabs latency (s)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="nhs-startup-")
+    runs = [run_once(args, workdir, run) for run in range(args.runs)]
+
+    def median(values):
+        return statistics.median(values) if values else 0.0
+
+    imports = {}
+    for run_imports, _ in runs:
+        for module, seconds in run_imports.items():
+            imports.setdefault(module, []).append(seconds)
+    # Only the first import of a package is timed, so each module appears once per run
+    medians = {module: median(values) for module, values in imports.items()}
+    app_modules = {m: s for m, s in medians.items() if m.split(".")[0] in APP_PACKAGES}
+    third_party = {m: s for m, s in medians.items() if "." not in m and m not in app_modules and not m.startswith("_")}
+
+    reports = [report for _, report in runs]
+    print(f"Median of {args.runs} cold runs")
+    print(f"  import main:        {median([r['import'] for r in reports]) * 1000:8.1f} ms")
+    print(f"  ready for calls:    {median([r['ready'] for r in reports]) * 1000:8.1f} ms after process start")
+    print(f"  warm-up finished:   {median([r['warm'] for r in reports]) * 1000:8.1f} ms (in the background)")
+
+    print(f"\nApp modules by cumulative import time (top {args.top}):")
+    for module, seconds in sorted(app_modules.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {module:<40} {seconds * 1000:8.1f} ms")
+    print(f"\nThird-party packages by cumulative import time (top {args.top}):")
+    for module, seconds in sorted(third_party.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {module:<40} {seconds * 1000:8.1f} ms")
+
+    for key, title in (("start_seconds", "Service start (boot)"), ("warm_up_seconds", "Service warm-up (background)")):
+        print(f"\n{title}:")
+        names = reports[0][key]
+        for name in names:
+            print(f"  {name:<40} {median([r[key].get(name, 0.0) for r in reports]) * 1000:8.1f} ms")
+    errors = {name: error for report in reports for name, error in report["warm_up_errors"].items()}
+    if errors:
+        print(f"\nWarm-up errors: {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# File: benchmarks/bench_streaming_pipeline.py
+"""
+Compare time-to-first-audio for the serial LLM -> TTS path and the streaming pipeline.
+
+Both paths use the same local fakes, so no provider credentials or network are needed:
+
+    python -m benchmarks.bench_streaming_pipeline --turns 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from services.speech_pipeline import stream_speech
+
+REPLY = (
+    "Thank you, I have noted that down. "
+    "Have you experienced these symptoms before, or is this the first time? "
+    "Please take your time and answer in your own words."
+)
+
+
+class FakeLLM:
+    """
+    Streams a fixed reply word by word with a first-token delay and per-token delay.
+    """
+
+    def __init__(self, first_token_delay: float, token_delay: float):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+
+    async def stream(self):
+        await asyncio.sleep(self.first_token_delay)
+        for i, word in enumerate(REPLY.split(" ")):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield word if i == 0 else f" {word}"
+
+    async def complete(self) -> str:
+        return "".join([token async for token in self.stream()])
+
+
+class FakeTTS:
+    """
+    Synthesizes with a fixed request overhead plus a cost per character.
+    """
+
+    def __init__(self, base_delay: float, per_char_delay: float):
+        self.base_delay = base_delay
+        self.per_char_delay = per_char_delay
+
+    async def synthesize(self, text: str) -> str:
+        await asyncio.sleep(self.base_delay + self.per_char_delay * len(text))
+        return f"https://audio.local/{abs(hash(text))}.mp3"
+
+
+async def serial_turn(llm: FakeLLM, tts: FakeTTS) -> float:
+    """
+    Wait for the full completion, then synthesize it in one request.
+    """
+    started = time.perf_counter()
+    reply = await llm.complete()
+    await tts.synthesize(reply)
+    return time.perf_counter() - started
+
+
+async def streaming_turn(llm: FakeLLM, tts: FakeTTS) -> float:
+    """
+    Synthesize sentence by sentence and stop the clock at the first audio chunk.
+    """
+    started = time.perf_counter()
+    audio = stream_speech(llm.stream(), synthesize=tts.synthesize)
+    await audio.__anext__()
+    elapsed = time.perf_counter() - started
+    async for _ in audio:
+        pass
+    return elapsed
+
+
+def summarize(label: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<10} mean={statistics.mean(samples) * 1000:7.1f}ms  "
+          f"p50={statistics.median(samples) * 1000:7.1f}ms  p95={p95 * 1000:7.1f}ms")
+
+
+async def main(args):
+    llm = FakeLLM(args.first_token_ms / 1000, args.token_ms / 1000)
+    tts = FakeTTS(args.tts_base_ms / 1000, args.tts_char_ms / 1000)
+
+    serial = [await serial_turn(llm, tts) for _ in range(args.turns)]
+    streaming = [await streaming_turn(llm, tts) for _ in range(args.turns)]
+
+    print(f"Time to first audio over {args.turns} turns ({len(REPLY.split())} tokens per reply)")
+    summarize("serial", serial)
+    summarize("streaming", streaming)
+    print(f"speedup    {statistics.mean(serial) / statistics.mean(streaming):.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=25)
+    parser.add_argument("--tts-base-ms", type=float, default=150)
+    parser.add_argument("--tts-char-ms", type=float, default=2)
+    asyncio.run(main(parser.parse_args()))
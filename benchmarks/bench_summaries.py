@@ -0,0 +1,118 @@
+"""
+Compare looking up final consultation summaries the old way (load every "Final Summary"
+row from responses and ast.literal_eval it) with indexed queries on consultation_summaries.
+
+    python -m benchmarks.bench_summaries --summaries 100000
+
+Both tables are seeded with the same summaries on a temporary SQLite file (or --url with
+a synchronous driver). consultation_summaries is filled with the executemany used by
+save_consultation_summaries, and the report includes that insert rate.
+"""
+import argparse
+import ast
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from sqlalchemy import create_engine, select, text
+from db.migrations import run_migrations
+from db.models import metadata, calls, consultation_summaries, responses
+from db.queries import consultation_summary_values, find_consultation_summaries_query
+
+REASONS = ["sore throat", "back pain", "persistent cough", "skin rash", "headaches", "chest pain",
+           "blood pressure review", "knee injury", "ear infection", "fatigue", "stomach pain", "anxiety"]
+
+
+def fake_summary(rng: random.Random, index: int) -> dict:
+    return {
+        "full_name": f"Patient {index}",
+        "date_of_birth": (date(1930, 1, 1) + timedelta(days=rng.randrange(365 * 90))).isoformat(),
+        "phone_number": f"07700{index:06d}",
+        "reason_for_appointment": f"{rng.choice(REASONS).capitalize()} for {rng.randint(1, 30)} days",
+        "experienced_before": rng.choice(["yes", "no"]),
+        "duration_of_symptoms": f"{rng.randint(1, 8)} weeks",
+        "current_medication": rng.choice(["None", "Paracetamol", "Ibuprofen", "Amlodipine 5mg"]),
+        "known_allergies": rng.choice(["None", "None", "Penicillin"]),
+        "additional_notes": "",
+    }
+
+
+def seed(connection, summaries: list) -> float:
+    connection.execute(calls.insert(), [{"id": call_id} for call_id, _ in summaries])
+    connection.execute(responses.insert(), [
+        {"call_id": call_id, "question": "Final Summary", "response": str(data)} for call_id, data in summaries
+    ])
+    started = time.perf_counter()
+    rows = [consultation_summary_values(call_id, data) for call_id, data in summaries]
+    connection.execute(consultation_summaries.insert(), rows)
+    return time.perf_counter() - started
+
+
+def legacy_lookup(connection, matches) -> list:
+    rows = connection.execute(
+        select(responses.c.call_id, responses.c.response).where(responses.c.question == "Final Summary")
+    ).fetchall()
+    return [call_id for call_id, response in rows if matches(ast.literal_eval(response))]
+
+
+def median_ms(run, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main(args):
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_summaries.db')}"
+    engine = create_engine(url)
+    rng = random.Random(42)
+    summaries = [(index, fake_summary(rng, index)) for index in range(1, args.summaries + 1)]
+
+    with engine.begin() as connection:
+        metadata.drop_all(connection)
+        metadata.create_all(connection)
+        run_migrations(connection)
+        elapsed = seed(connection, summaries)
+        print(f"Inserted {len(summaries)} summaries in {elapsed:.2f}s "
+              f"({len(summaries) / elapsed:,.0f} rows/s, {engine.dialect.name})")
+
+    _, sample = summaries[len(summaries) // 2]
+    dob = date.fromisoformat(sample["date_of_birth"])
+    phone = consultation_summary_values(0, sample)["phone_number"]
+    reason = sample["reason_for_appointment"].split(" for ")[0]
+    lookups = {
+        "date of birth": (
+            lambda data: data["date_of_birth"] == sample["date_of_birth"],
+            find_consultation_summaries_query(date_of_birth=dob),
+        ),
+        "phone number": (
+            lambda data: data["phone_number"] == sample["phone_number"],
+            find_consultation_summaries_query(phone_number=phone),
+        ),
+        "reason prefix": (
+            lambda data: data["reason_for_appointment"].lower().startswith(reason.lower()),
+            find_consultation_summaries_query(reason=reason, limit=args.summaries),
+        ),
+    }
+
+    with engine.connect() as connection:
+        connection.execute(text("ANALYZE"))
+        print(f"\n{'lookup':<15}{'legacy scan':>14}{'indexed':>12}{'speedup':>10}  rows")
+        for name, (matches, query) in lookups.items():
+            legacy = median_ms(lambda: legacy_lookup(connection, matches), max(1, args.repeat // 10))
+            indexed = median_ms(lambda: connection.execute(query).fetchall(), args.repeat)
+            found = len(connection.execute(query).fetchall())
+            assert found == len(legacy_lookup(connection, matches)), name
+            print(f"{name:<15}{legacy:>11.1f} ms{indexed:>9.3f} ms{legacy / indexed:>9.0f}x  {found}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark final summary lookups.")
+    parser.add_argument("--url", help="SQLAlchemy URL with a synchronous driver; defaults to a temp SQLite file")
+    parser.add_argument("--summaries", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=50)
+    main(parser.parse_args())
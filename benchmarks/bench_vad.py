@@ -0,0 +1,108 @@
+"""
+Replays WAV recordings through the local endpointer offline and reports the utterances it
+finds, how far each boundary is from the labelled one, and processing speed.
+
+    python -m benchmarks.bench_vad call1.wav call2.wav
+    python -m benchmarks.bench_vad --hangover-ms 300 call1.wav
+
+Recordings are mono 16-bit WAV at any rate. Labels are optional: a `call1.json` next to
+`call1.wav` holding [[start, end], ...] in seconds. With no files, a synthetic recording
+(voiced bursts over line noise) is generated and checked against its known boundaries. Labelled
+fixtures the tests replay are in tests/fixtures/vad.
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+from services.vad import VAD_FRAME_MS, VAD_HANGOVER_MS, detect_utterances, read_wav
+
+
+def synthetic_call(sample_rate: int = 8000, seed: int = 0) -> tuple:
+    """
+    Voiced bursts (a 140 Hz harmonic series with syllable-rate amplitude changes) separated
+    by pauses, over low-level line noise. Returns (samples, labels).
+    """
+    rng = np.random.default_rng(seed)
+    segments, labels, position = [], [], 0.0
+    for speech_seconds, pause_seconds in [(0.0, 0.6), (1.4, 0.25), (0.8, 1.2), (2.1, 0.9), (0.5, 1.0)]:
+        if speech_seconds:
+            t = np.arange(int(speech_seconds * sample_rate)) / sample_rate
+            envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+            voiced = sum(np.sin(2 * np.pi * 140 * harmonic * t) / harmonic for harmonic in (1, 2, 3, 5))
+            segments.append(5000 * envelope * voiced)
+            labels.append((position, position + speech_seconds))
+            position += speech_seconds
+        segments.append(np.zeros(int(pause_seconds * sample_rate)))
+        position += pause_seconds
+
+    # A pause shorter than the hangover belongs to the surrounding utterance
+    merged = [list(labels[0])]
+    for start, end in labels[1:]:
+        if start - merged[-1][1] < VAD_HANGOVER_MS / 1000:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    audio = np.concatenate(segments) + rng.normal(0, 40, sum(len(segment) for segment in segments))
+    return np.clip(audio, -32768, 32767).astype(np.int16), [tuple(label) for label in merged]
+
+
+def compare(detected: list, labels: list, hangover: float):
+    """
+    Print each labelled utterance with the detected boundaries and their errors.
+
+    The expected end-of-utterance time is the labelled end plus the hangover.
+    """
+    for index, (start, end) in enumerate(labels):
+        matches = [(s, e) for s, e in detected if s < end and e > start]
+        if not matches:
+            print(f"    label {start:6.2f}-{end:6.2f}s  missed")
+            continue
+        s, e = matches[0]
+        print(f"    label {start:6.2f}-{end:6.2f}s  detected {s:6.2f}-{e:6.2f}s  "
+              f"start {1000 * (s - start):+5.0f} ms, end-of-utterance {1000 * (e - end - hangover):+5.0f} ms vs hangover")
+    extra = [(s, e) for s, e in detected if not any(s < end and e > start for start, end in labels)]
+    if extra:
+        print(f"    {len(extra)} detections with no label: {extra}")
+
+
+def run(name: str, samples: np.ndarray, sample_rate: int, labels: list, options: dict):
+    started = time.process_time()
+    detected = detect_utterances(samples, sample_rate, **options)
+    elapsed = time.process_time() - started
+    frames = len(samples) // (sample_rate * VAD_FRAME_MS // 1000)
+    print(f"{name}: {len(samples) / sample_rate:.1f}s, {len(detected)} utterances, "
+          f"{frames / elapsed:,.0f} frames/s on one core")
+    if labels is None:
+        for start, end in detected:
+            print(f"    {start:6.2f}-{end:6.2f}s")
+    else:
+        compare(detected, labels, options.get("hangover_ms", VAD_HANGOVER_MS) / 1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay WAV recordings through the local endpointer.")
+    parser.add_argument("wavs", nargs="*", help="Mono 16-bit WAV files")
+    parser.add_argument("--hangover-ms", type=int, help="Override VAD_HANGOVER_MS")
+    parser.add_argument("--threshold-db", type=float, help="Override VAD_ENERGY_THRESHOLD_DB")
+    args = parser.parse_args()
+
+    options = {}
+    if args.hangover_ms is not None:
+        options["hangover_ms"] = args.hangover_ms
+    if args.threshold_db is not None:
+        options["energy_threshold_db"] = args.threshold_db
+
+    if not args.wavs:
+        samples, labels = synthetic_call()
+        run("synthetic call", samples, 8000, labels, options)
+
+    for path in args.wavs:
+        samples, sample_rate = read_wav(path)
+        label_path = os.path.splitext(path)[0] + ".json"
+        labels = None
+        if os.path.exists(label_path):
+            with open(label_path) as f:
+                labels = [tuple(label) for label in json.load(f)]
+        run(os.path.basename(path), samples, sample_rate, labels, options)
@@ -0,0 +1,221 @@
+# File: benchmarks/fake_twilio_stream.py
+"""
+Local stand-in for Twilio Media Streams, for exercising /stream/audio without a phone call.
+
+Against a running server (real ASR and providers):
+
+    python -m benchmarks.fake_twilio_stream --url ws://localhost:8000/stream/audio --seconds 5
+
+In-process with a fake ASR, no credentials or network needed:
+
+    python -m benchmarks.fake_twilio_stream --in-process --seconds 5
+
+Audio is a WAV file (8 kHz mono 16-bit) given with --wav, or a generated tone; --burst-ms
+breaks the tone into utterances so the local endpointer fires.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+import uuid
+import wave
+import numpy as np
+from services.audio_codec import pcm16_to_ulaw
+
+FRAME_BYTES = 160  # 20 ms of 8 kHz mu-law
+FRAME_SECONDS = 0.02
+
+
+def tone_frames(seconds: float, frequency: float = 440.0, burst_ms: int = 0, gap_ms: int = 600):
+    """
+    A tone, optionally broken into `burst_ms` bursts separated by `gap_ms` of silence.
+    """
+    t = np.arange(int(seconds * 8000)) / 8000
+    pcm = 8000 * np.sin(2 * np.pi * frequency * t)
+    if burst_ms:
+        period = (burst_ms + gap_ms) / 1000
+        pcm[(t % period) >= burst_ms / 1000] = 0
+    audio = pcm16_to_ulaw(pcm.astype(np.int16)).tobytes()
+    return [audio[i:i + FRAME_BYTES] for i in range(0, len(audio), FRAME_BYTES)]
+
+
+def wav_frames(path: str):
+    with wave.open(path, "rb") as wav:
+        if wav.getframerate() != 8000 or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError("Expected an 8 kHz mono 16-bit WAV file")
+        pcm = wav.readframes(wav.getnframes())
+    audio = pcm16_to_ulaw(pcm).tobytes()
+    return [audio[i:i + FRAME_BYTES] for i in range(0, len(audio), FRAME_BYTES)]
+
+
+class FakeTwilioStream:
+    """
+    Builds the sequence of messages Twilio sends over a Media Streams websocket.
+    """
+
+    def __init__(self, call_sid: str = None):
+        self.stream_sid = f"MZ{uuid.uuid4().hex}"
+        self.call_sid = call_sid or f"CA{uuid.uuid4().hex}"
+
+    def messages(self, frames: list, mark_every: int = 50):
+        yield {"event": "connected", "protocol": "Call", "version": "1.0.0"}
+        yield {
+            "event": "start",
+            "sequenceNumber": "1",
+            "streamSid": self.stream_sid,
+            "start": {
+                "streamSid": self.stream_sid,
+                "callSid": self.call_sid,
+                "tracks": ["inbound"],
+                "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": 8000, "channels": 1},
+            },
+        }
+        sequence = 2
+        for chunk, frame in enumerate(frames, start=1):
+            yield {
+                "event": "media",
+                "sequenceNumber": str(sequence),
+                "streamSid": self.stream_sid,
+                "media": {
+                    "track": "inbound",
+                    "chunk": str(chunk),
+                    "timestamp": str(int((chunk - 1) * FRAME_SECONDS * 1000)),
+                    "payload": base64.b64encode(frame).decode("ascii"),
+                },
+            }
+            sequence += 1
+            if mark_every and chunk % mark_every == 0:
+                yield {"event": "mark", "sequenceNumber": str(sequence), "streamSid": self.stream_sid,
+                       "mark": {"name": f"frame-{chunk}"}}
+                sequence += 1
+        yield {"event": "stop", "sequenceNumber": str(sequence), "streamSid": self.stream_sid,
+               "stop": {"callSid": self.call_sid}}
+
+
+class FakeASR:
+    """
+    Stand-in for the AssemblyAI real-time websocket: counts audio, emits a partial
+    transcript for each chunk and a final one every `utterance_ms` of audio, when an
+    utterance is forced to end and when the session ends.
+    """
+
+    def __init__(self, utterance_ms: int = 1000):
+        self.utterance_ms = utterance_ms
+        self.utterance_bytes = 8 * utterance_ms
+        self.bytes_received = 0
+        self.transcripts = []
+        self._pending = 0
+        self._outbox = asyncio.Queue()
+
+    async def connect(self, sample_rate: int = 8000, encoding: str = "pcm_mulaw"):
+        bytes_per_sample = 2 if encoding == "pcm_s16le" else 1
+        self.utterance_bytes = sample_rate * bytes_per_sample * self.utterance_ms // 1000
+        return self
+
+    async def send(self, message: str):
+        data = json.loads(message)
+        if "audio_data" in data:
+            size = len(base64.b64decode(data["audio_data"]))
+            self.bytes_received += size
+            self._pending += size
+            if self._pending >= self.utterance_bytes:
+                self._emit()
+            else:
+                self._outbox.put_nowait(json.dumps({"message_type": "PartialTranscript", "text": self._text()}))
+        elif data.get("force_end_utterance"):
+            if self._pending:
+                self._emit()
+        elif data.get("terminate_session"):
+            if self._pending:
+                self._emit()
+            await self._outbox.put(None)
+
+    def _text(self):
+        return f"utterance {len(self.transcripts) + 1} ({self._pending} bytes)"
+
+    def _emit(self):
+        text = self._text()
+        self.transcripts.append(text)
+        self._pending = 0
+        self._outbox.put_nowait(json.dumps({"message_type": "FinalTranscript", "text": text}))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self._outbox.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def close(self):
+        pass
+
+
+async def run_against_server(url: str, frames: list, realtime: bool):
+    import websockets
+
+    stream = FakeTwilioStream()
+    started = time.perf_counter()
+    async with websockets.connect(url) as websocket:
+        for message in stream.messages(frames):
+            await websocket.send(json.dumps(message))
+            if realtime and message["event"] == "media":
+                await asyncio.sleep(FRAME_SECONDS)
+    print(f"Sent {len(frames)} frames for call {stream.call_sid} in {time.perf_counter() - started:.2f}s")
+
+
+def run_in_process(frames: list):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.media_stream import media_stream_router, get_media_session
+    from services.media_stream import MediaStreamSession
+
+    asr = FakeASR()
+    answered = []
+    sessions = []
+
+    async def answer(text: str):
+        answered.append(text)
+
+    def fake_session():
+        session = MediaStreamSession(connect_asr=asr.connect, on_transcript=answer)
+        sessions.append(session)
+        return session
+
+    app = FastAPI()
+    app.include_router(media_stream_router, prefix="/stream")
+    app.dependency_overrides[get_media_session] = fake_session
+
+    stream = FakeTwilioStream()
+    started = time.perf_counter()
+    with TestClient(app) as client, client.websocket_connect("/stream/audio") as websocket:
+        for message in stream.messages(frames):
+            websocket.send_text(json.dumps(message))
+    elapsed = time.perf_counter() - started
+
+    session = sessions[0]
+    print(f"Streamed {len(frames)} frames ({len(frames) * FRAME_BYTES} bytes) in {elapsed:.3f}s "
+          f"({len(frames) / elapsed:.0f} frames/s)")
+    print(f"Session received {session.frames_received} frames, forwarded {session.bytes_forwarded} bytes, "
+          f"last mark {session.last_mark}")
+    print(f"Endpointer closed {session.utterances_detected} utterances, {session.early_answers} answered early")
+    print(f"Fake ASR received {asr.bytes_received} bytes; transcripts answered: {answered}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Twilio Media Streams client.")
+    parser.add_argument("--url", default="ws://localhost:8000/stream/audio")
+    parser.add_argument("--in-process", action="store_true", help="Drive the endpoint in-process with a fake ASR")
+    parser.add_argument("--wav", help="8 kHz mono 16-bit WAV file to stream")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Length of the generated tone")
+    parser.add_argument("--burst-ms", type=int, default=0, help="Split the tone into bursts of this length")
+    parser.add_argument("--realtime", action="store_true", help="Pace frames at 20 ms like a real call")
+    args = parser.parse_args()
+
+    frames = wav_frames(args.wav) if args.wav else tone_frames(args.seconds, burst_ms=args.burst_ms)
+    if args.in_process:
+        run_in_process(frames)
+    else:
+        asyncio.run(run_against_server(args.url, frames, args.realtime))
@@ -0,0 +1,439 @@
+"""
+Concurrent-call load test: boots the FastAPI app from main.py with uvicorn against a scratch
+SQLite database, replaces every provider with a local fake, and drives simulated callers
+through the HTTP endpoints.
+
+    python -m benchmarks.load_test --callers 200
+    python -m benchmarks.load_test --callers 500 --ramp 5 --grok-latency 0.8 --tts-error-rate 0.02
+    python -m benchmarks.load_test --callers 200 --json results.json
+
+Each caller starts a call with POST /calls/start_call and then sends Twilio's incoming-call
+webhook (POST /twilio/calls). Meanwhile GET /reminders/send_reminders runs --reminder-runs
+times, and every seeded appointment is made due again before each run. The report gives
+throughput and p50/p95/p99 latency per endpoint, and per-stage latency from /metrics.
+
+Fakes (latency is the mean in seconds, with +/- 25% jitter; error rates are 0-1):
+  Grok        openai.ChatCompletion.acreate, streamed or not; latency is time to first token
+  ElevenLabs  httpx transport under the shared TTS client
+  AssemblyAI  the real-time websocket, sending one final transcript
+  Twilio      twilio AsyncHttpClient under the shared adapter
+  Sheets      the worksheet behind the batch writer
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+ENDPOINTS = ("POST /calls/start_call", "POST /twilio/calls", "GET /reminders/send_reminders")
+
+
+@dataclass
+class FakeProvider:
+    """
+    Latency and error behaviour of one fake provider, plus what it was asked to do.
+    """
+    name: str
+    latency: float
+    error_rate: float = 0.0
+    requests: int = 0
+    errors: int = 0
+
+    def _delay(self) -> float:
+        return self.latency * random.uniform(0.75, 1.25)
+
+    def _fails(self) -> bool:
+        self.requests += 1
+        failed = random.random() < self.error_rate
+        self.errors += failed
+        return failed
+
+    async def wait(self) -> bool:
+        """
+        Sleep for one request's latency; return True if this request should fail.
+        """
+        failed = self._fails()
+        await asyncio.sleep(self._delay())
+        return failed
+
+    def wait_blocking(self) -> bool:
+        failed = self._fails()
+        time.sleep(self._delay())
+        return failed
+
+
+class FakeGrok:
+    """
+    Stands in for openai.ChatCompletion.acreate, asking the consultation questions in turn.
+    """
+
+    def __init__(self, provider: FakeProvider, token_interval: float = 0.01):
+        self.provider = provider
+        self.token_interval = token_interval
+        self.replies = 0
+
+    def _reply(self) -> str:
+        self.replies += 1
+        return (f"Thank you, I have noted that. Could you tell me how long you have had these symptoms? "
+                f"This is question {self.replies}.")
+
+    async def acreate(self, **kwargs):
+        if await self.provider.wait():
+            raise ConnectionError("Fake Grok error")
+        reply = self._reply()
+        if kwargs.get("stream"):
+            return self._stream(reply)
+        return {
+            "choices": [{"message": {"role": "assistant", "content": reply}}],
+            "usage": {"prompt_tokens": 400, "completion_tokens": len(reply) // 4},
+        }
+
+    async def _stream(self, reply: str):
+        for word in reply.split(" "):
+            yield {"choices": [{"delta": {"content": word + " "}}]}
+            await asyncio.sleep(self.token_interval)
+
+
+def fake_tts_transport(provider: FakeProvider):
+    import httpx
+
+    class FakeElevenLabsTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            if await provider.wait():
+                return httpx.Response(500, text="Fake ElevenLabs error", request=request)
+            audio_id = random.getrandbits(64)
+            return httpx.Response(200, json={"audio_url": f"https://audio.invalid/{audio_id:x}.mp3"}, request=request)
+
+    return FakeElevenLabsTransport()
+
+
+def fake_twilio_http_client(provider: FakeProvider):
+    from twilio.http import AsyncHttpClient
+    from twilio.http.response import Response
+
+    class FakeTwilioHttpClient(AsyncHttpClient):
+        def __init__(self):
+            super().__init__(logging.getLogger("twilio.load_test"), True)
+
+        async def request(self, method, url, params=None, data=None, headers=None, auth=None,
+                          timeout=None, allow_redirects=False):
+            if await provider.wait():
+                return Response(500, json.dumps({"code": 20500, "message": "Fake Twilio error", "status": 500}))
+            prefix = "SM" if url.endswith("Messages.json") else "CA"
+            sid = f"{prefix}{random.getrandbits(128):032x}"
+            return Response(201, json.dumps({"sid": sid, "status": "queued"}))
+
+        async def close(self):
+            pass
+
+    return FakeTwilioHttpClient()
+
+
+class FakeAssemblyAISession:
+    """
+    Real-time session that yields one final transcript after the provider's latency.
+    """
+
+    def __init__(self, provider: FakeProvider):
+        self.provider = provider
+        self._sent = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._sent:
+            raise StopAsyncIteration
+        self._sent = True
+        if await self.provider.wait():
+            raise ConnectionError("Fake AssemblyAI error")
+        return json.dumps({"message_type": "FinalTranscript", "text": "I have had a headache for three days."})
+
+    async def send(self, message: str):
+        pass
+
+    async def close(self):
+        pass
+
+
+class FakeWorksheet:
+    def __init__(self, provider: FakeProvider):
+        self.provider = provider
+        self.rows = 0
+
+    def append_rows(self, rows: list):
+        if self.provider.wait_blocking():
+            raise ConnectionError("Fake Google Sheets error")
+        self.rows += len(rows)
+
+    def append_row(self, row: list):
+        self.append_rows([row])
+
+
+def install_fakes(providers: dict):
+    """
+    Point every provider client the app uses at the local fakes.
+    """
+    import httpx
+    import openai
+    import services.assembly_ai_handler as assembly_ai_handler
+    import services.eleven_labs_handler as eleven_labs_handler
+    import services.sheets_handler as sheets_handler
+    from services.twilio_handler import twilio_adapter
+
+    grok = FakeGrok(providers["grok"])
+    openai.ChatCompletion.acreate = grok.acreate
+
+    eleven_labs_handler._async_client = httpx.AsyncClient(transport=fake_tts_transport(providers["elevenlabs"]))
+    eleven_labs_handler._semaphore = asyncio.Semaphore(eleven_labs_handler.ELEVEN_LABS_MAX_CONCURRENCY)
+
+    async def connect_to_fake_assembly_ai(sample_rate: int = 8000, encoding: str = "pcm_mulaw"):
+        return FakeAssemblyAISession(providers["assemblyai"])
+    assembly_ai_handler.connect_to_assembly_ai = connect_to_fake_assembly_ai
+    assembly_ai_handler.asr_pool.connect = connect_to_fake_assembly_ai
+
+    twilio_adapter.http_client = fake_twilio_http_client(providers["twilio"])
+    sheets_handler._worksheet = FakeWorksheet(providers["sheets"])
+
+
+def seed_database(database_url: str, callers: int, appointments_per_caller: int) -> list:
+    """
+    Create the schema and one patient per simulated caller, with appointments due soon.
+
+    Returns:
+        list[str]: The callers' phone numbers.
+    """
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine
+    from db.migrations import run_migrations
+    from db.models import appointments, metadata, patients
+
+    engine = create_engine(database_url.replace("+aiosqlite", ""))
+    phone_numbers = [f"+4477009{index:05d}" for index in range(callers)]
+    due = datetime.now() + timedelta(minutes=30)
+    with engine.begin() as connection:
+        metadata.create_all(connection)
+        run_migrations(connection)
+        connection.execute(patients.insert(), [
+            {"id": index + 1, "phone_number": number, "name": f"Load Test {index}"}
+            for index, number in enumerate(phone_numbers)
+        ])
+        connection.execute(appointments.insert(), [
+            {"patient_id": index + 1, "appointment_time": due + timedelta(seconds=slot), "reminder_sent": False}
+            for index in range(callers) for slot in range(appointments_per_caller)
+        ])
+    engine.dispose()
+    return phone_numbers
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+@dataclass
+class EndpointStats:
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    failure_kinds: dict = field(default_factory=dict)
+
+    def record(self, latency: float, failure: str = None):
+        self.latencies.append(latency)
+        if failure:
+            self.errors += 1
+            self.failure_kinds[failure] = self.failure_kinds.get(failure, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        ordered = sorted(self.latencies)
+        return {
+            "requests": len(ordered),
+            "errors": self.errors,
+            "throughput": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(1000 * percentile(ordered, 0.50), 1),
+            "p95_ms": round(1000 * percentile(ordered, 0.95), 1),
+            "p99_ms": round(1000 * percentile(ordered, 0.99), 1),
+            "max_ms": round(1000 * ordered[-1], 1) if ordered else 0.0,
+            "failures": self.failure_kinds,
+        }
+
+
+async def timed_request(client, stats: dict, endpoint: str, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    failure = None
+    try:
+        response = await client.request(method, url, **kwargs)
+        if response.status_code >= 400:
+            failure = f"HTTP {response.status_code}"
+        elif b"<Say>" in response.content:
+            # The webhook answers with a spoken apology when a turn fails
+            failure = "apology TwiML"
+    except Exception as e:
+        failure = type(e).__name__
+    stats[endpoint].record(time.perf_counter() - started, failure)
+
+
+async def simulate_caller(client, stats: dict, phone_number: str, delay: float):
+    await asyncio.sleep(delay)
+    await timed_request(client, stats, ENDPOINTS[0], "POST", "/calls/start_call", params={"phone_number": phone_number})
+    call_sid = f"CA{random.getrandbits(128):032x}"
+    await timed_request(client, stats, ENDPOINTS[1], "POST", "/twilio/calls",
+                        data={"CallSid": call_sid, "From": phone_number})
+
+
+async def run_reminders(client, stats: dict, runs: int, interval: float):
+    from db.models import appointments
+    from utils.database import database
+
+    for run in range(runs):
+        await asyncio.sleep(interval)
+        await database.execute(appointments.update().values(reminder_sent=False))
+        await timed_request(client, stats, ENDPOINTS[2], "GET", "/reminders/send_reminders")
+
+
+def stage_summary() -> dict:
+    """
+    Count, errors, mean and approximate p95 per pipeline stage, read from the app's latency histograms.
+    """
+    from utils.metrics import STAGE_ERRORS, STAGE_LATENCY
+
+    summary = {}
+    for labels in sorted(STAGE_LATENCY._series):
+        cumulative, total, count = STAGE_LATENCY.snapshot(*labels)
+        bounds = STAGE_LATENCY.buckets + (float("inf"),)
+        p95 = next(bound for bound, seen in zip(bounds, cumulative) if seen >= 0.95 * count)
+        summary[f"{labels[0]} ({labels[1]})"] = {
+            "count": count,
+            "errors": int(STAGE_ERRORS.value(*labels)),
+            "mean_ms": round(1000 * total / count, 1),
+            "p95_le_ms": "inf" if p95 == float("inf") else round(1000 * p95, 1),
+        }
+    return summary
+
+
+async def run_load_test(args, providers: dict) -> dict:
+    import httpx
+    import uvicorn
+    from main import app
+    from services.assembly_ai_handler import asr_pool
+    from utils.database import database
+
+    install_fakes(providers)
+    phone_numbers = seed_database(os.environ["DATABASE_URL"], args.callers, args.appointments)
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           lifespan="on", backlog=4096))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.05)
+
+    stats = {endpoint: EndpointStats() for endpoint in ENDPOINTS}
+    limits = httpx.Limits(max_connections=args.callers + 10, max_keepalive_connections=args.callers + 10)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+        started = time.perf_counter()
+        reminders = asyncio.create_task(run_reminders(
+            client, stats, args.reminder_runs, args.ramp / max(args.reminder_runs, 1)
+        ))
+        await asyncio.gather(*[
+            simulate_caller(client, stats, number, args.ramp * index / args.callers)
+            for index, number in enumerate(phone_numbers)
+        ])
+        await reminders
+        elapsed = time.perf_counter() - started
+
+    server.should_exit = True
+    await serving
+
+    return {
+        "callers": args.callers,
+        "elapsed_seconds": round(elapsed, 3),
+        "calls_per_second": round(args.callers / elapsed, 1),
+        "endpoints": {endpoint: stats[endpoint].summary(elapsed) for endpoint in ENDPOINTS},
+        "stages": stage_summary(),
+        "asr_pool": asr_pool.stats(),
+        "database_pool": database.stats(),
+        "providers": {name: {"requests": p.requests, "errors": p.errors} for name, p in providers.items()},
+    }
+
+
+def print_report(report: dict):
+    print(f"{report['callers']} callers in {report['elapsed_seconds']}s ({report['calls_per_second']} calls/s)\n")
+    print(f"{'endpoint':<32} {'requests':>8} {'errors':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for endpoint, row in report["endpoints"].items():
+        print(f"{endpoint:<32} {row['requests']:>8} {row['errors']:>6} {row['throughput']:>7} "
+              f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8}")
+    for endpoint, row in report["endpoints"].items():
+        if row["failures"]:
+            print(f"  {endpoint} failures: " + ", ".join(f"{kind} x{count}" for kind, count in row["failures"].items()))
+    print(f"\n{'stage':<44} {'count':>6} {'errors':>6} {'mean ms':>8} {'p95 <= ms':>10}")
+    for stage, row in report["stages"].items():
+        print(f"{stage:<44} {row['count']:>6} {row['errors']:>6} {row['mean_ms']:>8} {row['p95_le_ms']:>10}")
+    print(f"\nASR session pool: {report['asr_pool']}")
+    print(f"Database pool: {report['database_pool']}")
+    print("provider fakes: " + ", ".join(
+        f"{name} {row['requests']} requests/{row['errors']} errors" for name, row in report["providers"].items()
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the app against local provider fakes.")
+    parser.add_argument("--callers", type=int, default=100, help="Simulated concurrent callers")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which callers arrive")
+    parser.add_argument("--appointments", type=int, default=1, help="Due appointments seeded per caller")
+    parser.add_argument("--reminder-runs", type=int, default=3, help="Reminder endpoint runs during the test")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for latencies and failures")
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("--log-level", default="WARNING", help="App log level during the run")
+    for name, latency in (("grok", 0.4), ("tts", 0.25), ("asr", 0.3), ("twilio", 0.1), ("sheets", 0.2)):
+        parser.add_argument(f"--{name}-latency", type=float, default=latency, help=f"Mean {name} latency (s)")
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0, help=f"{name} failure probability")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    # The app reads its settings at import time, so configure them before importing it
+    workdir = tempfile.mkdtemp(prefix="nhs-load-test-")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'load_test.db')}"
+    os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "tts")
+    os.environ.setdefault("BASE_URL", "https://load-test.invalid")
+    os.environ.setdefault("TWILIO_ACCOUNT_SID", "AC" + "0" * 32)
+    os.environ.setdefault("TWILIO_AUTH_TOKEN", "load-test")
+    os.environ.setdefault("REMINDER_RATE_LIMIT", "0")
+
+    import main as app_main  # noqa: F401  (configures loguru on import)
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    providers = {
+        "grok": FakeProvider("grok", args.grok_latency, args.grok_error_rate),
+        "elevenlabs": FakeProvider("elevenlabs", args.tts_latency, args.tts_error_rate),
+        "assemblyai": FakeProvider("assemblyai", args.asr_latency, args.asr_error_rate),
+        "twilio": FakeProvider("twilio", args.twilio_latency, args.twilio_error_rate),
+        "sheets": FakeProvider("sheets", args.sheets_latency, args.sheets_error_rate),
+    }
+    report = asyncio.run(run_load_test(args, providers))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
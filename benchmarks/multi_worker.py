@@ -0,0 +1,228 @@
+"""
+Multi-worker check: runs several app worker processes against one SQLite database and
+verifies that they share call sessions and that reminders are sent by a single leader.
+
+    python -m benchmarks.multi_worker --workers 4
+    python -m benchmarks.multi_worker --workers 4 --kill-leader-after 4 --session-store sqlite
+
+Each worker starts the reminder scheduler and the session store the way app_lifespan does,
+with Twilio replaced by the load test's fake. Appointments are seeded so their reminders
+fall due over --duration seconds. Every worker saves a conversation for its own call and
+reads back every other worker's. With --kill-leader-after the current leader is killed
+without releasing its lease, and another worker should take over within LEASE_TTL_SECONDS.
+
+The report lists reminders sent per worker, duplicates (an appointment reminded twice)
+and misses, leadership changes, and how many peer sessions each worker could read. A
+leader killed mid-batch may have sent reminders it had not yet marked, and the next
+leader sends those again, so a few duplicates are expected after a kill and none otherwise.
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import time
+
+
+def worker_main(index: int, events, ready, stop, workers: int):
+    import asyncio
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level=os.environ.get("MULTI_WORKER_LOG_LEVEL", "WARNING"))
+
+    from benchmarks.load_test import FakeProvider, fake_twilio_http_client
+    from core.scheduler import reminder_scheduler
+    from services.grok_handler import load_conversation, new_conversation, save_conversation
+    from services.session_store import session_store
+    from services.twilio_handler import twilio_adapter
+    from utils.database import database
+
+    twilio_adapter.http_client = fake_twilio_http_client(FakeProvider("twilio", 0.02))
+    send_sms = twilio_adapter.send_sms
+
+    async def recording_send_sms(to, body, **kwargs):
+        result = await send_sms(to, body, **kwargs)
+        events.put(("sent", index, to, time.time()))
+        return result
+
+    twilio_adapter.send_sms = recording_send_sms
+
+    async def run():
+        await database.connect()
+        await session_store.start()
+
+        conversation = new_conversation()
+        conversation.record_user(f"Hello from worker {index}")
+        await save_conversation(f"CA-worker-{index}", conversation)
+        await asyncio.get_running_loop().run_in_executor(None, ready.wait)
+        visible = 0
+        for peer in range(workers):
+            state = await load_conversation(f"CA-worker-{peer}")
+            visible += any(message["content"] == f"Hello from worker {peer}" for message in state.transcript)
+        events.put(("sessions", index, visible, time.time()))
+
+        await reminder_scheduler.start()
+        leading = False
+        while not stop.is_set():
+            if reminder_scheduler.leading != leading:
+                leading = reminder_scheduler.leading
+                events.put(("leading" if leading else "resigned", index, None, time.time()))
+            await asyncio.sleep(0.05)
+
+        await reminder_scheduler.stop()
+        await session_store.stop()
+        await twilio_adapter.close()
+        await database.disconnect()
+
+    asyncio.run(run())
+
+
+def seed_database(database_url: str, count: int, duration: float, lead_minutes: float) -> dict:
+    """
+    Create the schema and one patient per appointment, due over the next `duration` seconds.
+
+    Returns:
+        dict: Appointment id by the patient's phone number.
+    """
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine
+    from db.migrations import run_migrations
+    from db.models import appointments, metadata, patients
+
+    engine = create_engine(database_url.replace("+aiosqlite", ""))
+    start = datetime.now() + timedelta(minutes=lead_minutes, seconds=1)
+    phone_numbers = {f"+4477008{index:05d}": index + 1 for index in range(count)}
+    with engine.begin() as connection:
+        metadata.create_all(connection)
+        run_migrations(connection)
+        connection.execute(patients.insert(), [
+            {"id": appointment_id, "phone_number": number, "name": f"Worker Test {appointment_id}"}
+            for number, appointment_id in phone_numbers.items()
+        ])
+        connection.execute(appointments.insert(), [
+            {
+                "id": appointment_id,
+                "patient_id": appointment_id,
+                "appointment_time": start + timedelta(seconds=duration * (appointment_id - 1) / count),
+                "reminder_sent": False,
+            }
+            for appointment_id in phone_numbers.values()
+        ])
+    engine.dispose()
+    return phone_numbers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several worker processes against one database.")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes")
+    parser.add_argument("--appointments", type=int, default=200, help="Appointments seeded")
+    parser.add_argument("--duration", type=float, default=8.0, help="Seconds over which reminders fall due")
+    parser.add_argument("--kill-leader-after", type=float, default=None, help="Kill the leader after this many seconds")
+    parser.add_argument("--lease-ttl", type=float, default=2.0, help="LEASE_TTL_SECONDS for the workers")
+    parser.add_argument("--session-store", default="database", choices=("sqlite", "database"))
+    parser.add_argument("--log-level", default="WARNING", help="Worker log level")
+    args = parser.parse_args()
+
+    # Workers read their settings at import time and inherit this environment
+    workdir = tempfile.mkdtemp(prefix="nhs-multi-worker-")
+    database_url = f"sqlite+aiosqlite:///{os.path.join(workdir, 'app.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["SESSION_STORE"] = args.session_store
+    os.environ["SESSION_STORE_SQLITE_URL"] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'sessions.db')}"
+    os.environ["LEASE_TTL_SECONDS"] = str(args.lease_ttl)
+    os.environ["REMINDER_RATE_LIMIT"] = "0"
+    os.environ["REMINDER_SCHEDULER_REFRESH_SECONDS"] = "1"
+    os.environ["REMINDER_LEAD_MINUTES"] = "1"
+    os.environ.setdefault("TWILIO_ACCOUNT_SID", "AC" + "0" * 32)
+    os.environ.setdefault("TWILIO_AUTH_TOKEN", "multi-worker")
+    os.environ["MULTI_WORKER_LOG_LEVEL"] = args.log_level
+
+    phone_numbers = seed_database(database_url, args.appointments, args.duration, lead_minutes=1)
+
+    context = multiprocessing.get_context("spawn")
+    # One queue per worker: a process killed mid-write can leave a shared queue locked
+    queues = [context.Queue() for _ in range(args.workers)]
+    ready, stop = context.Barrier(args.workers), context.Event()
+    processes = [
+        context.Process(target=worker_main, args=(index, queues[index], ready, stop, args.workers))
+        for index in range(args.workers)
+    ]
+    started = time.time()
+    for process in processes:
+        process.start()
+
+    sent, sessions, transitions = [], {}, []
+    leader, killed = None, None
+    deadline = started + args.duration + 60 + 2 * args.lease_ttl + 5
+
+    def drain() -> int:
+        received = 0
+        for index, events in enumerate(queues):
+            if index == killed:
+                continue
+            while True:
+                try:
+                    event = events.get_nowait()
+                except queue.Empty:
+                    break
+                received += 1
+                record(*event)
+        return received
+
+    def record(kind, index, value, at):
+        nonlocal leader
+        if kind == "sent":
+            sent.append((index, value))
+        elif kind == "sessions":
+            sessions[index] = value
+        else:
+            transitions.append((round(at - started, 2), kind, index))
+            if kind == "leading":
+                leader = index
+
+    # Appointments start a minute plus one second out, so reminders fall due after one second
+    while time.time() < deadline and len({phone for _, phone in sent}) < len(phone_numbers):
+        if not drain():
+            time.sleep(0.05)
+        if (args.kill_leader_after is not None and killed is None and leader is not None
+                and time.time() - started >= args.kill_leader_after):
+            killed = leader
+            processes[killed].kill()
+            transitions.append((round(time.time() - started, 2), "killed", killed))
+
+    stop.set()
+    for process in processes:
+        process.join(timeout=10)
+    time.sleep(0.2)
+    while drain():
+        pass
+
+    from sqlalchemy import create_engine, func, select
+    from db.models import appointments
+    engine = create_engine(database_url.replace("+aiosqlite", ""))
+    with engine.connect() as connection:
+        marked = connection.execute(
+            select(func.count()).select_from(appointments).where(appointments.c.reminder_sent == True)
+        ).scalar()
+    engine.dispose()
+
+    per_worker = {index: 0 for index in range(args.workers)}
+    reminded = {}
+    for index, phone in sent:
+        per_worker[index] += 1
+        reminded[phone] = reminded.get(phone, 0) + 1
+
+    print(f"Workers: {args.workers}, session store: {args.session_store}, lease TTL: {args.lease_ttl}s")
+    print(f"Reminders sent per worker: {per_worker}")
+    print(f"Appointments: {len(phone_numbers)}, reminded: {len(reminded)}, "
+          f"duplicates: {sum(count - 1 for count in reminded.values())}, "
+          f"missing: {len(phone_numbers) - len(reminded)}, marked sent: {marked}")
+    print("Leadership:")
+    for at, kind, index in transitions:
+        print(f"  {at:>7.2f}s  worker {index} {kind}")
+    print(f"Peer sessions visible per worker (of {args.workers}): {sessions}")
+
+
+if __name__ == "__main__":
+    main()
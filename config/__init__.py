@@ -0,0 +1,13 @@
+import os
+from importlib import import_module
+
+# Deployment environment: "development" reads config/dev_config.py, "production" config/prod_config.py
+APP_ENV = os.getenv("APP_ENV", "development")
+
+CONFIG_MODULES = {"development": "config.dev_config", "dev": "config.dev_config",
+                  "production": "config.prod_config", "prod": "config.prod_config"}
+
+if APP_ENV not in CONFIG_MODULES:
+    raise ValueError(f"Unknown APP_ENV {APP_ENV!r}; expected one of {', '.join(CONFIG_MODULES)}")
+
+settings = import_module(CONFIG_MODULES[APP_ENV])
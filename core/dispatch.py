@@ -0,0 +1,209 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from services.twilio_handler import send_reminder_message
+from utils.database import database
+from db.queries import get_due_reminders_page_query, mark_reminders_sent_query
+from loguru import logger
+
+# Reminder dispatch settings
+REMINDER_CONCURRENCY = int(os.getenv("REMINDER_CONCURRENCY", "10"))
+REMINDER_RATE_LIMIT = float(os.getenv("REMINDER_RATE_LIMIT", "10"))  # Messages per second, 0 for no limit
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "200"))
+REMINDER_PAGE_SIZE = int(os.getenv("REMINDER_PAGE_SIZE", "1000"))
+
+# Held while due reminders are read and sent. The /send_reminders endpoint and the scheduler
+# share one lease holder per process, so the lease alone does not stop them overlapping.
+dispatch_lock = asyncio.Lock()
+
+
+@dataclass
+class ReminderOutcome:
+    """
+    Result of sending one reminder.
+    """
+    appointment_id: int
+    phone_number: str
+    sent: bool
+    message_sid: str = None
+    error: str = None
+
+
+@dataclass
+class DispatchReport:
+    """
+    Outcomes, counts and timing for a dispatch run.
+    """
+    outcomes: list = field(default_factory=list)
+    sent: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    pages: int = 0
+
+    def record(self, outcome: ReminderOutcome):
+        self.outcomes.append(outcome)
+        if outcome.sent:
+            self.sent += 1
+        else:
+            self.failed += 1
+
+    def absorb(self, other: "DispatchReport", keep_outcomes: bool = True):
+        """
+        Add another report's counts, optionally dropping its per-message outcomes.
+        """
+        if keep_outcomes:
+            self.outcomes.extend(other.outcomes)
+        self.sent += other.sent
+        self.failed += other.failed
+
+    @property
+    def sent_ids(self) -> list:
+        return [outcome.appointment_id for outcome in self.outcomes if outcome.sent]
+
+    @property
+    def throughput(self) -> float:
+        return (self.sent + self.failed) / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "pages": self.pages,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "messages_per_second": round(self.throughput, 1),
+        }
+
+
+class RateLimiter:
+    """
+    Spaces out acquisitions so no more than `rate` happen per second across all workers.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+async def dispatch_reminders(appointments: list, send=send_reminder_message,
+                             concurrency: int = REMINDER_CONCURRENCY,
+                             rate_limit: float = REMINDER_RATE_LIMIT) -> DispatchReport:
+    """
+    Send reminders through a bounded pool of workers.
+
+    Args:
+        appointments (list): Rows with "id", "phone_number" and "appointment_time".
+        send: Coroutine function sending one reminder and returning its message SID.
+        concurrency (int): Maximum number of reminders in flight.
+        rate_limit (float): Maximum messages per second, 0 for no limit.
+
+    Returns:
+        DispatchReport: One outcome per appointment, in completion order.
+    """
+    started = time.perf_counter()
+    report = DispatchReport()
+    queue = asyncio.Queue()
+    for appointment in appointments:
+        queue.put_nowait(appointment)
+    limiter = RateLimiter(rate_limit)
+
+    async def worker():
+        while True:
+            try:
+                appointment = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            phone_number = appointment["phone_number"]
+            await limiter.acquire()
+            try:
+                message_sid = await send(phone_number, appointment["appointment_time"])
+                report.record(ReminderOutcome(appointment["id"], phone_number, True, message_sid=message_sid))
+            except Exception as e:
+                logger.error(f"Failed to send reminder for appointment {appointment['id']}: {e}")
+                report.record(ReminderOutcome(appointment["id"], phone_number, False, error=str(e)))
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(appointments)))]
+    await asyncio.gather(*workers)
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+async def mark_reminders_sent(appointment_ids: list):
+    """
+    Flag a batch of appointments as reminded with a single UPDATE.
+    """
+    if appointment_ids:
+        await database.execute(mark_reminders_sent_query(appointment_ids))
+
+
+async def send_reminders_in_batches(appointments: list, batch_size: int = REMINDER_BATCH_SIZE) -> DispatchReport:
+    """
+    Dispatch reminders batch by batch, marking each batch's successes before starting the next.
+
+    Returns:
+        DispatchReport: Combined outcomes for every batch.
+    """
+    started = time.perf_counter()
+    report = DispatchReport()
+    for offset in range(0, len(appointments), batch_size):
+        batch_report = await dispatch_reminders(appointments[offset:offset + batch_size])
+        await mark_reminders_sent(batch_report.sent_ids)
+        report.absorb(batch_report)
+    report.elapsed = time.perf_counter() - started
+
+    logger.info(
+        f"Reminder dispatch: {report.sent} sent, {report.failed} failed in {report.elapsed:.2f}s "
+        f"({report.throughput:.1f} msg/s)"
+    )
+    return report
+
+
+async def send_due_reminders(time_limit, page_size: int = REMINDER_PAGE_SIZE) -> DispatchReport:
+    """
+    Send every reminder due before `time_limit`, one keyset page at a time.
+
+    Only one page of rows is held in memory, and outcomes are summarised per page, so memory
+    stays flat however many appointments are due. Appointments whose reminder fails stay
+    unsent and are picked up by the next run. Runs under dispatch_lock, so rows are only
+    read once any dispatch already under way in this process has marked its own.
+
+    Returns:
+        DispatchReport: Counts and timing for the run; per-message outcomes are not retained.
+    """
+    async with dispatch_lock:
+        started = time.perf_counter()
+        report = DispatchReport()
+        after = None
+
+        while True:
+            page = await database.fetch_all(get_due_reminders_page_query(time_limit, after, page_size))
+            if not page:
+                break
+
+            report.absorb(await send_reminders_in_batches(page), keep_outcomes=False)
+            report.pages += 1
+
+            last = page[-1]
+            after = (last["appointment_time"], last["id"])
+            if len(page) < page_size:
+                break
+
+    report.elapsed = time.perf_counter() - started
+    logger.info(
+        f"Due reminders: {report.sent} sent, {report.failed} failed over {report.pages} pages "
+        f"in {report.elapsed:.2f}s ({report.throughput:.1f} msg/s)"
+    )
+    return report
@@ -1,56 +1,322 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from services.twilio_handler import send_reminder_message
-from utils.database import database
+import asyncio
+import heapq
+import os
 from datetime import datetime, timedelta
+from core.dispatch import dispatch_lock, send_reminders_in_batches, REMINDER_PAGE_SIZE
+from utils.database import database
+from utils.metrics import registry
+from utils.lease import DatabaseLease
+from db.queries import (
+    get_due_reminders_page_query,
+    get_pending_reminders_query,
+    get_appointments_last_updated_query,
+    get_changed_appointments_query,
+)
 from loguru import logger
 
-async def send_upcoming_appointment_reminders():
+# How long before an appointment its reminder is sent
+REMINDER_LEAD_MINUTES = float(os.getenv("REMINDER_LEAD_MINUTES", "60"))
+REMINDER_LEAD = timedelta(minutes=REMINDER_LEAD_MINUTES)
+
+# Only reminders due within this window are held in memory, and never more than MAX_JOBS of them
+REMINDER_SCHEDULER_HORIZON_HOURS = float(os.getenv("REMINDER_SCHEDULER_HORIZON_HOURS", "24"))
+REMINDER_SCHEDULER_MAX_JOBS = int(os.getenv("REMINDER_SCHEDULER_MAX_JOBS", "10000"))
+
+# How often the appointments change feed is read and the window moved forward
+REMINDER_SCHEDULER_REFRESH_SECONDS = float(os.getenv("REMINDER_SCHEDULER_REFRESH_SECONDS", "60"))
+
+# Wait before retrying a reminder that failed to send
+REMINDER_RETRY_SECONDS = float(os.getenv("REMINDER_RETRY_SECONDS", "60"))
+
+# Held by the one worker that sends reminders when the app runs in several processes
+reminder_lease = DatabaseLease("appointment_reminders")
+
+SCHEDULED_JOBS = registry.gauge("reminder_scheduler_jobs", "Reminders held in the scheduler's in-memory queue.")
+REMINDER_LATENESS = registry.histogram(
+    "reminder_scheduler_lateness_seconds", "Delay between a reminder's due time and the scheduler firing it."
+)
+
+
+class ReminderScheduler:
     """
-    Fetch upcoming appointments within the next hour, send reminders, and mark them as sent.
+    Sends each appointment reminder at its due time (REMINDER_LEAD before the appointment).
+
+    Pending reminders are kept in a min-heap keyed on due time, and a single task sleeps
+    until the earliest one. The database stays the source of truth: on start the heap is
+    loaded from unsent appointments, so anything missed while the app was down fires
+    straight away. Only reminders due within the horizon are loaded, in (appointment_time,
+    id) keyset pages, and at most max_jobs of them; `_bound` marks how far the in-memory
+    set is complete, and the rest is loaded as the heap drains or the horizon moves.
+
+    When several workers run, only the one holding the reminder lease keeps a heap and
+    sends; the others retry the lease every renew interval and load from the database
+    when they take over.
+
+    New and changed appointments reach the heap through schedule()/unschedule() when the
+    app writes them, and through a change feed on appointments.updated_at for writes made
+    elsewhere. Heap entries are invalidated lazily: an entry only fires if `_jobs` still
+    holds the same appointment time for that id.
     """
-    try:
-        # Query to fetch appointments within the next hour where reminders have not been sent
-        query = """
-            SELECT a.id, a.appointment_time, p.phone_number
-            FROM appointments a
-            JOIN patients p ON a.patient_id = p.id
-            WHERE a.reminder_sent = FALSE
-            AND a.appointment_time <= :time_limit
-        """
-        time_limit = datetime.now() + timedelta(hours=1)
-
-        # Fetch upcoming appointments
-        upcoming_appointments = await database.fetch_all(query=query, values={"time_limit": time_limit})
-
-        if not upcoming_appointments:
-            logger.info("No upcoming appointments to send reminders for.")
+
+    def __init__(self, max_jobs: int = REMINDER_SCHEDULER_MAX_JOBS,
+                 horizon: timedelta = timedelta(hours=REMINDER_SCHEDULER_HORIZON_HOURS),
+                 refresh_seconds: float = REMINDER_SCHEDULER_REFRESH_SECONDS, lease: DatabaseLease = reminder_lease):
+        self.max_jobs = max_jobs
+        self.horizon = horizon
+        self.refresh_seconds = refresh_seconds
+        self.lease = lease
+        self._heap = []
+        self._jobs = {}
+        # Every pending reminder ordered at or before this (appointment_time, id) is in _jobs
+        self._bound = None
+        # Last (appointment_time, id) read from the keyset pages
+        self._cursor = None
+        self._changes_since = None
+        self._wake = None
+        self._task = None
+        self._worker = None
+        self.fired = 0
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def leading(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self):
+        """
+        Start competing for the reminder lease; the timer runs once it is held.
+        """
+        if self.running:
             return
+        self._task = asyncio.create_task(self._lead())
 
-        # Send reminders and mark them as sent
-        for appointment in upcoming_appointments:
-            phone_number = appointment["phone_number"]
-            appointment_time = appointment["appointment_time"]
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._resign()
+        try:
+            await self.lease.release()
+        except Exception as e:
+            logger.warning(f"Could not release the reminder lease: {e}")
+        logger.info(f"Reminder scheduler stopped: {self.stats()}")
 
+    async def _lead(self):
+        """
+        Renew or retry the lease, starting the timer on taking it and stopping it on losing it.
+        """
+        while True:
             try:
-                # Send SMS reminder
-                send_reminder_message(phone_number, appointment_time)
-                logger.info(f"Sent reminder to {phone_number} for appointment at {appointment_time}.")
+                held = await self.lease.acquire()
+            except Exception as e:
+                logger.error(f"Reminder lease check failed: {e}")
+                held = False
+
+            if held and not self.leading:
+                self._worker = asyncio.create_task(self._take_over())
+            elif not held and self.leading:
+                await self._resign()
+            await asyncio.sleep(self.lease.renew_interval)
+
+    async def _take_over(self):
+        self._heap, self._jobs = [], {}
+        self._bound = self._cursor = None
+        self._changes_since = await database.fetch_val(get_appointments_last_updated_query())
+        await self._load()
+        self._wake = asyncio.Event()
+        logger.info(
+            f"Reminder scheduler leading with {len(self._jobs)} pending reminders "
+            f"(horizon: {self.horizon}, max jobs: {self.max_jobs})"
+        )
+        await self._run()
+
+    async def _resign(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        self._heap, self._jobs = [], {}
+        self._bound = self._cursor = None
+        SCHEDULED_JOBS.set(value=0)
+
+    def schedule(self, appointment_id: int, appointment_time: datetime, reminder_sent: bool = False):
+        """
+        Add or move the reminder for an appointment that was created or changed.
+
+        Appointments beyond the loaded window are left to the database; they are read in
+        when the window reaches them.
+        """
+        if reminder_sent:
+            self.unschedule(appointment_id)
+            return
+        if self._jobs.get(appointment_id) == appointment_time:
+            return
+        if self._bound is None or (appointment_time, appointment_id) > self._bound:
+            self._jobs.pop(appointment_id, None)
+            SCHEDULED_JOBS.set(value=len(self._jobs))
+            return
 
-                # Mark the reminder as sent in the database
-                update_query = "UPDATE appointments SET reminder_sent = TRUE WHERE id = :appointment_id"
-                await database.execute(query=update_query, values={"appointment_id": appointment["id"]})
+        self._push(appointment_id, appointment_time, appointment_time - REMINDER_LEAD)
+        if len(self._jobs) > self.max_jobs:
+            self._evict_latest()
+        SCHEDULED_JOBS.set(value=len(self._jobs))
+        if self._wake is not None:
+            self._wake.set()
 
+    def unschedule(self, appointment_id: int):
+        """
+        Drop the reminder for a cancelled or already reminded appointment.
+        """
+        if self._jobs.pop(appointment_id, None) is not None:
+            SCHEDULED_JOBS.set(value=len(self._jobs))
+
+    def next_due(self):
+        """
+        Return the due time of the earliest pending reminder, or None.
+        """
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def stats(self) -> dict:
+        return {
+            "leading": self.leading,
+            "jobs": len(self._jobs),
+            "heap_entries": len(self._heap),
+            "fired": self.fired,
+            "sent": self.sent,
+            "failed": self.failed,
+        }
+
+    def _push(self, appointment_id: int, appointment_time: datetime, due_at: datetime):
+        self._jobs[appointment_id] = appointment_time
+        heapq.heappush(self._heap, (due_at, appointment_id, appointment_time))
+        # Rebuild once stale entries outnumber live ones
+        if len(self._heap) > 2 * len(self._jobs) + 64:
+            self._heap = [entry for entry in self._heap if self._jobs.get(entry[1]) == entry[2]]
+            heapq.heapify(self._heap)
+
+    def _evict_latest(self):
+        """
+        Drop the latest reminder and pull the bound back so it is reloaded later.
+        """
+        appointment_id, appointment_time = max(self._jobs.items(), key=lambda job: (job[1], job[0]))
+        del self._jobs[appointment_id]
+        self._bound = self._cursor = (appointment_time, appointment_id - 1)
+
+    def _discard_stale(self):
+        while self._heap and self._jobs.get(self._heap[0][1]) != self._heap[0][2]:
+            heapq.heappop(self._heap)
+
+    async def _load(self):
+        """
+        Read pending reminders past the cursor, up to the horizon and the job limit.
+        """
+        time_limit = datetime.now() + REMINDER_LEAD + self.horizon
+        while len(self._jobs) < self.max_jobs:
+            limit = min(REMINDER_PAGE_SIZE, self.max_jobs - len(self._jobs))
+            page = await database.fetch_all(get_due_reminders_page_query(time_limit, self._cursor, limit))
+            for row in page:
+                self._push(row["id"], row["appointment_time"], row["appointment_time"] - REMINDER_LEAD)
+            if page:
+                self._cursor = self._bound = (page[-1]["appointment_time"], page[-1]["id"])
+            if len(page) < limit:
+                self._bound = (time_limit, float("inf"))
+                break
+        SCHEDULED_JOBS.set(value=len(self._jobs))
+
+    async def _apply_changes(self):
+        """
+        Reschedule appointments created or changed by other writers since the last read.
+        """
+        after = None
+        while True:
+            page = await database.fetch_all(get_changed_appointments_query(self._changes_since, after, REMINDER_PAGE_SIZE))
+            for row in page:
+                self.schedule(row["id"], row["appointment_time"], bool(row["reminder_sent"]))
+            if page:
+                after = (page[-1]["updated_at"], page[-1]["id"])
+            if len(page) < REMINDER_PAGE_SIZE:
+                break
+        # The last timestamp is read again next time, so rows written later in the same tick are not missed
+        if after is not None:
+            self._changes_since = after[0]
+
+    def _pop_due(self, now: datetime) -> dict:
+        due = {}
+        while len(due) < REMINDER_PAGE_SIZE:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            due_at, appointment_id, _ = heapq.heappop(self._heap)
+            REMINDER_LATENESS.observe(max(0.0, (now - due_at).total_seconds()))
+            due[appointment_id] = self._jobs.pop(appointment_id)
+        SCHEDULED_JOBS.set(value=len(self._jobs))
+        return due
+
+    async def _fire(self, due: dict):
+        """
+        Send the reminders that are due, re-checking the database so none is sent twice.
+
+        The check and the send run under dispatch_lock, so a /send_reminders run in this
+        process has marked its rows before they are read here.
+        """
+        self.fired += len(due)
+        async with dispatch_lock:
+            rows = await database.fetch_all(get_pending_reminders_query(list(due)))
+            if not rows:
+                return
+            report = await send_reminders_in_batches(rows)
+        self.sent += report.sent
+        self.failed += report.failed
+
+        retry_at = datetime.now() + timedelta(seconds=REMINDER_RETRY_SECONDS)
+        for outcome in report.outcomes:
+            appointment_time = due[outcome.appointment_id]
+            if not outcome.sent and appointment_time > retry_at:
+                self._push(outcome.appointment_id, appointment_time, retry_at)
+        SCHEDULED_JOBS.set(value=len(self._jobs))
+
+    async def _refresh(self):
+        await self._apply_changes()
+        if len(self._jobs) < self.max_jobs:
+            await self._load()
+
+    async def _run(self):
+        next_refresh = datetime.now() + timedelta(seconds=self.refresh_seconds)
+        while True:
+            try:
+                now = datetime.now()
+                if now >= next_refresh:
+                    await self._refresh()
+                    next_refresh = now + timedelta(seconds=self.refresh_seconds)
+
+                due = self._pop_due(now)
+                if due:
+                    await self._fire(due)
+                    # Keep the heap topped up while working through a backlog
+                    if len(self._jobs) < self.max_jobs // 2:
+                        await self._load()
+                    continue
+
+                wake_at = min(filter(None, (self.next_due(), next_refresh)))
+                self._wake.clear()
+                # asyncio.wait rather than wait_for, which drops a cancel that lands as the event is set
+                woken = asyncio.ensure_future(self._wake.wait())
+                try:
+                    await asyncio.wait({woken}, timeout=max(0.0, (wake_at - datetime.now()).total_seconds()))
+                finally:
+                    woken.cancel()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Failed to send reminder for appointment {appointment['id']}: {e}")
+                logger.error(f"Reminder scheduler error: {e}")
+                await asyncio.sleep(REMINDER_RETRY_SECONDS)
 
-    except Exception as e:
-        logger.error(f"Error in sending appointment reminders: {e}")
 
-def setup_scheduler():
-    """
-    Setup the AsyncIO scheduler for sending reminders every 10 minutes.
-    """
-    scheduler = AsyncIOScheduler()
-    scheduler.add_job(send_upcoming_appointment_reminders, "interval", minutes=10)
-    scheduler.start()
-    logger.info("Scheduler started: Appointment reminders will be sent every 10 minutes.")
+reminder_scheduler = ReminderScheduler()
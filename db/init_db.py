@@ -1,22 +1,18 @@
 # File: db/init_db.py
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
-from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.ext.asyncio import AsyncEngine
 from db.models import metadata
+from db.migrations import run_migrations
 from loguru import logger
-import os
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-async def init_db():
+async def init_db(engine: AsyncEngine):
     """
-    Initialize the database and create all tables asynchronously.
+    Initialize the database and create all tables asynchronously on the app's engine.
     """
     try:
         logger.info("Initializing the database...")
-        engine = create_async_engine(DATABASE_URL, echo=True)  # Use async engine
         async with engine.begin() as conn:  # Use async connection
             await conn.run_sync(metadata.create_all)  # Run synchronous DDL operations in async mode
-        await engine.dispose()
+            await conn.run_sync(run_migrations)  # Upgrade tables created by older versions
         logger.info("Database tables created successfully.")
     except Exception as e:
         logger.error(f"Failed to initialize the database: {e}")
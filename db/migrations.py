@@ -0,0 +1,112 @@
+# File: db/migrations.py
+import ast
+import warnings
+from sqlalchemy import Column, DateTime, String, exc, inspect, select, text
+from sqlalchemy.schema import CreateIndex
+from db.models import metadata, responses, consultation_summaries
+from db.queries import consultation_summary_values
+from loguru import logger
+
+def add_calls_call_sid(connection):
+    """
+    Add the calls.call_sid column to databases created before it was declared.
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("calls")}
+    if "call_sid" not in columns:
+        connection.execute(text("ALTER TABLE calls ADD COLUMN call_sid VARCHAR(64)"))
+        logger.info("Added calls.call_sid column.")
+
+def convert_calls_call_duration(connection):
+    """
+    Store calls.call_duration as seconds instead of a TIMESTAMP.
+
+    Older versions wrote a timedelta into the TIMESTAMP column, which every driver
+    rejected, so those calls have no end time or duration to carry over. SQLite keeps
+    the declared type but stores the seconds as REAL, so only PostgreSQL needs the ALTER.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    column = next(column for column in inspect(connection).get_columns("calls") if column["name"] == "call_duration")
+    if isinstance(column["type"], DateTime):
+        connection.execute(text(
+            "ALTER TABLE calls ALTER COLUMN call_duration TYPE DOUBLE PRECISION "
+            "USING EXTRACT(EPOCH FROM call_end - call_start)"
+        ))
+        logger.info("Converted calls.call_duration to seconds.")
+
+def widen_consultation_summaries_full_name(connection):
+    """
+    Store consultation_summaries.full_name as TEXT instead of VARCHAR(100), which rejected
+    longer names. SQLite does not enforce VARCHAR lengths, so only PostgreSQL needs the ALTER.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    columns = inspect(connection).get_columns("consultation_summaries")
+    column = next(column for column in columns if column["name"] == "full_name")
+    if isinstance(column["type"], String) and column["type"].length is not None:
+        connection.execute(text("ALTER TABLE consultation_summaries ALTER COLUMN full_name TYPE TEXT"))
+        logger.info("Widened consultation_summaries.full_name to TEXT.")
+
+def create_missing_indexes(connection):
+    """
+    Create any index declared in db.models that the database does not have yet.
+
+    create_all() skips indexes on tables that already exist, so they are checked here.
+    Expression indexes are not reflected by every backend (SQLite skips them), so those
+    are created with IF NOT EXISTS instead.
+    """
+    for table in metadata.sorted_tables:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", exc.SAWarning)
+            existing = {index["name"] for index in inspect(connection).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if all(isinstance(expression, Column) for expression in index.expressions):
+                index.create(bind=connection)
+                logger.info(f"Created index {index.name} on {table.name}.")
+            else:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+def backfill_consultation_summaries(connection):
+    """
+    Copy final summaries saved as a Python repr in responses into consultation_summaries.
+    """
+    legacy = connection.execute(
+        select(responses.c.call_id, responses.c.response)
+        .outerjoin(consultation_summaries, consultation_summaries.c.call_id == responses.c.call_id)
+        .where(responses.c.question == "Final Summary", consultation_summaries.c.id.is_(None))
+    ).fetchall()
+    rows, seen = [], set()
+    for call_id, response in legacy:
+        if call_id in seen:
+            continue
+        try:
+            patient_data = ast.literal_eval(response)
+        except (ValueError, SyntaxError):
+            logger.warning(f"Skipped unreadable final summary for call {call_id}.")
+            continue
+        seen.add(call_id)
+        rows.append(consultation_summary_values(call_id, patient_data))
+    if rows:
+        connection.execute(consultation_summaries.insert(), rows)
+        logger.info(f"Copied {len(rows)} final summaries into consultation_summaries.")
+
+# Applied in order on every startup; each step must be idempotent
+MIGRATIONS = [
+    add_calls_call_sid,
+    convert_calls_call_duration,
+    widen_consultation_summaries_full_name,
+    create_missing_indexes,
+    backfill_consultation_summaries,
+]
+
+def run_migrations(connection):
+    """
+    Bring an existing schema up to date with db.models.
+
+    Args:
+        connection: A synchronous SQLAlchemy connection (use AsyncConnection.run_sync).
+    """
+    for migration in MIGRATIONS:
+        migration(connection)
@@ -1,6 +1,6 @@
 # File: db/models.py
 from sqlalchemy import (
-    MetaData, Table, Column, Integer, String, Boolean, Text, TIMESTAMP, ForeignKey
+    MetaData, Table, Column, Integer, String, Boolean, Text, Date, Float, TIMESTAMP, ForeignKey, Index
 )
 from sqlalchemy.sql import func  # Import func for SQL functions like now()
 
@@ -23,9 +23,29 @@ calls = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("patient_id", Integer, ForeignKey("patients.id", ondelete="CASCADE")),
+    Column("call_sid", String(64)),
     Column("call_start", TIMESTAMP, nullable=False, default=func.now()),
     Column("call_end", TIMESTAMP),
-    Column("call_duration", TIMESTAMP, nullable=True),
+    Column("call_duration", Float, nullable=True),  # Seconds
+)
+
+# Most recent call per patient (get_recent_call_query)
+Index("ix_calls_patient_id_call_start", calls.c.patient_id, calls.c.call_start)
+# Webhook lookup of an in-progress call by Twilio's CallSid
+Index("ux_calls_call_sid", calls.c.call_sid, unique=True)
+# Date-range exports, read in (call_start, id) pages
+Index("ix_calls_call_start", calls.c.call_start, calls.c.id)
+
+# Finalized calls per hour and per day, split into call-duration buckets; maintained by
+# finalize_call so dashboards read a few rows per period instead of scanning calls
+call_rollups = Table(
+    "call_rollups",
+    metadata,
+    Column("granularity", String(8), primary_key=True),  # "hour" or "day"
+    Column("period_start", TIMESTAMP, primary_key=True),
+    Column("bucket", Integer, primary_key=True),  # Lower bound of the duration bucket, in seconds
+    Column("calls", Integer, nullable=False, default=0),
+    Column("duration_seconds", Float, nullable=False, default=0),
 )
 
 # Responses table
@@ -40,6 +60,35 @@ responses = Table(
     Column("created_at", TIMESTAMP, default=func.now()),  # Fixed here
 )
 
+# Responses of a call, in the order they were given
+Index("ix_responses_call_id", responses.c.call_id, responses.c.id)
+
+# Final consultation summaries, one typed column per field of the JSON summary Grok returns
+consultation_summaries = Table(
+    "consultation_summaries",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("call_id", Integer, ForeignKey("calls.id", ondelete="CASCADE")),
+    Column("full_name", Text),
+    Column("date_of_birth", Date),
+    Column("phone_number", String(32)),
+    Column("reason_for_appointment", Text),
+    Column("experienced_before", Boolean),
+    Column("duration_of_symptoms", Text),
+    Column("current_medication", Text),
+    Column("known_allergies", Text),
+    Column("additional_notes", Text),
+    Column("created_at", TIMESTAMP, default=func.now()),
+)
+
+# One summary per call; save_consultation_summaries upserts on it
+Index("ux_consultation_summaries_call_id", consultation_summaries.c.call_id, unique=True)
+# Lookups by date of birth and by E.164 phone number (find_consultation_summaries_query)
+Index("ix_consultation_summaries_date_of_birth", consultation_summaries.c.date_of_birth)
+Index("ix_consultation_summaries_phone_number", consultation_summaries.c.phone_number)
+# Case-insensitive prefix search on the reason for the appointment
+Index("ix_consultation_summaries_reason", func.lower(consultation_summaries.c.reason_for_appointment))
+
 # Appointments table
 appointments = Table(
     "appointments",
@@ -51,3 +100,33 @@ appointments = Table(
     Column("created_at", TIMESTAMP, default=func.now()),  # Fixed here
     Column("updated_at", TIMESTAMP, default=func.now(), onupdate=func.now()),  # Fixed here
 )
+
+# Pending reminders only, in the (appointment_time, id) order the reminder pages are read in
+Index(
+    "ix_appointments_pending_reminders",
+    appointments.c.appointment_time,
+    appointments.c.id,
+    postgresql_where=appointments.c.reminder_sent == False,
+    sqlite_where=appointments.c.reminder_sent == False,
+)
+# Change feed read by the reminder scheduler to pick up new and rescheduled appointments
+Index("ix_appointments_updated_at", appointments.c.updated_at, appointments.c.id)
+
+# Per-call state shared between workers (conversation progress, queued reply audio)
+call_sessions = Table(
+    "call_sessions",
+    metadata,
+    Column("key", String(128), primary_key=True),
+    Column("data", Text, nullable=False),
+    Column("expires_at", TIMESTAMP, nullable=False),
+    Column("updated_at", TIMESTAMP, default=func.now(), onupdate=func.now()),
+)
+
+# Named leases held by one worker at a time (e.g. the reminder scheduler)
+leases = Table(
+    "leases",
+    metadata,
+    Column("name", String(64), primary_key=True),
+    Column("holder", String(128), nullable=False),
+    Column("expires_at", TIMESTAMP, nullable=False),
+)
@@ -1,7 +1,8 @@
 # File: db/queries.py
 
-from sqlalchemy.sql import select
-from db.models import patients, calls, responses, appointments
+from sqlalchemy.sql import select, tuple_, func
+from db.models import patients, calls, responses, appointments, consultation_summaries
+from utils.validators import ConsultationSummary
 
 def get_patient_by_phone_query(phone_number: str):
     """
@@ -9,6 +10,12 @@ def get_patient_by_phone_query(phone_number: str):
     """
     return select(patients).where(patients.c.phone_number == phone_number)
 
+def get_patient_id_by_phone_query(phone_numbers: list):
+    """
+    Fetch the id of the patient whose phone number matches any of the given spellings.
+    """
+    return select(patients.c.id).where(patients.c.phone_number.in_(phone_numbers)).limit(1)
+
 def get_recent_call_query(patient_id: int):
     """
     Fetch the most recent call for a patient.
@@ -39,3 +46,128 @@ def get_appointments_within_hour_query():
         .where(appointments.c.appointment_time <= one_hour_later)
         .where(appointments.c.reminder_sent == False)
     )
+
+def mark_reminders_sent_query(appointment_ids: list):
+    """
+    Mark a batch of appointments as reminded in a single statement.
+    """
+    return (
+        appointments.update()
+        .where(appointments.c.id.in_(appointment_ids))
+        .values(reminder_sent=True)
+    )
+
+def get_due_reminders_page_query(time_limit, after=None, limit: int = 500):
+    """
+    Fetch one page of appointments due a reminder, joined with the patient's phone number.
+
+    Pages are ordered by (appointment_time, id); pass the last row's pair as `after`
+    to fetch the next page without an OFFSET scan.
+    """
+    query = (
+        select(appointments.c.id, appointments.c.appointment_time, patients.c.phone_number)
+        .select_from(appointments.join(patients, appointments.c.patient_id == patients.c.id))
+        .where(appointments.c.reminder_sent == False)
+        .where(appointments.c.appointment_time <= time_limit)
+    )
+    if after is not None:
+        query = query.where(tuple_(appointments.c.appointment_time, appointments.c.id) > tuple_(*after))
+    return query.order_by(appointments.c.appointment_time, appointments.c.id).limit(limit)
+
+def get_pending_reminders_query(appointment_ids: list):
+    """
+    Fetch the given appointments that are still due a reminder, with the patient's phone number.
+    """
+    return (
+        select(appointments.c.id, appointments.c.appointment_time, patients.c.phone_number)
+        .select_from(appointments.join(patients, appointments.c.patient_id == patients.c.id))
+        .where(appointments.c.id.in_(appointment_ids))
+        .where(appointments.c.reminder_sent == False)
+        .order_by(appointments.c.appointment_time, appointments.c.id)
+    )
+
+def get_appointments_last_updated_query():
+    """
+    Fetch the most recent appointments.updated_at, the starting point for the change feed.
+    """
+    return select(func.max(appointments.c.updated_at))
+
+def get_changed_appointments_query(since, after=None, limit: int = 500):
+    """
+    Fetch one page of appointments created or changed at or after `since`.
+
+    Pages are ordered by (updated_at, id); pass the last row's pair as `after` for the next page.
+    """
+    query = select(
+        appointments.c.id, appointments.c.appointment_time, appointments.c.reminder_sent, appointments.c.updated_at
+    )
+    if since is not None:
+        query = query.where(appointments.c.updated_at >= since)
+    if after is not None:
+        query = query.where(tuple_(appointments.c.updated_at, appointments.c.id) > tuple_(*after))
+    return query.order_by(appointments.c.updated_at, appointments.c.id).limit(limit)
+
+def consultation_summary_values(call_id: int, patient_data: dict) -> dict:
+    """
+    Typed column values for one call's final summary (see ConsultationSummary).
+    """
+    return {"call_id": call_id, **ConsultationSummary(**patient_data).model_dump()}
+
+def find_consultation_summaries_query(date_of_birth=None, phone_number: str = None, reason: str = None,
+                                      limit: int = 100):
+    """
+    Fetch final summaries by date of birth, E.164 phone number and/or a case-insensitive
+    prefix of the reason for the appointment; each filter is served by its own index.
+    """
+    query = select(consultation_summaries)
+    if date_of_birth is not None:
+        query = query.where(consultation_summaries.c.date_of_birth == date_of_birth)
+    if phone_number is not None:
+        query = query.where(consultation_summaries.c.phone_number == phone_number)
+    if reason:
+        # A range rather than LIKE, so the lower() expression index is used on every backend
+        prefix = reason.lower()
+        lowered = func.lower(consultation_summaries.c.reason_for_appointment)
+        query = query.where(lowered >= prefix, lowered < prefix + "\uffff")
+    return query.order_by(consultation_summaries.c.id.desc()).limit(limit)
+
+def get_export_calls_page_query(start, end, after=None, limit: int = 500):
+    """
+    Fetch a page of calls started in [start, end) with their patient and final consultation
+    summary, in (call_start, id) order. Each call has at most one summary, so there is one
+    row per call.
+
+    Args:
+        after (tuple): The (call_start, id) of the last call of the previous page.
+    """
+    query = (
+        select(
+            calls.c.id.label("call_id"),
+            calls.c.call_sid,
+            calls.c.call_start,
+            calls.c.call_end,
+            calls.c.patient_id,
+            patients.c.name.label("patient_name"),
+            patients.c.phone_number.label("patient_phone_number"),
+            consultation_summaries.c.full_name,
+            consultation_summaries.c.date_of_birth,
+            consultation_summaries.c.phone_number,
+            consultation_summaries.c.reason_for_appointment,
+            consultation_summaries.c.experienced_before,
+            consultation_summaries.c.duration_of_symptoms,
+            consultation_summaries.c.current_medication,
+            consultation_summaries.c.known_allergies,
+            consultation_summaries.c.additional_notes,
+            consultation_summaries.c.created_at.label("summary_created_at"),
+        )
+        .select_from(
+            calls.outerjoin(patients, patients.c.id == calls.c.patient_id)
+            .outerjoin(consultation_summaries, consultation_summaries.c.call_id == calls.c.id)
+        )
+        .where(calls.c.call_start >= start, calls.c.call_start < end)
+        .order_by(calls.c.call_start, calls.c.id)
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(tuple_(calls.c.call_start, calls.c.id) > tuple_(*after))
+    return query
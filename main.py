@@ -1,21 +1,51 @@
 # File: main.py
 # Entry point for the FastAPI application
 
+# Settings are read from the environment when modules are imported, so .env is loaded first
+from dotenv import load_dotenv
+
+load_dotenv()
+
 from fastapi import FastAPI
-from fastapi.routing import APIRouter
 from api.calls import call_router
 from api.reminders import reminder_router
-from api.twilio_webhook import twilio_webhook_router  # Import the Twilio webhook router
+from api.twilio_webhook import twilio_webhook_router, ERROR_APOLOGY  # Import the Twilio webhook router
+from api.voice_interaction import voice_router
+from api.media_stream import media_stream_router
+from api.metrics import metrics_router
+from api.export import EXPORT_API_KEY, export_router
 from utils.logger import configure_logger
 from utils.database import initialize_database, close_database
-from dotenv import load_dotenv
+from utils.service_registry import service_registry
+from services.eleven_labs_handler import close_tts_client, prewarm_tts_cache
+from services.grok_handler import CONSULTATION_QUESTIONS, get_grok_client
+from services.tts_cache import tts_cache
+from services.sheets_handler import sheets_writer, get_worksheet
+from services.patient_resolver import patient_resolver
+from services.twilio_handler import twilio_adapter
+from services.assembly_ai_handler import asr_pool
+from core.scheduler import reminder_scheduler
+from services.session_store import session_store
+import asyncio
 import contextlib
 
-load_dotenv()
-
 # Configure logging
 logger = configure_logger()
 
+# Started in this order by app_lifespan and stopped in reverse; provider clients are
+# created on first use and warmed up in the background after boot
+service_registry.register("database", start=initialize_database, stop=close_database)
+service_registry.register("session_store", start=session_store.start, stop=session_store.stop)
+service_registry.register("patient_resolver", start=patient_resolver.start, stop=patient_resolver.stop)
+service_registry.register("sheets", start=sheets_writer.start, stop=sheets_writer.stop,
+                          warm_up=lambda: asyncio.to_thread(get_worksheet))
+service_registry.register("twilio", stop=twilio_adapter.close, warm_up=twilio_adapter.get_client)
+service_registry.register("grok", warm_up=get_grok_client)
+service_registry.register("tts", stop=close_tts_client,
+                          warm_up=lambda: prewarm_tts_cache(CONSULTATION_QUESTIONS + [ERROR_APOLOGY]))
+service_registry.register("asr_pool", start=asr_pool.start, stop=asr_pool.stop)
+service_registry.register("reminder_scheduler", start=reminder_scheduler.start, stop=reminder_scheduler.stop)
+
 # Define lifespan for app lifecycle events
 @contextlib.asynccontextmanager
 async def app_lifespan(app: FastAPI):
@@ -23,10 +53,11 @@ async def app_lifespan(app: FastAPI):
     Lifespan event handler for app lifecycle management.
     """
     logger.info("Starting NHS Consultation Assistant...")
-    await initialize_database()
+    await service_registry.start()
     yield  # The application runs while paused here
     logger.info("Shutting down NHS Consultation Assistant...")
-    await close_database()
+    logger.info(f"TTS cache stats: {tts_cache.stats()}")
+    await service_registry.stop()
 
 # Create FastAPI app with lifespan
 app = FastAPI(lifespan=app_lifespan)
@@ -35,6 +66,13 @@ app = FastAPI(lifespan=app_lifespan)
 app.include_router(call_router, prefix="/calls", tags=["Calls"])
 app.include_router(reminder_router, prefix="/reminders", tags=["Reminders"])
 app.include_router(twilio_webhook_router, prefix="/twilio", tags=["Twilio Webhooks"])  # Add this line
+app.include_router(voice_router, tags=["Voice"])
+app.include_router(media_stream_router, prefix="/stream", tags=["Media Streams"])
+app.include_router(metrics_router, tags=["Metrics"])
+if EXPORT_API_KEY:
+    app.include_router(export_router, prefix="/export", tags=["Export"])
+else:
+    logger.info("EXPORT_API_KEY is not set; GET /export/calls is disabled.")
 
 if __name__ == "__main__":
     import uvicorn
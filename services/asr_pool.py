@@ -0,0 +1,210 @@
+import asyncio
+import os
+import time
+from collections import deque
+from loguru import logger
+from utils.metrics import registry
+
+# Idle, pre-connected sessions kept ready; roughly the number of calls expected to start together
+ASR_POOL_SIZE = int(os.getenv("ASR_POOL_SIZE", "4"))
+
+# How often idle sessions are pinged, and how long a ping may take
+ASR_POOL_HEALTH_INTERVAL = float(os.getenv("ASR_POOL_HEALTH_INTERVAL", "15"))
+ASR_POOL_PING_TIMEOUT = float(os.getenv("ASR_POOL_PING_TIMEOUT", "2"))
+
+# Idle sessions older than this are replaced before the provider times them out
+ASR_POOL_MAX_IDLE_SECONDS = float(os.getenv("ASR_POOL_MAX_IDLE_SECONDS", "60"))
+
+# Wait after a failed connection attempt before refilling again
+ASR_POOL_RETRY_DELAY = float(os.getenv("ASR_POOL_RETRY_DELAY", "5"))
+
+POOL_ACQUISITIONS = registry.counter(
+    "asr_pool_acquisitions_total", "ASR sessions handed to calls, by whether a pre-connected one was ready.", ("result",)
+)
+POOL_RECONNECTS = registry.counter(
+    "asr_pool_reconnects_total", "Idle ASR sessions replaced after failing a health check or expiring."
+)
+POOL_IDLE = registry.gauge("asr_pool_idle_sessions", "Pre-connected ASR sessions waiting for a call.")
+
+
+def _is_open(websocket) -> bool:
+    state = getattr(websocket, "state", None)
+    return state is None or getattr(state, "name", "OPEN") == "OPEN"
+
+
+class ASRSessionPool:
+    """
+    Keeps authenticated real-time ASR sessions connected ahead of demand.
+
+    Each call takes one session with acquire() and closes it when done; sessions are
+    never reused. A background task tops the pool up after every acquisition, pings idle
+    sessions every ASR_POOL_HEALTH_INTERVAL seconds and replaces any that fail or have
+    been idle longer than ASR_POOL_MAX_IDLE_SECONDS. When the pool is empty, or a call asks
+    for a different audio format, acquire() connects directly and counts a miss.
+    """
+
+    def __init__(self, connect, sample_rate: int, encoding: str, size: int = ASR_POOL_SIZE):
+        self.connect = connect
+        self.sample_rate = sample_rate
+        self.encoding = encoding
+        self.size = size
+        self._idle = deque()
+        self._connecting = 0
+        self._wake = None
+        self._task = None
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+        self.connect_failures = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """
+        Start filling the pool in the background; does not wait for connections.
+        """
+        if self.running or self.size <= 0:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._maintain())
+        logger.info(f"ASR session pool started (size: {self.size}, format: {self.encoding} at {self.sample_rate} Hz)")
+
+    async def stop(self):
+        """
+        Stop replenishing and close every idle session.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while self._idle:
+            websocket, _ = self._idle.popleft()
+            await self._close(websocket)
+        POOL_IDLE.set(value=0)
+        logger.info(f"ASR session pool stopped: {self.stats()}")
+
+    async def acquire(self, sample_rate: int = None, encoding: str = None):
+        """
+        Return a connected ASR session, pre-connected if one is ready.
+        """
+        sample_rate = sample_rate or self.sample_rate
+        encoding = encoding or self.encoding
+        if (sample_rate, encoding) == (self.sample_rate, self.encoding):
+            while self._idle:
+                websocket, _ = self._idle.popleft()
+                POOL_IDLE.set(value=len(self._idle))
+                if _is_open(websocket):
+                    self.hits += 1
+                    POOL_ACQUISITIONS.inc("hit")
+                    self._replenish()
+                    return websocket
+                self.reconnects += 1
+                POOL_RECONNECTS.inc()
+                await self._close(websocket)
+
+        self.misses += 1
+        POOL_ACQUISITIONS.inc("miss")
+        self._replenish()
+        return await self.connect(sample_rate=sample_rate, encoding=encoding)
+
+    def stats(self) -> dict:
+        acquisitions = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / acquisitions, 3) if acquisitions else 0.0,
+            "reconnects": self.reconnects,
+            "connect_failures": self.connect_failures,
+            "idle": len(self._idle),
+        }
+
+    def _replenish(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _maintain(self):
+        next_check = time.monotonic() + ASR_POOL_HEALTH_INTERVAL
+        while True:
+            if time.monotonic() >= next_check:
+                await self._check_idle()
+                next_check = time.monotonic() + ASR_POOL_HEALTH_INTERVAL
+
+            if not await self._fill():
+                await asyncio.sleep(ASR_POOL_RETRY_DELAY)
+                continue
+
+            self._wake.clear()
+            # asyncio.wait rather than wait_for, which drops a cancel that lands as the event is set
+            woken = asyncio.ensure_future(self._wake.wait())
+            try:
+                await asyncio.wait({woken}, timeout=max(0.0, next_check - time.monotonic()))
+            finally:
+                woken.cancel()
+
+    async def _fill(self) -> bool:
+        """
+        Open sessions until the pool is full; returns False if any connection failed.
+        """
+        missing = self.size - len(self._idle) - self._connecting
+        if missing <= 0:
+            return True
+        self._connecting += missing
+        try:
+            results = await asyncio.gather(
+                *[self.connect(sample_rate=self.sample_rate, encoding=self.encoding) for _ in range(missing)],
+                return_exceptions=True,
+            )
+        finally:
+            self._connecting -= missing
+
+        healthy = True
+        for result in results:
+            if isinstance(result, Exception):
+                healthy = False
+                self.connect_failures += 1
+                logger.warning(f"ASR pool could not open a session: {result}")
+            else:
+                self._idle.append((result, time.monotonic()))
+        POOL_IDLE.set(value=len(self._idle))
+        return healthy
+
+    async def _check_idle(self):
+        """
+        Ping idle sessions and drop those that are closed, unresponsive or too old.
+
+        Sessions stay available to acquire() while they are checked.
+        """
+        now = time.monotonic()
+        checked = list(self._idle)
+        results = await asyncio.gather(
+            *[self._healthy(websocket, opened_at, now) for websocket, opened_at in checked]
+        )
+        for entry, healthy in zip(checked, results):
+            if healthy or entry not in self._idle:
+                continue
+            self._idle.remove(entry)
+            self.reconnects += 1
+            POOL_RECONNECTS.inc()
+            await self._close(entry[0])
+        POOL_IDLE.set(value=len(self._idle))
+
+    async def _healthy(self, websocket, opened_at: float, now: float) -> bool:
+        if not _is_open(websocket) or now - opened_at > ASR_POOL_MAX_IDLE_SECONDS:
+            return False
+        ping = getattr(websocket, "ping", None)
+        if ping is None:
+            return True
+        try:
+            pong = await ping()
+            await asyncio.wait_for(pong, ASR_POOL_PING_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    async def _close(self, websocket):
+        try:
+            await websocket.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled ASR session: {e}")
@@ -2,39 +2,88 @@ import websockets
 import json
 import os
 from services.grok_handler import process_response
-from services.eleven_labs_handler import synthesize_speech
-from twilio.rest import Client
+from services.eleven_labs_handler import synthesize_speech_async
+from services.speech_pipeline import (
+    STREAMING_TTS_ENABLED, build_play_twiml, register_pending_audio, respond_with_speech
+)
+from services.asr_pool import ASRSessionPool
+from services.twilio_handler import update_call_twiml
+from utils.metrics import instrumented
 from loguru import logger
 
 ASSEMBLY_AI_API_KEY = os.getenv("ASSEMBLY_AI_API_KEY")
-TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
+ASSEMBLY_AI_REALTIME_URL = "wss://api.assemblyai.com/v2/realtime/ws"
 
-async def stream_audio_to_assembly_ai(call_sid: str, twilio_client: Client):
+# Format sent to the ASR: "pcm_s16le" transcodes call audio to linear PCM at ASR_SAMPLE_RATE,
+# "pcm_mulaw" forwards Twilio's 8 kHz audio as is
+ASR_ENCODING = os.getenv("ASR_ENCODING", "pcm_s16le")
+ASR_SAMPLE_RATE = int(os.getenv("ASR_SAMPLE_RATE", "16000")) if ASR_ENCODING == "pcm_s16le" else 8000
+
+async def connect_to_assembly_ai(sample_rate: int = 8000, encoding: str = "pcm_mulaw"):
+    """
+    Open an authenticated AssemblyAI real-time session for audio in the given format.
+    """
+    url = f"{ASSEMBLY_AI_REALTIME_URL}?sample_rate={sample_rate}&encoding={encoding}"
+    websocket = await websockets.connect(url, additional_headers={"Authorization": ASSEMBLY_AI_API_KEY})
+    logger.info("Connected to AssemblyAI for real-time transcription.")
+    return websocket
+
+# Pre-connected sessions in the format calls use; started from the app lifespan
+asr_pool = ASRSessionPool(connect_to_assembly_ai, ASR_SAMPLE_RATE, ASR_ENCODING)
+
+async def respond_to_transcript(call_sid: str, text: str, conversation, speculation=None):
     """
-    Stream live audio to AssemblyAI and process real-time transcriptions.
+    Answer a final transcript: run it through Grok, synthesize the reply and play it on the call.
+
+    Args:
+        speculation (Speculation): A matching Grok request already started from a partial
+            transcript; its reply is used instead of asking again.
+
+    Returns:
+        The reply text, or a future resolving to it once a streamed reply is complete
+        (None if it failed); pass it to complete_turn.
     """
-    url = "wss://api.assemblyai.com/v2/realtime/ws"
-    headers = {"Authorization": ASSEMBLY_AI_API_KEY}
+    logger.info(f"Transcription: {text}")
+
+    if STREAMING_TTS_ENABLED:
+        # Stream Grok's reply into speech and play the first sentence right away
+        tokens = speculation.tokens() if speculation else None
+        audio_url, remaining_audio, grok_reply = await respond_with_speech(text, conversation, tokens)
+        if audio_url:
+            register_pending_audio(call_sid, remaining_audio)
+            await update_call_twiml(call_sid, build_play_twiml(audio_url, call_sid))
+        return grok_reply
 
-    async with websockets.connect(url, extra_headers=headers) as websocket:
-        logger.info("Connected to AssemblyAI for real-time transcription.")
+    # Process transcription through Grok
+    if speculation:
+        grok_response = await speculation.result()
+    else:
+        grok_response, _ = await process_response(text, conversation)
 
+    # Generate speech with ElevenLabs
+    audio_url = await synthesize_speech_async(grok_response)
+
+    # Twilio plays the response, then redirects back to keep the call open
+    await update_call_twiml(call_sid, build_play_twiml(audio_url, call_sid))
+    return grok_response
+
+@instrumented("stream_audio_to_assembly_ai", "assemblyai", call_id_arg="call_sid")
+async def stream_audio_to_assembly_ai(call_sid: str) -> str:
+    """
+    Stream live audio to AssemblyAI and return the caller's next final transcript.
+    """
+    async with await asr_pool.acquire() as websocket:
         try:
             # Listen to AssemblyAI's responses
             async for message in websocket:
                 data = json.loads(message)
 
-                if "text" in data:
-                    logger.info(f"Transcription: {data['text']}")
-
-                    # Process transcription through Grok
-                    _, grok_response = process_response(data["text"])
-
-                    # Generate speech response with ElevenLabs
-                    audio_url = synthesize_speech(grok_response)
-
-                    # Twilio plays the response
-                    twilio_client.calls(call_sid).update(twiml=f'<Response><Play>{audio_url}</Play></Response>')
+                if data.get("message_type") == "FinalTranscript" and data.get("text"):
+                    logger.info(f"Transcription for call {call_sid}: {data['text']}")
+                    return data["text"]
 
         except Exception as e:
             logger.error(f"Error in AssemblyAI streaming: {e}")
+            raise
+
+    raise ConnectionError(f"AssemblyAI session for call {call_sid} ended without a transcript")
@@ -1,31 +1,81 @@
-from services.grok_handler import process_response, extract_patient_data
-from services.sheets_handler import save_to_sheet
+from services.grok_handler import extract_patient_data, save_conversation
+from services.patient_resolver import patient_resolver
+from services.sheets_handler import sheets_writer
 from utils.database import database  # Only the database instance
-from db.models import responses, calls  # Import responses and calls from db.models
+from db.models import calls, consultation_summaries
+from db.queries import consultation_summary_values
+from services.call_stats import record_call_rollups
+from core.logic import calculate_call_duration
+from utils.metrics import instrumented, record_stage_error
 from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+import asyncio
+import json
 from loguru import logger
 
 
-async def handle_call_response(call_id: int, patient_input: str, conversation_history: list):
+async def start_call(call_sid: str, caller_number: str = None) -> int:
     """
-    Handles processing a patient's response during a call.
+    Return the id of the call session for a Twilio call, creating it on the first request.
+
+    A new call is linked to the patient when the caller's number is recognised.
+    """
+    existing_call = await database.fetch_one(calls.select().where(calls.c.call_sid == call_sid))
+    if existing_call:
+        logger.info(f"Resuming existing call: {existing_call['id']}")
+        return existing_call["id"]
+
+    patient_id = await patient_resolver.resolve(caller_number) if caller_number else None
+    call_id = await database.execute(
+        calls.insert().values(
+            call_sid=call_sid,
+            call_start=datetime.now(),
+            patient_id=patient_id,
+        )
+    )
+    logger.info(f"Started new call session with ID: {call_id}")
+    return call_id
+
+
+async def complete_turn(call_id: int, call_sid: str, grok_reply, conversation):
+    """
+    Save the reply Grok gave this turn and the conversation state, and finalize the call record.
+
+    Args:
+        grok_reply: The reply text, or a future resolving to it when the reply was streamed;
+            it is awaited first, so the saved state includes the reply.
+    """
+    if isinstance(grok_reply, asyncio.Future):
+        grok_reply = await grok_reply
+    if grok_reply is None:
+        logger.warning(f"No complete reply for call {call_id}; nothing to save from this turn")
+    else:
+        await handle_call_response(call_id, grok_reply)
+    await save_conversation(call_sid, conversation)
+    await finalize_call(call_id)
+
+
+@instrumented("handle_call_response", "assistant", call_id_arg="call_id")
+async def handle_call_response(call_id: int, grok_reply: str):
+    """
+    Handles Grok's reply to a patient's response during a call.
+
+    The reply has already been generated (and spoken) by the caller; this only saves the
+    final summary when the reply is one, so Grok is asked once per turn.
 
     Args:
         call_id (int): The ID of the call session.
-        patient_input (str): The patient's response to the previous question.
-        conversation_history (list): The conversation history with Grok.
+        grok_reply (str): Grok's reply to the patient's latest response.
 
     Returns:
         dict: Contains the next question or the final summary.
     """
     try:
-        # Process the patient's response with Grok
-        grok_reply, updated_conversation = process_response(patient_input, conversation_history)
-
         # Check if Grok has provided a final JSON summary
-        if grok_reply.startswith("{") and grok_reply.endswith("}"):
+        reply = grok_reply.strip()
+        if reply.startswith("{") and reply.endswith("}"):
             logger.info("Final summary received from Grok.")
-            patient_data = extract_patient_data(grok_reply)
+            patient_data = extract_patient_data(reply)
 
             # Save the final data to the database and Google Sheets
             await save_final_data(call_id, patient_data)
@@ -33,10 +83,11 @@ async def handle_call_response(call_id: int, patient_input: str, conversation_hi
             return {"status": "completed", "data": patient_data}
 
         # Return the next question
-        logger.info(f"Next question from Grok: {grok_reply}")
-        return {"status": "ongoing", "next_question": grok_reply, "conversation": updated_conversation}
+        logger.info(f"Next question from Grok: {reply}")
+        return {"status": "ongoing", "next_question": reply}
 
     except Exception as e:
+        record_stage_error("handle_call_response", "assistant")
         logger.error(f"Error handling call response: {e}")
         return {"status": "error", "message": str(e)}
 
@@ -52,21 +103,14 @@ async def save_final_data(call_id: int, patient_data: dict):
     try:
         # Save to database
         logger.info("Saving final data to database...")
-        await database.execute(
-            responses.insert().values(
-                call_id=call_id,
-                question="Final Summary",
-                response=str(patient_data),
-                created_at=datetime.now(),
-            )
-        )
+        await save_consultation_summaries([(call_id, patient_data)])
 
-        # Save to Google Sheets
-        logger.info("Saving final data to Google Sheets...")
-        save_to_sheet(
+        # Queue for Google Sheets; the background writer appends it in the next batch
+        logger.info("Queueing final data for Google Sheets...")
+        await sheets_writer.enqueue(
             call_id=call_id,
             question="Final Summary",
-            response=str(patient_data)
+            response=json.dumps(patient_data)
         )
         logger.info("Final data saved successfully.")
 
@@ -75,9 +119,48 @@ async def save_final_data(call_id: int, patient_data: dict):
         raise
 
 
+async def save_consultation_summaries(summaries: list):
+    """
+    Save the final summaries of several calls in one executemany; the engine sends them
+    as multi-row INSERTs from a single compiled statement.
+
+    A call has one summary: a later one replaces it (ON CONFLICT (call_id) DO UPDATE), so a
+    repeated final summary is saved rather than rejected by the unique call_id index.
+
+    Args:
+        summaries (list): (call_id, patient_data) pairs.
+    """
+    # The last summary per call wins; one statement cannot update the same row twice
+    rows = list({
+        call_id: consultation_summary_values(call_id, patient_data) for call_id, patient_data in summaries
+    }.values())
+    if not rows:
+        return
+
+    insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(database.dialect)
+    # Large batches are sent in several pages; the transaction keeps them all-or-nothing
+    async with database.transaction():
+        if insert is None:
+            call_ids = [row["call_id"] for row in rows]
+            await database.execute(consultation_summaries.delete().where(consultation_summaries.c.call_id.in_(call_ids)))
+            await database.execute_many(consultation_summaries.insert(), rows)
+            return
+        statement = insert(consultation_summaries)
+        statement = statement.on_conflict_do_update(
+            index_elements=[consultation_summaries.c.call_id],
+            set_={column: statement.excluded[column] for column in rows[0] if column != "call_id"},
+        )
+        await database.execute_many(statement, rows)
+
+
+@instrumented("finalize_call", "database", call_id_arg="call_id")
 async def finalize_call(call_id: int):
     """
-    Finalize the call by recording the end time and call duration.
+    Finalize the call by recording the end time and call duration, and count it in the
+    hourly and daily call rollups in the same transaction.
+
+    The webhook finalizes after every turn, so a call finalized before has its previous
+    duration taken back out of the rollups: each call is counted once, at its latest end.
 
     Args:
         call_id (int): The ID of the call session to finalize.
@@ -88,7 +171,7 @@ async def finalize_call(call_id: int):
     try:
         call_end_time = datetime.now()
 
-        # Retrieve the call's start time
+        # Retrieve the call's start time and any earlier finalization
         query = calls.select().where(calls.c.id == call_id)
         call_record = await database.fetch_one(query)
 
@@ -96,16 +179,30 @@ async def finalize_call(call_id: int):
             raise ValueError(f"Call ID {call_id} not found in the database.")
 
         call_start_time = call_record["call_start"]
-        call_duration = call_end_time - call_start_time
-
-        # Update the database with call end time and duration
-        update_query = calls.update().where(calls.c.id == call_id).values(
-            call_end=call_end_time,
-            call_duration=call_duration
-        )
-        await database.execute(update_query)
-
-        logger.info(f"Call {call_id} finalized successfully.")
+        previous_end = call_record["call_end"]
+        previous_duration = call_record["call_duration"]
+        call_duration = calculate_call_duration(call_start_time, call_end_time).total_seconds()
+
+        # Writes only, so SQLite takes the write lock up front instead of upgrading a read lock,
+        # which fails at once rather than waiting when another call is finalizing
+        async with database.transaction():
+            # Update the call only if no other finalize has changed it since it was read
+            unchanged = calls.c.call_end.is_(None) if previous_end is None else calls.c.call_end == previous_end
+            update_query = calls.update().where(calls.c.id == call_id, unchanged).values(
+                call_end=call_end_time,
+                call_duration=call_duration
+            ).returning(calls.c.id)
+            updated = await database.fetch_val(update_query)
+
+            if updated is not None:
+                if previous_end is not None and previous_duration is not None:
+                    await record_call_rollups(call_start_time, previous_duration, count=-1)
+                await record_call_rollups(call_start_time, call_duration)
+
+        if updated is None:
+            logger.info(f"Call {call_id} was finalized concurrently; keeping that result.")
+        else:
+            logger.info(f"Call {call_id} finalized successfully.")
 
         return {
             "call_id": call_id,
@@ -0,0 +1,88 @@
+import asyncio
+
+
+class AudioRingBuffer:
+    """
+    Fixed-size byte ring buffer for streaming call audio between a producer and a consumer.
+
+    Storage is allocated once. Writers copy straight into it and wait while it is full,
+    which pushes back on the producer; readers get memoryviews of the stored bytes and
+    release them with consume(), so reading never copies.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._storage = bytearray(capacity)
+        self._view = memoryview(self._storage)
+        self._start = 0
+        self._size = 0
+        self._closed = False
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def write(self, data):
+        """
+        Append bytes, waiting for the reader whenever the buffer is full.
+        """
+        data = memoryview(data).cast("B")
+        while data:
+            while self._size == self.capacity:
+                if self._closed:
+                    raise ConnectionError("Audio buffer is closed")
+                self._writable.clear()
+                await self._writable.wait()
+            if self._closed:
+                raise ConnectionError("Audio buffer is closed")
+
+            count = min(len(data), self.capacity - self._size)
+            end = (self._start + self._size) % self.capacity
+            first = min(count, self.capacity - end)
+            self._view[end:end + first] = data[:first]
+            if count > first:
+                self._view[:count - first] = data[first:count]
+
+            self._size += count
+            data = data[count:]
+            self._readable.set()
+
+    async def read(self, max_bytes: int, min_bytes: int = 1):
+        """
+        Wait for at least `min_bytes` and return a view of up to `max_bytes` contiguous bytes.
+
+        The view stays valid until consume() is called. Once the buffer is closed the
+        remaining bytes are returned regardless of `min_bytes`, then None.
+        """
+        while self._size < min(min_bytes, self.capacity) and not self._closed:
+            self._readable.clear()
+            await self._readable.wait()
+
+        if self._size == 0:
+            return None
+
+        count = min(max_bytes, self._size, self.capacity - self._start)
+        return self._view[self._start:self._start + count]
+
+    def consume(self, count: int):
+        """
+        Release `count` bytes returned by read() so they can be overwritten.
+        """
+        count = min(count, self._size)
+        self._start = (self._start + count) % self.capacity
+        self._size -= count
+        self._writable.set()
+
+    def close(self):
+        """
+        Stop accepting writes and wake any waiting reader or writer.
+        """
+        self._closed = True
+        self._readable.set()
+        self._writable.set()
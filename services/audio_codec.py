@@ -0,0 +1,117 @@
+import numpy as np
+
+# G.711 mu-law constants
+ULAW_BIAS = 0x84
+ULAW_CLIP = 32635  # 8159 after the reference encoder's shift to 14 bits
+
+
+def _build_decode_table() -> np.ndarray:
+    """
+    PCM16 value for each of the 256 mu-law codes.
+    """
+    codes = ~np.arange(256, dtype=np.uint8)
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = ((mantissa.astype(np.int32) << 3) + ULAW_BIAS) << exponent
+    samples = magnitude - ULAW_BIAS
+    return np.where(codes & 0x80, -samples, samples).astype(np.int16)
+
+
+def _build_encode_table() -> np.ndarray:
+    """
+    Mu-law code for every 16-bit sample, indexed by the sample's bits read as uint16.
+
+    Follows the reference G.711 encoder (14-bit magnitude, as used by audioop).
+    """
+    samples = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2
+    negative = samples < 0
+    magnitude = np.minimum(np.where(negative, -samples, samples), ULAW_CLIP >> 2) + (ULAW_BIAS >> 2)
+    segment_ends = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+    segment = np.searchsorted(segment_ends, magnitude)
+    code = np.where(
+        segment >= 8,
+        0x7F,
+        (np.minimum(segment, 7) << 4) | ((magnitude >> (np.minimum(segment, 7) + 1)) & 0x0F),
+    )
+    return (code ^ np.where(negative, 0x7F, 0xFF)).astype(np.uint8)
+
+
+ULAW_TO_PCM16 = _build_decode_table()
+PCM16_TO_ULAW = _build_encode_table()
+
+
+def ulaw_to_pcm16(data, out: np.ndarray = None) -> np.ndarray:
+    """
+    Decode mu-law bytes to PCM16 samples with a single table lookup.
+
+    Args:
+        data: bytes, bytearray, memoryview or uint8 array; read without copying.
+        out (np.ndarray): Optional int16 array of the same length to decode into.
+
+    Returns:
+        np.ndarray: int16 samples.
+    """
+    codes = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data
+    return np.take(ULAW_TO_PCM16, codes, out=out)
+
+
+def pcm16_to_ulaw(samples, out: np.ndarray = None) -> np.ndarray:
+    """
+    Encode PCM16 samples (int16 array or little-endian bytes) to mu-law codes.
+    """
+    if not isinstance(samples, np.ndarray):
+        samples = np.frombuffer(samples, dtype="<i2")
+    return np.take(PCM16_TO_ULAW, samples.view(np.uint16), out=out)
+
+
+class Resampler:
+    """
+    Streaming linear-interpolation resampler for mono PCM16 audio.
+
+    State is carried between batches, so feeding a stream chunk by chunk gives the
+    same output as resampling it in one go.
+    """
+
+    def __init__(self, from_rate: int, to_rate: int):
+        self.from_rate = from_rate
+        self.to_rate = to_rate
+        self.step = from_rate / to_rate
+        self._previous = None
+        self._position = 0.0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Resample one batch of int16 samples.
+        """
+        if self.from_rate == self.to_rate or len(samples) == 0:
+            return samples
+
+        # Prepend the last sample of the previous batch so interpolation spans the boundary
+        if self._previous is None:
+            source = samples.astype(np.float32)
+        else:
+            source = np.empty(len(samples) + 1, dtype=np.float32)
+            source[0] = self._previous
+            source[1:] = samples
+
+        last_index = len(source) - 1
+        count = int(np.floor((last_index - self._position) / self.step)) + 1 if self._position <= last_index else 0
+        positions = self._position + self.step * np.arange(count)
+        resampled = np.interp(positions, np.arange(len(source)), source)
+
+        # Next output position, relative to this batch's last sample (index 0 of the next source)
+        self._position = self._position + self.step * count - last_index
+        self._previous = source[-1]
+        return np.clip(np.rint(resampled), -32768, 32767).astype(np.int16)
+
+
+class TelephonyTranscoder:
+    """
+    Converts Twilio's 8 kHz mu-law into little-endian PCM16 at the ASR's sample rate.
+    """
+
+    def __init__(self, to_rate: int = 16000, from_rate: int = 8000):
+        self.resampler = Resampler(from_rate, to_rate)
+
+    def transcode(self, data) -> bytes:
+        return self.resampler.process(ulaw_to_pcm16(data)).astype("<i2", copy=False).tobytes()
@@ -0,0 +1,148 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from db.models import call_rollups
+from utils.database import database
+
+# Lower bounds of the call-duration buckets in seconds. Rollups store each call under its
+# bucket's lower bound, so existing rows keep their buckets if these change
+CALL_DURATION_BUCKETS = (0, 15, 30, 60, 90, 120, 180, 240, 300, 420, 600, 900, 1200, 1800, 3600)
+
+GRANULARITIES = ("hour", "day")
+
+
+def period_start(moment: datetime, granularity: str) -> datetime:
+    """
+    Start of the hour or day containing `moment`.
+    """
+    start = moment.replace(minute=0, second=0, microsecond=0)
+    return start.replace(hour=0) if granularity == "day" else start
+
+
+def duration_bucket(seconds: float) -> int:
+    return CALL_DURATION_BUCKETS[max(0, bisect_right(CALL_DURATION_BUCKETS, seconds) - 1)]
+
+
+async def record_call_rollups(call_start: datetime, duration_seconds: float, db=database, count: int = 1):
+    """
+    Count a finalized call in its hour and day rollups. Run it in the same transaction as
+    the update that finalizes the call, so the rollups match the calls table.
+
+    Args:
+        count (int): -1 takes back a call counted earlier with this duration, as when a
+            call is finalized again with a later end time.
+    """
+    bucket = duration_bucket(duration_seconds)
+    duration_seconds *= count
+    insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(db.dialect)
+    for granularity in GRANULARITIES:
+        key = {"granularity": granularity, "period_start": period_start(call_start, granularity), "bucket": bucket}
+        if insert is not None:
+            statement = insert(call_rollups).values(**key, calls=count, duration_seconds=duration_seconds)
+            await db.execute(statement.on_conflict_do_update(
+                index_elements=list(key),
+                set_={
+                    "calls": call_rollups.c.calls + count,
+                    "duration_seconds": call_rollups.c.duration_seconds + duration_seconds,
+                },
+            ))
+            continue
+
+        where = [call_rollups.c[column] == value for column, value in key.items()]
+        if await db.fetch_one(select(call_rollups.c.calls).where(*where)) is None:
+            await db.execute(call_rollups.insert().values(**key, calls=count, duration_seconds=duration_seconds))
+        else:
+            await db.execute(call_rollups.update().where(*where).values(
+                calls=call_rollups.c.calls + count,
+                duration_seconds=call_rollups.c.duration_seconds + duration_seconds,
+            ))
+
+
+def bucket_percentile(buckets: list, quantile: float):
+    """
+    Estimate a duration percentile from (lower bound, calls, total seconds) buckets in
+    bound order, interpolating linearly within the bucket that holds it. The last bucket
+    has no upper bound, so its mean duration is used.
+    """
+    total = sum(calls for _, calls, _ in buckets)
+    if not total:
+        return None
+    rank = quantile * total
+    seen = 0
+    for lower, calls, seconds in buckets:
+        if calls and seen + calls >= rank:
+            upper = _upper_bound(lower)
+            if upper is None:
+                return seconds / calls
+            return lower + (upper - lower) * (rank - seen) / calls
+        seen += calls
+    lower, calls, seconds = buckets[-1]
+    return seconds / calls
+
+
+def _upper_bound(lower: int):
+    index = bisect_right(CALL_DURATION_BUCKETS, lower)
+    return CALL_DURATION_BUCKETS[index] if index < len(CALL_DURATION_BUCKETS) else None
+
+
+async def get_call_stats(start: datetime, end: datetime, granularity: str = "hour", db=database) -> dict:
+    """
+    Call volume and duration percentiles for the periods starting in [start, end), read
+    from the rollups: the cost depends on the number of periods and buckets, not calls.
+    """
+    period = call_rollups.c.period_start
+    in_range = (call_rollups.c.granularity == granularity, period >= start, period < end)
+
+    bucket_rows = await db.fetch_all(
+        select(call_rollups.c.bucket, func.sum(call_rollups.c.calls).label("calls"),
+               func.sum(call_rollups.c.duration_seconds).label("duration_seconds"))
+        .where(*in_range)
+        .group_by(call_rollups.c.bucket)
+        .order_by(call_rollups.c.bucket)
+    )
+    buckets = [(row["bucket"], row["calls"], row["duration_seconds"]) for row in bucket_rows]
+
+    series_rows = await db.fetch_all(
+        select(period, func.sum(call_rollups.c.calls).label("calls"),
+               func.sum(call_rollups.c.duration_seconds).label("duration_seconds"))
+        .where(*in_range)
+        .group_by(period)
+        .order_by(period)
+    )
+
+    calls = sum(count for _, count, _ in buckets)
+    seconds = sum(total for _, _, total in buckets)
+    return {
+        "start": start,
+        "end": end,
+        "granularity": granularity,
+        "calls": calls,
+        "mean_duration_seconds": round(seconds / calls, 1) if calls else None,
+        "percentiles": {
+            name: round(value, 1) if value is not None else None
+            for name, value in (("p50", bucket_percentile(buckets, 0.5)), ("p90", bucket_percentile(buckets, 0.9)),
+                                ("p99", bucket_percentile(buckets, 0.99)))
+        },
+        "duration_buckets": [
+            {"from_seconds": lower, "to_seconds": _upper_bound(lower), "calls": count} for lower, count, _ in buckets
+        ],
+        "periods": [
+            {
+                "period_start": row["period_start"],
+                "calls": row["calls"],
+                "mean_duration_seconds": round(row["duration_seconds"] / row["calls"], 1) if row["calls"] else None,
+            }
+            for row in series_rows
+        ],
+    }
+
+
+def default_stats_range(now: datetime = None, granularity: str = "hour") -> tuple:
+    """
+    Today so far for hourly stats, the last 30 days for daily stats.
+    """
+    now = now or datetime.now()
+    end = period_start(now, granularity) + (timedelta(hours=1) if granularity == "hour" else timedelta(days=1))
+    start = period_start(now, "day") if granularity == "hour" else end - timedelta(days=30)
+    return start, end
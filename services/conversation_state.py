@@ -0,0 +1,180 @@
+import os
+from collections import deque
+from loguru import logger
+
+# Number of most recent messages sent to the model alongside the state summary
+RECENT_MESSAGES = int(os.getenv("CONVERSATION_RECENT_MESSAGES", "6"))
+
+# Longest answer quoted back to the model in the state summary
+MAX_SUMMARY_VALUE_CHARS = 200
+
+# Phrases identifying which form field an assistant message is asking about
+FIELD_CUES = {
+    "full_name": ("full name", "your name"),
+    "date_of_birth": ("date of birth", "born"),
+    "phone_number": ("phone number", "contact number"),
+    "reason_for_appointment": ("reason for", "booking this appointment"),
+    "experienced_before": ("experienced",),
+    "duration_of_symptoms": ("how long",),
+    "current_medication": ("medication",),
+    "known_allergies": ("allerg",),
+    "additional_notes": ("anything else",),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count for when the provider does not report usage (about four characters per token).
+    """
+    return max(1, (len(text) + 3) // 4)
+
+
+class ConversationState:
+    """
+    Tracks a consultation call: which form fields are filled, the recent turns sent to
+    the model, the full transcript, and per-turn token usage.
+
+    Only the state summary and the last RECENT_MESSAGES messages are sent to Grok, so
+    request size stays flat however long the call runs.
+    """
+
+    def __init__(self, fields: list, recent_messages: int = RECENT_MESSAGES):
+        self.slots = {field: None for field in fields}
+        self.pending_field = None
+        self.transcript = []
+        self.recent = deque(maxlen=recent_messages)
+        self.turn_usage = []
+
+    @classmethod
+    def from_history(cls, fields: list, conversation_history: list, recent_messages: int = RECENT_MESSAGES):
+        """
+        Rebuild state from a plain list of chat messages.
+        """
+        state = cls(fields, recent_messages)
+        for message in conversation_history:
+            if message["role"] == "user":
+                state.record_user(message["content"])
+            elif message["role"] == "assistant":
+                state.record_assistant(message["content"])
+        return state
+
+    def to_dict(self) -> dict:
+        """
+        Plain-data form of the state, for keeping it in a session store between requests.
+        """
+        return {
+            "slots": self.slots,
+            "pending_field": self.pending_field,
+            "transcript": self.transcript,
+            "recent": list(self.recent),
+            "recent_messages": self.recent.maxlen,
+            "turn_usage": self.turn_usage,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Rebuild state saved with to_dict().
+        """
+        state = cls(list(data["slots"]), data.get("recent_messages", RECENT_MESSAGES))
+        state.slots.update(data["slots"])
+        state.pending_field = data.get("pending_field")
+        state.transcript = list(data.get("transcript", []))
+        state.recent.extend(data.get("recent", []))
+        state.turn_usage = list(data.get("turn_usage", []))
+        return state
+
+    def record_user(self, text: str):
+        """
+        Add the patient's message and file it under the field currently being asked.
+        """
+        message = {"role": "user", "content": text}
+        self.transcript.append(message)
+        self.recent.append(message)
+
+        answer = text.strip()
+        if self.pending_field and answer:
+            previous = self.slots.get(self.pending_field)
+            self.slots[self.pending_field] = f"{previous} {answer}" if previous else answer
+
+    def record_assistant(self, text: str):
+        """
+        Add the assistant's message and work out which field it asks about next.
+        """
+        message = {"role": "assistant", "content": text}
+        self.transcript.append(message)
+        self.recent.append(message)
+
+        asked = self.detect_field(text)
+        if asked:
+            self.pending_field = asked
+
+    def detect_field(self, text: str):
+        """
+        Return the form field an assistant message asks about, or None for clarifications.
+        """
+        lowered = text.lower()
+        # The question is usually the last sentence, so prefer the latest cue in the message
+        best_field, best_position = None, -1
+        for field, cues in FIELD_CUES.items():
+            if field not in self.slots:
+                continue
+            for cue in cues:
+                position = lowered.rfind(cue)
+                if position > best_position:
+                    best_field, best_position = field, position
+        return best_field
+
+    @property
+    def missing_fields(self) -> list:
+        return [field for field, value in self.slots.items() if not value]
+
+    def summary(self) -> str:
+        """
+        Compact description of the form so far, sent in place of the older turns.
+        """
+        collected = []
+        for field, value in self.slots.items():
+            if value:
+                if len(value) > MAX_SUMMARY_VALUE_CHARS:
+                    value = value[:MAX_SUMMARY_VALUE_CHARS] + "..."
+                collected.append(f"- {field}: {value}")
+
+        lines = ["Consultation progress (earlier turns omitted)."]
+        lines.append("Answers collected so far:" if collected else "No answers collected yet.")
+        lines.extend(collected)
+        if self.missing_fields:
+            lines.append(f"Still missing: {', '.join(self.missing_fields)}")
+        if self.pending_field:
+            lines.append(f"Currently asking about: {self.pending_field}")
+        return "\n".join(lines)
+
+    def build_messages(self, system_prompt: str) -> list:
+        """
+        Messages for the next model request: instructions, state summary and recent turns.
+        """
+        messages = [{"role": "system", "content": system_prompt}]
+        if len(self.transcript) > len(self.recent):
+            messages.append({"role": "system", "content": self.summary()})
+        messages.extend(self.recent)
+        return messages
+
+    def record_usage(self, prompt_tokens: int, completion_tokens: int, estimated: bool = False):
+        """
+        Store token counts for the turn just completed.
+        """
+        usage = {
+            "turn": len(self.turn_usage) + 1,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "estimated": estimated,
+        }
+        self.turn_usage.append(usage)
+        logger.info(f"Turn {usage['turn']} token usage: prompt={prompt_tokens}, completion={completion_tokens}"
+                    f"{' (estimated)' if estimated else ''}")
+
+    def total_tokens(self) -> dict:
+        return {
+            "prompt_tokens": sum(turn["prompt_tokens"] for turn in self.turn_usage),
+            "completion_tokens": sum(turn["completion_tokens"] for turn in self.turn_usage),
+        }
@@ -1,18 +1,75 @@
-import requests
+import asyncio
+import httpx
 import os
 from loguru import logger
+from services.tts_cache import tts_cache, cache_key
+from utils.metrics import instrumented
 
 ELEVEN_LABS_API_KEY = os.getenv("ELEVEN_LABS_API_KEY")
+ELEVEN_LABS_TTS_URL = "https://api.elevenlabs.io/v1/text-to-speech"
+ELEVEN_LABS_VOICE = os.getenv("ELEVEN_LABS_VOICE", "default")
 
-def synthesize_speech(text: str) -> str:
+# Connection pool and timeout settings for the shared TTS client
+ELEVEN_LABS_TIMEOUT = float(os.getenv("ELEVEN_LABS_TIMEOUT", "10"))
+ELEVEN_LABS_CONNECT_TIMEOUT = float(os.getenv("ELEVEN_LABS_CONNECT_TIMEOUT", "3"))
+ELEVEN_LABS_MAX_CONNECTIONS = int(os.getenv("ELEVEN_LABS_MAX_CONNECTIONS", "20"))
+ELEVEN_LABS_MAX_KEEPALIVE = int(os.getenv("ELEVEN_LABS_MAX_KEEPALIVE", "10"))
+ELEVEN_LABS_MAX_CONCURRENCY = int(os.getenv("ELEVEN_LABS_MAX_CONCURRENCY", "10"))
+
+_async_client = None
+_sync_client = None
+_semaphore = None
+_inflight = {}
+
+
+def _client_options() -> dict:
     """
-    Convert text into speech using ElevenLabs API and return audio URL.
+    Shared httpx options so the async and sync clients pool connections the same way.
+    """
+    return {
+        "headers": {"Authorization": f"Bearer {ELEVEN_LABS_API_KEY}"},
+        "timeout": httpx.Timeout(ELEVEN_LABS_TIMEOUT, connect=ELEVEN_LABS_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=ELEVEN_LABS_MAX_CONNECTIONS,
+            max_keepalive_connections=ELEVEN_LABS_MAX_KEEPALIVE,
+        ),
+    }
+
+
+def get_tts_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide async TTS client, creating it on first use.
     """
-    url = "https://api.elevenlabs.io/v1/text-to-speech"
-    headers = {"Authorization": f"Bearer {ELEVEN_LABS_API_KEY}"}
-    payload = {"text": text, "voice": "default"}
-    response = requests.post(url, json=payload, headers=headers)
+    global _async_client, _semaphore
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(**_client_options())
+        _semaphore = asyncio.Semaphore(ELEVEN_LABS_MAX_CONCURRENCY)
+        logger.info(
+            f"ElevenLabs client ready (max connections: {ELEVEN_LABS_MAX_CONNECTIONS}, "
+            f"max concurrency: {ELEVEN_LABS_MAX_CONCURRENCY})"
+        )
+    return _async_client
 
+
+async def close_tts_client():
+    """
+    Close the shared TTS clients and release their pooled connections.
+    """
+    global _async_client, _sync_client, _semaphore
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+        _semaphore = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+    logger.info("ElevenLabs client closed.")
+
+
+def _parse_tts_response(response: httpx.Response) -> str:
+    """
+    Extract the audio URL from an ElevenLabs response or raise on failure.
+    """
     if response.status_code == 200:
         audio_url = response.json().get("audio_url")
         logger.info(f"Generated audio URL: {audio_url}")
@@ -20,3 +77,94 @@ def synthesize_speech(text: str) -> str:
 
     logger.error(f"Failed to synthesize speech: {response.text}")
     raise Exception("Failed to generate speech with ElevenLabs")
+
+
+async def _request_speech(text: str) -> str:
+    """
+    Call ElevenLabs through the shared pool, honouring the concurrency limit.
+    """
+    client = get_tts_client()
+    payload = {"text": text, "voice": ELEVEN_LABS_VOICE}
+
+    try:
+        async with _semaphore:
+            response = await client.post(ELEVEN_LABS_TTS_URL, json=payload)
+    except httpx.HTTPError as e:
+        logger.error(f"ElevenLabs request failed: {e}")
+        raise Exception("Failed to generate speech with ElevenLabs") from e
+
+    return _parse_tts_response(response)
+
+
+@instrumented("synthesize_speech", "elevenlabs")
+async def synthesize_speech_async(text: str) -> str:
+    """
+    Convert text into speech using ElevenLabs API and return audio URL.
+
+    Requests go through a shared keep-alive connection pool and are capped at
+    ELEVEN_LABS_MAX_CONCURRENCY in flight, so a slow synthesis never blocks the event loop.
+    Results are cached by normalized text and voice, and concurrent requests for the
+    same text share a single upstream call.
+    """
+    key = cache_key(text, ELEVEN_LABS_VOICE)
+    cached = await tts_cache.get_async(key)
+    if cached is not None:
+        return cached.decode("utf-8")
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    task = asyncio.ensure_future(_request_speech(text))
+    _inflight[key] = task
+    try:
+        audio_url = await asyncio.shield(task)
+    finally:
+        _inflight.pop(key, None)
+
+    if audio_url:
+        await tts_cache.put_async(key, audio_url.encode("utf-8"))
+    return audio_url
+
+
+async def prewarm_tts_cache(phrases: list):
+    """
+    Synthesize known phrases ahead of time so they are served from the cache.
+
+    Failures are logged rather than raised; a cold entry only costs one live request later.
+    """
+    results = await asyncio.gather(
+        *(synthesize_speech_async(phrase) for phrase in phrases), return_exceptions=True
+    )
+    failed = sum(1 for result in results if isinstance(result, Exception))
+    logger.info(f"Pre-warmed TTS cache with {len(phrases) - failed}/{len(phrases)} phrases: {tts_cache.stats()}")
+
+
+@instrumented("synthesize_speech", "elevenlabs")
+def synthesize_speech(text: str) -> str:
+    """
+    Convert text into speech using ElevenLabs API and return audio URL.
+
+    Blocking variant kept for synchronous callers; async code should await
+    synthesize_speech_async instead.
+    """
+    global _sync_client
+    key = cache_key(text, ELEVEN_LABS_VOICE)
+    cached = tts_cache.get(key)
+    if cached is not None:
+        return cached.decode("utf-8")
+
+    if _sync_client is None:
+        _sync_client = httpx.Client(**_client_options())
+
+    payload = {"text": text, "voice": ELEVEN_LABS_VOICE}
+    try:
+        response = _sync_client.post(ELEVEN_LABS_TTS_URL, json=payload)
+    except httpx.HTTPError as e:
+        logger.error(f"ElevenLabs request failed: {e}")
+        raise Exception("Failed to generate speech with ElevenLabs") from e
+
+    audio_url = _parse_tts_response(response)
+    if audio_url:
+        tts_cache.put(key, audio_url.encode("utf-8"))
+    return audio_url
@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+from db.queries import get_export_calls_page_query
+from utils.database import database
+from loguru import logger
+
+# Calls read per page; memory use depends on this, not on the size of the date range
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+
+# One row per call with its final consultation summary; the summary columns are empty
+# for calls that did not finish the consultation
+EXPORT_COLUMNS = [
+    "call_id", "call_sid", "call_start", "call_end", "patient_id", "patient_name", "patient_phone_number",
+    "full_name", "date_of_birth", "phone_number", "reason_for_appointment", "experienced_before",
+    "duration_of_symptoms", "current_medication", "known_allergies", "additional_notes", "summary_created_at",
+]
+
+
+async def export_pages(start: datetime, end: datetime, db=database, page_size: int = EXPORT_PAGE_SIZE):
+    """
+    Yield the calls started in [start, end), joined with their patient and final
+    consultation summary, one page of rows (dicts keyed by EXPORT_COLUMNS) at a time.
+
+    Calls are read with keyset pagination on (call_start, id), so no connection is held
+    between pages.
+    """
+    after, exported, started = None, 0, time.perf_counter()
+    while True:
+        page = await db.fetch_all(get_export_calls_page_query(start, end, after, page_size))
+        if not page:
+            break
+        after = (page[-1]["call_start"], page[-1]["call_id"])
+
+        rows = [{column: call[column] for column in EXPORT_COLUMNS} for call in page]
+        exported += len(rows)
+        yield rows
+
+        if len(page) < page_size:
+            break
+    logger.info(f"Exported {exported} rows for calls from {start} to {end} in {time.perf_counter() - started:.2f}s")
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+async def encode_csv(pages):
+    """
+    Encode export pages as CSV text, one chunk per page after the header.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    async for rows in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([[_value(row[column]) for column in EXPORT_COLUMNS] for row in rows])
+        yield buffer.getvalue()
+
+
+async def encode_ndjson(pages):
+    """
+    Encode export pages as newline-delimited JSON, one chunk per page.
+    """
+    async for rows in pages:
+        yield "".join(
+            json.dumps({column: _value(row[column]) for column in EXPORT_COLUMNS}) + "\n" for row in rows
+        )
+
+
+# Media type and encoder by export format
+EXPORT_FORMATS = {
+    "csv": ("text/csv", encode_csv),
+    "ndjson": ("application/x-ndjson", encode_ndjson),
+}
+
+
+async def export_to_file(start: datetime, end: datetime, export_format: str, output):
+    """
+    Write an export to an open text file.
+    """
+    _, encode = EXPORT_FORMATS[export_format]
+    async for chunk in encode(export_pages(start, end)):
+        output.write(chunk)
+
+
+def main():
+    """
+    Export calls and consultation summaries from the command line:
+
+        python -m services.export --start 2024-01-01 --end 2024-04-01 --format csv --output q1.csv
+    """
+    parser = argparse.ArgumentParser(description="Export calls joined with patients and consultation summaries.")
+    parser.add_argument("--start", type=datetime.fromisoformat, required=True, help="First call start (ISO date or time)")
+    parser.add_argument("--end", type=datetime.fromisoformat, required=True, help="End of the range, exclusive")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--output", help="File to write; defaults to stdout")
+    args = parser.parse_args()
+
+    async def run():
+        await database.connect()
+        try:
+            if args.output:
+                with open(args.output, "w", newline="", encoding="utf-8") as output:
+                    await export_to_file(args.start, args.end, args.format, output)
+            else:
+                await export_to_file(args.start, args.end, args.format, sys.stdout)
+        finally:
+            await database.disconnect()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,33 @@
-import openai
 import os
+import re
 from loguru import logger
+from services.conversation_state import ConversationState, estimate_tokens
+from services.session_store import session_store
+from services.slot_extraction import extract_slot
+from utils.metrics import instrumented
 
 # Load Grok API key from environment variables
 GROK_API_KEY = os.getenv("GROK_API_KEY")
 
-# Configure the Grok API
-openai.api_key = GROK_API_KEY
-openai.api_base = "https://api.x.ai/v1"  # Grok API base
+# Grok's OpenAI-compatible endpoint
+GROK_API_BASE = "https://api.x.ai/v1"
+
+_openai = None
+
+def get_grok_client():
+    """
+    Import and configure the OpenAI SDK on first use; importing it takes a noticeable
+    part of boot, so it is left out of app startup.
+    """
+    global _openai
+    if _openai is None:
+        import openai
+
+        # Configure the Grok API
+        openai.api_key = GROK_API_KEY
+        openai.api_base = GROK_API_BASE  # Grok API base
+        _openai = openai
+    return _openai
 
 # System prompt to guide the assistant's behavior
 SYSTEM_PROMPT = """
@@ -45,29 +65,95 @@ If the patient provides partial information, ask follow-up questions to clarify.
 Be patient, and ensure all data is complete before concluding.
 """
 
+# The fixed consultation questions, in the order the assistant asks them
+CONSULTATION_QUESTIONS = re.findall(r"^\d+\. (.+)$", SYSTEM_PROMPT, re.MULTILINE)
+
+# The form fields of the final JSON summary, in the same order as the questions
+FORM_FIELDS = re.findall(r'^\s+"(\w+)":', SYSTEM_PROMPT, re.MULTILINE)
+
+# The question asked for each form field, used when an answer is handled without Grok
+QUESTION_FOR_FIELD = dict(zip(FORM_FIELDS, CONSULTATION_QUESTIONS))
+
 # Define the Grok model to be used
 MODEL = "grok-2"
 
-def process_response(patient_input: str, conversation_history: list) -> tuple:
+def new_conversation() -> ConversationState:
+    """
+    Create the state for a new consultation call.
+    """
+    return ConversationState(FORM_FIELDS)
+
+async def load_conversation(call_sid: str) -> ConversationState:
+    """
+    Return the saved state for a call, or a new one; any worker can continue the call.
+    """
+    data = await session_store.get(f"conversation:{call_sid}") if call_sid else None
+    return ConversationState.from_dict(data) if data else new_conversation()
+
+async def save_conversation(call_sid: str, conversation: ConversationState):
+    """
+    Save a call's state so the next turn can be handled by any worker.
+    """
+    if call_sid:
+        await session_store.set(f"conversation:{call_sid}", conversation.to_dict())
+
+def _as_state(conversation) -> ConversationState:
+    """
+    Accept either a ConversationState or a legacy list of chat messages.
+    """
+    if isinstance(conversation, ConversationState):
+        return conversation
+    return ConversationState.from_history(FORM_FIELDS, conversation or [])
+
+def answer_locally(patient_input: str, state: ConversationState):
+    """
+    Fill the pending slot from a structured answer (date of birth, phone number, yes/no,
+    no allergies) and return the next question without calling Grok.
+
+    The reply is the next question's exact wording, which is pre-synthesized in the TTS
+    cache. Returns None, leaving the state untouched, when the parser is not confident or
+    the answer completes the form, since Grok writes the final summary.
+    """
+    field = state.pending_field
+    match = extract_slot(field, patient_input)
+    if match is None:
+        return None
+    next_field = next((name for name in FORM_FIELDS if name != field and not state.slots.get(name)), None)
+    if next_field is None:
+        return None
+
+    state.record_user(patient_input)
+    state.slots[field] = match.value
+    reply = QUESTION_FOR_FIELD[next_field]
+    state.record_assistant(reply)
+    state.record_usage(0, 0)
+    return reply
+
+@instrumented("process_response", "grok")
+async def process_response(patient_input: str, conversation) -> tuple:
     """
     Process the patient's response through Grok to generate the next question or action.
 
     Args:
         patient_input (str): The latest input from the patient.
-        conversation_history (list): A history of previous interactions.
+        conversation (ConversationState): The call's conversation state. A plain list of
+            previous messages is also accepted and converted.
 
     Returns:
-        tuple: A question or final response, and the updated conversation history.
+        tuple: A question or final response, and the updated conversation state.
     """
     try:
-        # Append the patient's input to conversation history
-        conversation_history.append({"role": "user", "content": patient_input})
+        state = _as_state(conversation)
+        local_reply = answer_locally(patient_input, state)
+        if local_reply is not None:
+            return local_reply, state
+        state.record_user(patient_input)
 
-        # Prepare the full message for Grok
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}] + conversation_history
+        # Send the instructions, a summary of the form so far and only the recent turns
+        messages = state.build_messages(SYSTEM_PROMPT)
 
         # Call Grok API
-        response = openai.ChatCompletion.create(
+        response = await get_grok_client().ChatCompletion.acreate(
             model=MODEL,
             messages=messages,
             max_tokens=300,
@@ -76,17 +162,73 @@ def process_response(patient_input: str, conversation_history: list) -> tuple:
 
         # Extract assistant's reply
         assistant_reply = response["choices"][0]["message"]["content"]
+        state.record_assistant(assistant_reply)
 
-        # Append the assistant's reply to conversation history
-        conversation_history.append({"role": "assistant", "content": assistant_reply})
+        usage = response.get("usage")
+        if usage:
+            state.record_usage(usage["prompt_tokens"], usage["completion_tokens"])
+        else:
+            state.record_usage(
+                sum(estimate_tokens(m["content"]) for m in messages), estimate_tokens(assistant_reply), estimated=True
+            )
 
         logger.info(f"Grok Response: {assistant_reply}")
-        return assistant_reply, conversation_history
+        return assistant_reply, state
 
     except Exception as e:
         logger.error(f"Error processing Grok response: {e}")
         raise
 
+@instrumented("stream_response", "grok", first_item_stage="stream_response_first_token")
+async def stream_response(patient_input: str, conversation):
+    """
+    Stream Grok's reply token by token instead of waiting for the full completion.
+
+    Args:
+        patient_input (str): The latest input from the patient.
+        conversation (ConversationState): The call's conversation state.
+
+    Yields:
+        str: Pieces of the assistant's reply as they are generated. The complete reply
+        is recorded in the conversation state once the stream finishes.
+    """
+    try:
+        state = _as_state(conversation)
+        local_reply = answer_locally(patient_input, state)
+        if local_reply is not None:
+            yield local_reply
+            return
+        state.record_user(patient_input)
+        messages = state.build_messages(SYSTEM_PROMPT)
+
+        response = await get_grok_client().ChatCompletion.acreate(
+            model=MODEL,
+            messages=messages,
+            max_tokens=300,
+            temperature=0.7,
+            stream=True
+        )
+
+        reply_parts = []
+        async for chunk in response:
+            token = chunk["choices"][0]["delta"].get("content")
+            if token:
+                reply_parts.append(token)
+                yield token
+
+        assistant_reply = "".join(reply_parts)
+        state.record_assistant(assistant_reply)
+
+        # Streamed completions do not report usage, so estimate it
+        state.record_usage(
+            sum(estimate_tokens(m["content"]) for m in messages), estimate_tokens(assistant_reply), estimated=True
+        )
+        logger.info(f"Grok Response (streamed): {assistant_reply}")
+
+    except Exception as e:
+        logger.error(f"Error streaming Grok response: {e}")
+        raise
+
 def extract_patient_data(final_response: str) -> dict:
     """
     Extract structured patient data from Grok's final JSON response.
@@ -0,0 +1,273 @@
+import asyncio
+import base64
+import json
+import os
+from services.assembly_ai_handler import ASR_ENCODING, ASR_SAMPLE_RATE, asr_pool, respond_to_transcript
+from services.audio_buffer import AudioRingBuffer
+from services.audio_codec import TelephonyTranscoder, ulaw_to_pcm16
+from services.assistant_logic import complete_turn, start_call
+from services.grok_handler import load_conversation, new_conversation
+from services.speculation import (
+    SPECULATIVE_LLM_ENABLED, SPECULATION_MIN_WORDS, SPECULATION_STABLE_PARTIALS, Speculation, transcript_key
+)
+from services.speech_pipeline import STREAMING_TTS_ENABLED, mark_media_stream
+from services.vad import END_OF_UTTERANCE, Endpointer
+from loguru import logger
+
+# Twilio Media Streams carry 8 kHz mono mu-law, one byte per sample, in 20 ms frames
+TWILIO_SAMPLE_RATE = 8000
+
+# Audio is sent to the ASR in chunks of this length (AssemblyAI accepts 50-2000 ms)
+ASR_CHUNK_MS = int(os.getenv("ASR_CHUNK_MS", "100"))
+
+# Audio held per call while the ASR catches up before Twilio frames are pushed back on
+MEDIA_STREAM_BUFFER_MS = int(os.getenv("MEDIA_STREAM_BUFFER_MS", "5000"))
+
+# Detect the end of each utterance locally and answer from the latest partial transcript
+# instead of waiting for the ASR's own endpointing
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+
+# How long to wait for the ASR to flush its last transcript after the call's stream stops
+ASR_CLOSE_TIMEOUT = float(os.getenv("ASR_CLOSE_TIMEOUT", "2"))
+
+
+class MediaStreamSession:
+    """
+    One Twilio Media Stream: buffers inbound call audio and relays it to the ASR.
+
+    Frames are decoded into a preallocated ring buffer. A forwarder task sends fixed-size
+    chunks to the ASR websocket, transcoded to PCM16 at ASR_SAMPLE_RATE unless ASR_ENCODING
+    is "pcm_mulaw"; when the ASR falls behind the buffer fills and
+    handle_event() waits, which stops reads from Twilio's socket. Transcripts are answered
+    one at a time, in order: a turn holds the lock until its reply has finished streaming and
+    the state including it is saved.
+
+    With VAD_ENABLED, a local endpointer watches the inbound audio. When the caller stops
+    talking the latest partial transcript is answered straight away and the ASR is told to
+    finalize, and its final transcript for that utterance is then skipped.
+
+    With SPECULATIVE_LLM_ENABLED (and the default responder), Grok is asked as soon as a
+    partial transcript is stable. The turn reuses that request when its transcript has the
+    same words and no other turn has changed the conversation since; otherwise the request
+    is cancelled and Grok is asked again.
+    """
+
+    def __init__(self, connect_asr=asr_pool.acquire, on_transcript=None):
+        self.chunk_bytes = TWILIO_SAMPLE_RATE * ASR_CHUNK_MS // 1000
+        # A whole number of chunks, so reads never straddle the wrap-around point
+        chunks = max(2, MEDIA_STREAM_BUFFER_MS // ASR_CHUNK_MS)
+        self.buffer = AudioRingBuffer(self.chunk_bytes * chunks)
+        self.connect_asr = connect_asr
+        self.transcoder = TelephonyTranscoder(ASR_SAMPLE_RATE) if ASR_ENCODING == "pcm_s16le" else None
+        self.on_transcript = on_transcript or self._respond
+        self.endpointer = Endpointer(TWILIO_SAMPLE_RATE) if VAD_ENABLED else None
+        self.conversation = new_conversation()
+        self.speculative = SPECULATIVE_LLM_ENABLED and on_transcript is None
+        self.stream_sid = None
+        self.call_sid = None
+        self.call_id = None
+        self.frames_received = 0
+        self.bytes_forwarded = 0
+        self.last_mark = None
+        self.stopped = False
+        self.utterances_detected = 0
+        self.early_answers = 0
+        self.speculations = 0
+        self.speculation_hits = 0
+        self.latency_saved = 0.0
+        self._partial_text = ""
+        self._answered_early = False
+        self._speculation = None
+        self._partial_key = ""
+        self._stable_partials = 0
+        self._asr = None
+        self._forwarder = None
+        self._receiver = None
+        self._turn_lock = asyncio.Lock()
+        self._turns = set()
+
+    async def handle_event(self, message: dict):
+        """
+        Process one Twilio Media Streams message (connected, start, media, mark or stop).
+        """
+        event = message.get("event")
+
+        if event == "media":
+            media = message["media"]
+            if media.get("track", "inbound") == "inbound":
+                frame = base64.b64decode(media["payload"])
+                await self.buffer.write(frame)
+                self.frames_received += 1
+                if self.endpointer:
+                    for vad_event in self.endpointer.process(ulaw_to_pcm16(frame)):
+                        if vad_event.kind == END_OF_UTTERANCE:
+                            await self._end_utterance()
+
+        elif event == "start":
+            start = message["start"]
+            self.stream_sid = message.get("streamSid") or start.get("streamSid")
+            self.call_sid = start.get("callSid")
+            self.conversation = await load_conversation(self.call_sid)
+            await mark_media_stream(self.call_sid, True)
+            logger.info(f"Media stream {self.stream_sid} started for call {self.call_sid}: {start.get('mediaFormat')}")
+            self._asr = await self.connect_asr(sample_rate=ASR_SAMPLE_RATE, encoding=ASR_ENCODING)
+            self._forwarder = asyncio.create_task(self._forward_audio())
+            self._receiver = asyncio.create_task(self._receive_transcripts())
+
+        elif event == "mark":
+            self.last_mark = message.get("mark", {}).get("name")
+            logger.info(f"Media stream {self.stream_sid} reached mark: {self.last_mark}")
+
+        elif event == "stop":
+            logger.info(f"Media stream {self.stream_sid} stopped after {self.frames_received} frames.")
+            self.stopped = True
+
+        elif event == "connected":
+            logger.info(f"Media stream connected ({message.get('protocol')} {message.get('version')})")
+
+    async def _forward_audio(self):
+        """
+        Send buffered audio to the ASR in fixed-size chunks until the stream ends.
+        """
+        while True:
+            chunk = await self.buffer.read(self.chunk_bytes, min_bytes=self.chunk_bytes)
+            if chunk is None:
+                return
+            audio = self.transcoder.transcode(chunk) if self.transcoder else chunk
+            payload = base64.b64encode(audio).decode("ascii")
+            size = len(chunk)
+            chunk.release()
+            await self._asr.send(json.dumps({"audio_data": payload}))
+            self.buffer.consume(size)
+            self.bytes_forwarded += size
+
+    async def _end_utterance(self):
+        """
+        Answer the utterance the endpointer just closed, without waiting for the ASR to finalize it.
+        """
+        self.utterances_detected += 1
+        if self._asr is None:
+            return
+        await self._asr.send(json.dumps({"force_end_utterance": True}))
+        if self._partial_text:
+            self.early_answers += 1
+            self._answered_early = True
+            self._start_turn(self._partial_text)
+            self._partial_text = ""
+
+    async def _receive_transcripts(self):
+        """
+        Read ASR results, tracking partial transcripts and answering final ones.
+        """
+        async for message in self._asr:
+            data = json.loads(message)
+            message_type = data.get("message_type")
+            if message_type == "PartialTranscript" and not self._answered_early:
+                self._partial_text = data.get("text", "")
+                self._speculate(self._partial_text)
+            elif message_type == "FinalTranscript":
+                self._partial_text = ""
+                if self._answered_early:
+                    # Already answered from the partial transcript when the endpointer fired
+                    self._answered_early = False
+                    logger.debug(f"Skipping final transcript answered early on call {self.call_sid}: {data.get('text')}")
+                elif data.get("text"):
+                    self._start_turn(data["text"])
+
+    def _speculate(self, text: str):
+        """
+        Start a Grok request from the partial transcript once it has stopped changing.
+        """
+        if not self.speculative:
+            return
+        key = transcript_key(text)
+        if key != self._partial_key:
+            self._partial_key, self._stable_partials = key, 0
+        self._stable_partials += 1
+
+        # A running turn is about to change the conversation the request would be based on
+        if (self._stable_partials < SPECULATION_STABLE_PARTIALS or len(key.split()) < SPECULATION_MIN_WORDS
+                or self._turns or (self._speculation and self._speculation.key == key)):
+            return
+        if self._speculation:
+            self._speculation.discard()
+        self._speculation = Speculation(text, self.conversation, STREAMING_TTS_ENABLED)
+        self.speculations += 1
+
+    def _claim_speculation(self, text: str):
+        """
+        Return the in-flight speculation if it answered `text`, cancelling it otherwise.
+        """
+        speculation, self._speculation = self._speculation, None
+        self._partial_key, self._stable_partials = "", 0
+        if speculation is None:
+            return None
+        if not speculation.matches(text, self.conversation):
+            speculation.discard()
+            return None
+
+        self.speculation_hits += 1
+        self.latency_saved += speculation.take()
+        self.conversation = speculation.state
+        return speculation
+
+    def _abandon_speculation(self):
+        if self._speculation:
+            self._speculation.discard("abandoned")
+            self._speculation = None
+
+    def _start_turn(self, text: str):
+        speculation = self._claim_speculation(text)
+        turn = asyncio.create_task(self._answer(text, speculation))
+        self._turns.add(turn)
+        turn.add_done_callback(self._turns.discard)
+
+    async def _answer(self, text: str, speculation=None):
+        async with self._turn_lock:
+            try:
+                if speculation:
+                    await self._respond(text, speculation)
+                else:
+                    await self.on_transcript(text)
+            except Exception as e:
+                logger.error(f"Failed to answer transcript on call {self.call_sid}: {e}")
+
+    async def _respond(self, text: str, speculation=None):
+        """
+        Answer a transcript on the call, then save the reply and state and finalize the call
+        record, as the webhook does for each turn.
+        """
+        if self.call_id is None:
+            self.call_id = await start_call(self.call_sid)
+        grok_reply = await respond_to_transcript(self.call_sid, text, self.conversation, speculation)
+        await complete_turn(self.call_id, self.call_sid, grok_reply, self.conversation)
+
+    async def close(self):
+        """
+        Flush remaining audio, end the ASR session and wait for in-flight answers.
+        """
+        self.buffer.close()
+        if self.call_sid:
+            try:
+                await mark_media_stream(self.call_sid, False)
+            except Exception as e:
+                logger.warning(f"Failed to clear the media stream marker for call {self.call_sid}: {e}")
+        if self._asr is None:
+            self._abandon_speculation()
+            return
+
+        try:
+            await asyncio.wait_for(self._forwarder, ASR_CLOSE_TIMEOUT)
+            await self._asr.send(json.dumps({"terminate_session": True}))
+            await asyncio.wait_for(self._receiver, ASR_CLOSE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"ASR session for call {self.call_sid} did not close cleanly: {e}")
+        finally:
+            self._forwarder.cancel()
+            self._receiver.cancel()
+            await self._asr.close()
+
+        # Kept until the ASR's last transcript was handled, which may have used it
+        self._abandon_speculation()
+        if self._turns:
+            await asyncio.gather(*self._turns, return_exceptions=True)
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import time
+from sqlalchemy.sql import select
+from utils.database import database
+from utils.validators import normalize_phone_number
+from db.models import patients
+from db.queries import get_patient_id_by_phone_query
+from loguru import logger
+
+# How often the phone-number index is reloaded from the database, in seconds
+PATIENT_RESOLVER_TTL = int(os.getenv("PATIENT_RESOLVER_TTL", "300"))
+
+# How long an unknown caller is remembered before the database is asked again, in seconds
+PATIENT_RESOLVER_NEGATIVE_TTL = int(os.getenv("PATIENT_RESOLVER_NEGATIVE_TTL", "60"))
+
+
+def _index_key(phone_number: str):
+    """
+    Index key for a phone number: its E.164 digits as an int, which is smaller than the string.
+    """
+    normalized = normalize_phone_number(phone_number)
+    return int(normalized[1:]) if normalized else None
+
+
+class PatientResolver:
+    """
+    In-memory caller ID lookup from phone number to patient id.
+
+    The index is loaded at startup and reloaded every PATIENT_RESOLVER_TTL seconds in the
+    background, so lookups never wait on the database. Numbers missing from the index
+    fall back to a single query, in case the patient was added since the last reload.
+    Code that writes patients should call remember() or invalidate().
+    """
+
+    def __init__(self, ttl: int = PATIENT_RESOLVER_TTL, negative_ttl: int = PATIENT_RESOLVER_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._index = {}
+        self._unknown = {}
+        self._refresh_task = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    async def load(self):
+        """
+        Rebuild the index from the patients table.
+        """
+        started = time.perf_counter()
+        rows = await database.fetch_all(select(patients.c.id, patients.c.phone_number))
+
+        index = {}
+        for row in rows:
+            key = _index_key(row["phone_number"])
+            if key is not None:
+                index[key] = row["id"]
+
+        self._index = index
+        self._unknown.clear()
+        self.reloads += 1
+        logger.info(f"Loaded {len(index)} patient phone numbers in {time.perf_counter() - started:.3f}s.")
+
+    async def start(self):
+        """
+        Load the index and keep it fresh in the background.
+        """
+        await self.load()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            # Wait for the task to finish, so a reload in progress does not outlive the database
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.ttl)
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"Failed to reload patient phone numbers: {e}")
+
+    async def resolve(self, phone_number: str):
+        """
+        Return the patient id for a phone number, or None if no patient has it.
+        """
+        key = _index_key(phone_number)
+        if key is None:
+            return None
+
+        patient_id = self._index.get(key)
+        if patient_id is not None:
+            self.hits += 1
+            return patient_id
+
+        self.misses += 1
+        expires = self._unknown.get(key)
+        if expires is not None and expires > time.monotonic():
+            return None
+
+        # Stored numbers may not be normalized, so try both spellings
+        candidates = {phone_number, normalize_phone_number(phone_number)}
+        patient = await database.fetch_one(get_patient_id_by_phone_query(list(candidates)))
+        if patient is None:
+            self._unknown[key] = time.monotonic() + self.negative_ttl
+            return None
+
+        self._index[key] = patient["id"]
+        return patient["id"]
+
+    def remember(self, phone_number: str, patient_id: int):
+        """
+        Record a patient's number after it has been written to the database.
+        """
+        key = _index_key(phone_number)
+        if key is not None:
+            self._index[key] = patient_id
+            self._unknown.pop(key, None)
+
+    def invalidate(self, phone_number: str = None):
+        """
+        Forget one number, or the whole index when no number is given.
+
+        Clearing the whole index sends lookups to the database until the next reload.
+        """
+        if phone_number is None:
+            self._index = {}
+            self._unknown.clear()
+            return
+
+        key = _index_key(phone_number)
+        self._index.pop(key, None)
+        self._unknown.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._index), "hits": self.hits, "misses": self.misses, "reloads": self.reloads}
+
+
+patient_resolver = PatientResolver()
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.sql import func, select
+from utils.database import InstrumentedDatabase, database
+from db.models import call_sessions
+from loguru import logger
+
+# Where per-call state lives: "memory" (a single worker), "sqlite" (workers on one host)
+# or "database" (the app's DATABASE_URL, shared by every worker and node)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+SESSION_STORE_SQLITE_URL = os.getenv("SESSION_STORE_SQLITE_URL", "sqlite+aiosqlite:///./call_sessions.db")
+
+# Sessions not written for this many seconds are discarded
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))
+
+# How often expired sessions are removed, in seconds
+SESSION_PURGE_INTERVAL = int(os.getenv("SESSION_PURGE_INTERVAL", "300"))
+
+
+class MemorySessionStore:
+    """
+    Session store kept in this process; state is lost on restart and invisible to other workers.
+
+    Expired keys are dropped when read, and all of them on the first write after each
+    `purge_interval`, so sessions of calls that never return do not pile up.
+    """
+    shared = False
+
+    def __init__(self, purge_interval: int = SESSION_PURGE_INTERVAL):
+        self._data = {}
+        self.purge_interval = purge_interval
+        self._next_purge = time.monotonic() + purge_interval
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value, ttl: int = SESSION_TTL):
+        now = time.monotonic()
+        if now >= self._next_purge:
+            await self.purge()
+        self._data[key] = (value, now + ttl)
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def purge(self):
+        now = time.monotonic()
+        for key, (_, expires_at) in list(self._data.items()):
+            if expires_at < now:
+                self._data.pop(key, None)
+        self._next_purge = now + self.purge_interval
+
+
+class DatabaseSessionStore:
+    """
+    Session store in the call_sessions table, readable by every worker using the same database.
+
+    Values are stored as JSON. Writes are a single upsert on SQLite and PostgreSQL.
+    Expired rows are deleted at startup and every `purge_interval` seconds after.
+    """
+    shared = True
+
+    def __init__(self, db, owns_connection: bool = False, purge_interval: int = SESSION_PURGE_INTERVAL):
+        self.database = db
+        # A store with its own database connects and creates its table itself
+        self.owns_connection = owns_connection
+        self.purge_interval = purge_interval
+        self._purge_task = None
+
+    async def start(self):
+        if self.owns_connection:
+            await self.database.connect()
+            await self.database.execute(CreateTable(call_sessions, if_not_exists=True))
+        await self.purge()
+        self._purge_task = asyncio.create_task(self._purge_loop())
+        logger.info(f"Session store ready ({self.database.dialect})")
+
+    async def stop(self):
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            self._purge_task = None
+        if self.owns_connection:
+            await self.database.disconnect()
+
+    async def get(self, key: str):
+        row = await self.database.fetch_one(
+            select(call_sessions.c.data, call_sessions.c.expires_at).where(call_sessions.c.key == key)
+        )
+        if row is None:
+            return None
+        if row["expires_at"] < datetime.now():
+            await self.delete(key)
+            return None
+        return json.loads(row["data"])
+
+    async def set(self, key: str, value, ttl: int = SESSION_TTL):
+        values = {
+            "data": json.dumps(value),
+            "expires_at": datetime.now() + timedelta(seconds=ttl),
+            "updated_at": func.now(),
+        }
+        insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(self.database.dialect)
+        if insert is not None:
+            statement = insert(call_sessions).values(key=key, **values)
+            await self.database.execute(statement.on_conflict_do_update(index_elements=["key"], set_=values))
+            return
+
+        async with self.database.transaction():
+            await self.delete(key)
+            await self.database.execute(call_sessions.insert().values(key=key, **values))
+
+    async def delete(self, key: str):
+        await self.database.execute(call_sessions.delete().where(call_sessions.c.key == key))
+
+    async def purge(self):
+        await self.database.execute(call_sessions.delete().where(call_sessions.c.expires_at < datetime.now()))
+
+    async def _purge_loop(self):
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                await self.purge()
+            except Exception as e:
+                logger.error(f"Failed to purge expired sessions: {e}")
+
+
+def create_session_store(kind: str = SESSION_STORE):
+    """
+    Build the session store named by SESSION_STORE.
+    """
+    if kind == "memory":
+        return MemorySessionStore()
+    if kind == "sqlite":
+        return DatabaseSessionStore(InstrumentedDatabase(SESSION_STORE_SQLITE_URL, name="sessions"), owns_connection=True)
+    if kind == "database":
+        return DatabaseSessionStore(database)
+    raise ValueError(f"Unknown SESSION_STORE {kind!r}; expected memory, sqlite or database")
+
+
+session_store = create_session_store()
@@ -1,28 +1,80 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import asyncio
 import os
 from loguru import logger
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-# Authenticate and initialize Google Sheets API
+# Google Sheets API scopes
 SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 
-# Load credentials file from environment
-credentials_file = os.getenv("GOOGLE_SHEETS_CREDENTIALS")
-if not credentials_file:
-    raise FileNotFoundError("GOOGLE_SHEETS_CREDENTIALS environment variable is not set.")
+# Write-behind settings: rows are buffered and appended in batches
+SHEETS_BATCH_SIZE = int(os.getenv("SHEETS_BATCH_SIZE", "50"))
+SHEETS_FLUSH_INTERVAL = float(os.getenv("SHEETS_FLUSH_INTERVAL", "2"))
+SHEETS_MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+SHEETS_RETRY_BASE_DELAY = float(os.getenv("SHEETS_RETRY_BASE_DELAY", "1"))
+
+# Longest shutdown spends retrying a failed batch, in seconds; rows still unwritten are dropped
+SHEETS_DRAIN_TIMEOUT = float(os.getenv("SHEETS_DRAIN_TIMEOUT", "5"))
+
+# Status codes worth retrying: quota exceeded and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_client = None
+_worksheet = None
+
+def get_sheets_client():
+    """
+    Authenticate with the Google Sheets API on first use and return the client.
+
+    gspread and oauth2client are imported on first use as well, keeping them out of app boot.
+    """
+    global _client
+    if _client is None:
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+
+        # Load credentials file from environment
+        credentials_file = os.getenv("GOOGLE_SHEETS_CREDENTIALS")
+        if not credentials_file:
+            raise FileNotFoundError("GOOGLE_SHEETS_CREDENTIALS environment variable is not set.")
+
+        try:
+            credentials = ServiceAccountCredentials.from_json_keyfile_name(credentials_file, SCOPE)
+            _client = gspread.authorize(credentials)
+            logger.info("Successfully authenticated with Google Sheets API.")
+        except Exception as e:
+            logger.error(f"Error authenticating Google Sheets API: {e}")
+            raise
+    return _client
+
+def get_worksheet():
+    """
+    Return the target worksheet, opening the spreadsheet only on first use.
+    """
+    import gspread
+
+    global _worksheet
+    if _worksheet is None:
+        sheet_name = os.getenv("GOOGLE_SHEET_NAME", "NHS Consultation Responses")
+        try:
+            _worksheet = get_sheets_client().open(sheet_name).sheet1
+        except gspread.SpreadsheetNotFound:
+            logger.error(f"Spreadsheet '{sheet_name}' not found. Check the name or permissions.")
+            raise
+    return _worksheet
+
+def _is_retryable(error: Exception) -> bool:
+    """
+    Quota and server errors from the API, and dropped connections and timeouts on the way to it.
+    """
+    import gspread
+    import requests
 
-# Authenticate with Google Sheets API
-try:
-    credentials = ServiceAccountCredentials.from_json_keyfile_name(credentials_file, SCOPE)
-    client = gspread.authorize(credentials)
-    logger.info("Successfully authenticated with Google Sheets API.")
-except Exception as e:
-    logger.error(f"Error authenticating Google Sheets API: {e}")
-    raise
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          ConnectionError, TimeoutError)):
+        return True
+    if not isinstance(error, gspread.exceptions.APIError):
+        return False
+    status = getattr(error, "code", None) or getattr(error.response, "status_code", None)
+    return status in RETRYABLE_STATUS_CODES
 
 def save_to_sheet(call_id: int, question: str, response: str):
     """
@@ -33,18 +85,147 @@ def save_to_sheet(call_id: int, question: str, response: str):
         question (str): The question asked during the call.
         response (str): The response provided by the patient.
     """
-    sheet_name = os.getenv("GOOGLE_SHEET_NAME", "NHS Consultation Responses")
-    
-    try:
-        # Open the Google Sheet
-        sheet = client.open(sheet_name).sheet1
+    import gspread
 
+    global _worksheet
+    try:
         # Append data to the Google Sheet
-        sheet.append_row([call_id, question, response])
+        get_worksheet().append_row([call_id, question, response])
         logger.info(f"Appended row to Google Sheet: Call ID: {call_id}, Question: {question}, Response: {response}")
     except gspread.SpreadsheetNotFound:
-        logger.error(f"Spreadsheet '{sheet_name}' not found. Check the name or permissions.")
         raise
     except Exception as e:
+        _worksheet = None
         logger.error(f"Failed to append data to Google Sheet: {e}")
         raise
+
+class SheetsWriter:
+    """
+    Background writer that coalesces rows into append_rows batches.
+
+    Rows are flushed when SHEETS_BATCH_SIZE rows are waiting or SHEETS_FLUSH_INTERVAL
+    seconds after the first row of a batch arrived, whichever comes first. Quota and
+    transient errors are retried with exponential backoff; once stop() is called, retries
+    only continue for SHEETS_DRAIN_TIMEOUT seconds so a Sheets outage cannot hold up shutdown.
+    """
+
+    def __init__(self, batch_size: int = SHEETS_BATCH_SIZE, flush_interval: float = SHEETS_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = None
+        self._task = None
+        self._stopping = None
+        self._drain_deadline = None
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """
+        Start the background flush loop.
+        """
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._stopping = asyncio.Event()
+        self._drain_deadline = None
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Google Sheets writer started (batch size: {self.batch_size}, interval: {self.flush_interval}s)")
+
+    async def enqueue(self, call_id: int, question: str, response: str):
+        """
+        Queue a row for the next batch. Writes directly if the writer is not running.
+        """
+        if not self.running:
+            await asyncio.to_thread(save_to_sheet, call_id, question, response)
+            return
+        await self._queue.put([call_id, question, response])
+
+    async def stop(self):
+        """
+        Flush every queued row and stop the background loop.
+        """
+        if not self.running:
+            return
+        self._drain_deadline = asyncio.get_running_loop().time() + SHEETS_DRAIN_TIMEOUT
+        self._stopping.set()
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info(
+            f"Google Sheets writer stopped: {self.rows_written} rows in {self.batches_written} batches, "
+            f"{self.rows_dropped} dropped"
+        )
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                break
+
+            batch = [row]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await self._flush(batch)
+
+    async def _flush(self, rows: list):
+        """
+        Append a batch, retrying quota, server and connection errors with exponential backoff.
+        """
+        global _worksheet
+        for attempt in range(SHEETS_MAX_RETRIES + 1):
+            try:
+                worksheet = await asyncio.to_thread(get_worksheet)
+                await asyncio.to_thread(worksheet.append_rows, rows)
+                self.rows_written += len(rows)
+                self.batches_written += 1
+                logger.info(f"Appended {len(rows)} rows to Google Sheet.")
+                return
+            except Exception as e:
+                delay = SHEETS_RETRY_BASE_DELAY * 2 ** attempt
+                if not _is_retryable(e) or attempt == SHEETS_MAX_RETRIES or not await self._wait_to_retry(delay, e):
+                    _worksheet = None
+                    self.rows_dropped += len(rows)
+                    logger.error(f"Failed to append {len(rows)} rows to Google Sheet: {e}")
+                    return
+
+    async def _wait_to_retry(self, delay: float, error: Exception) -> bool:
+        """
+        Back off before a retry. stop() cuts the wait short, and during shutdown a retry is
+        only made if it falls within the drain time; returns whether to retry.
+        """
+        loop = asyncio.get_running_loop()
+        resume_at = loop.time() + delay
+        if self._drain_deadline is None:
+            logger.warning(f"Google Sheets write failed ({error}); retrying in {delay:.1f}s")
+            stopping = asyncio.ensure_future(self._stopping.wait())
+            try:
+                await asyncio.wait({stopping}, timeout=delay)
+            finally:
+                stopping.cancel()
+        if self._drain_deadline is not None:
+            if resume_at > self._drain_deadline:
+                logger.warning("Shutting down; not retrying the Google Sheets write past the drain timeout")
+                return False
+            await asyncio.sleep(max(0.0, resume_at - loop.time()))
+        return True
+
+sheets_writer = SheetsWriter()
@@ -0,0 +1,300 @@
+import os
+import re
+from dataclasses import dataclass
+from datetime import date
+from pydantic import ValidationError
+from utils.validators import DateOfBirthAnswer, NoAllergiesAnswer, PhoneNumberAnswer, YesNoAnswer
+from utils.metrics import registry
+from loguru import logger
+
+# Answer structured questions locally when the parser is sure, instead of asking Grok
+SLOT_FAST_PATH_ENABLED = os.getenv("SLOT_FAST_PATH_ENABLED", "true").lower() == "true"
+
+# Matches scoring below this go to Grok
+SLOT_FAST_PATH_MIN_CONFIDENCE = float(os.getenv("SLOT_FAST_PATH_MIN_CONFIDENCE", "0.9"))
+
+# Yes/no answers longer than this usually carry detail the model should see
+MAX_YES_NO_WORDS = 10
+
+FAST_PATH_TURNS = registry.counter(
+    "slot_fast_path_turns_total",
+    "Patient answers by how they were handled: hit (answered locally), fallback (parser unsure) "
+    "or skipped (question not covered).",
+    ("field", "result"),
+)
+
+DIGITS = {"zero": 0, "oh": 0, "o": 0, "one": 1, "two": 2, "three": 3, "four": 4,
+          "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9}
+TEENS = {"ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15,
+         "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19}
+TENS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90}
+ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5, "sixth": 6, "seventh": 7,
+            "eighth": 8, "ninth": 9, "tenth": 10, "eleventh": 11, "twelfth": 12, "thirteenth": 13,
+            "fourteenth": 14, "fifteenth": 15, "sixteenth": 16, "seventeenth": 17, "eighteenth": 18,
+            "nineteenth": 19, "twentieth": 20, "thirtieth": 30}
+MONTHS = {name: number for number, names in enumerate((
+    ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"), ("may",), ("june", "jun"),
+    ("july", "jul"), ("august", "aug"), ("september", "sep", "sept"), ("october", "oct"),
+    ("november", "nov"), ("december", "dec"),
+), start=1) for name in names}
+# Number words a phone number or date never contains; their presence means the parse would guess
+MAGNITUDES = {"hundred", "thousand", "million"}
+
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/.\-](\d{1,2})[/.\-](\d{2}|\d{4})\b")
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+DAY_NUMBER = re.compile(r"^(\d{1,2})(st|nd|rd|th)?$")
+HEDGES = ("maybe", "not sure", "unsure", "don't know", "dont know", "i think", "possibly", "perhaps",
+          "can't remember", "cant remember", "sort of", "kind of")
+CONTRAST = re.compile(r"\b(but|except|apart from|other than|only|although|though)\b")
+# Phrases a "no allergies" answer may be built from; anything else in the answer (an allergy
+# named after "no", or "no idea") means the answer is not a plain no and goes to Grok
+NO_ALLERGY_PHRASE = (
+    r"(?:no|nope|nah|none|nothing)(?: at all)?"
+    r"|(?:i have |i've got |i've )?no(?: known)? allergies(?: at all)?"
+    r"|(?:i'm |i am )?not allergic to anything(?: at all)?"
+    r"|i (?:don't|dont|do not) have any(?: known)?(?: allergies)?"
+    r"|i (?:don't|dont|do not)"
+    r"|thanks|thank you"
+)
+NO_ALLERGIES = re.compile(rf"(?:{NO_ALLERGY_PHRASE})(?: (?:{NO_ALLERGY_PHRASE}))*")
+
+
+@dataclass
+class SlotMatch:
+    """
+    A value parsed from a patient's answer, normalized as the final summary expects.
+    """
+    field: str
+    value: str
+    confidence: float
+
+
+def _words(text: str) -> list:
+    text = text.lower().replace("-", " ").replace("\u2019", "'")
+    return re.findall(r"[a-z0-9']+", text)
+
+
+def _two_digits(tokens: list, start: int):
+    """
+    Read 0-99 from number words ("eighty two", "nineteen", "oh five"); returns (value, tokens used).
+    """
+    if start >= len(tokens):
+        return None, 0
+    token = tokens[start]
+    if token in TEENS:
+        return TEENS[token], 1
+    if token in TENS:
+        following = tokens[start + 1] if start + 1 < len(tokens) else None
+        if following in DIGITS and following not in ("zero", "oh", "o"):
+            return TENS[token] + DIGITS[following], 2
+        return TENS[token], 1
+    if token in ("oh", "o") and start + 1 < len(tokens) and tokens[start + 1] in DIGITS:
+        return DIGITS[tokens[start + 1]], 2
+    if token in DIGITS:
+        return DIGITS[token], 1
+    return None, 0
+
+
+def _year(tokens: list):
+    """
+    Read a year from "1982", "nineteen eighty two" or "two thousand five"; returns (year, tokens used).
+    """
+    if not tokens:
+        return None, 0
+    if tokens[0].isdigit() and len(tokens[0]) == 4:
+        return int(tokens[0]), 1
+    if tokens[:2] == ["two", "thousand"]:
+        rest, used = _two_digits(tokens, 2)
+        return 2000 + (rest or 0), 2 + used
+    century, used = _two_digits(tokens, 0)
+    if century is None or not 10 <= century <= 20:
+        return None, 0
+    rest, rest_used = _two_digits(tokens, used)
+    if rest is None:
+        return None, 0
+    return century * 100 + rest, used + rest_used
+
+
+def _day(tokens: list):
+    """
+    Read a day of the month from "14", "14th", "fourteenth" or "twenty first"; returns (day, tokens used).
+    """
+    if not tokens:
+        return None, 0
+    match = DAY_NUMBER.match(tokens[0])
+    if match:
+        return int(match.group(1)), 1
+    if tokens[0] in ("twenty", "thirty") and len(tokens) > 1 and tokens[1] in ORDINALS and ORDINALS[tokens[1]] < 10:
+        return TENS[tokens[0]] + ORDINALS[tokens[1]], 2
+    if tokens[0] in ORDINALS:
+        return ORDINALS[tokens[0]], 1
+    value, used = _two_digits(tokens, 0)
+    return value, used
+
+
+def _has_number(tokens: list) -> bool:
+    return any(token.isdigit() or token in DIGITS or token in TEENS or token in TENS or token in MAGNITUDES
+               for token in tokens if token not in ("o",))
+
+
+def parse_date_of_birth(text: str):
+    """
+    Parse a date of birth said or written as "14/03/1982", "1982-03-14", "14th March 1982"
+    or "the fourteenth of march nineteen eighty two". Numeric dates are read day first, and
+    are only confident when the other order is impossible.
+    """
+    match = ISO_DATE.search(text)
+    if match:
+        return _date_match(int(match.group(1)), int(match.group(2)), int(match.group(3)), 0.95)
+
+    match = NUMERIC_DATE.search(text)
+    if match:
+        day, month, year = (int(part) for part in match.groups())
+        if len(match.group(3)) == 2:
+            return _date_match(1900 + year, month, day, 0.5)
+        # Both orders are possible when the day is 12 or less; the UK writes the day first, but
+        # the score stays below SLOT_FAST_PATH_MIN_CONFIDENCE so Grok confirms the date
+        return _date_match(year, month, day, 0.8 if day <= 12 and day != month else 0.95)
+
+    tokens = [token for token in _words(text) if token not in ("the", "of", "on", "and")]
+    if any(token in MAGNITUDES - {"thousand"} for token in tokens):
+        return None
+    for index, token in enumerate(tokens):
+        if token not in MONTHS or (token == "may" and not _has_number(tokens[index + 1:])):
+            continue
+        before, after = tokens[:index], tokens[index + 1:]
+        # "14th March 1982", then "March 14th 1982"
+        day, used = _day(before[-2:])
+        if used != 2:
+            day, used = _day(before[-1:])
+        year_tokens = after
+        if day is None:
+            day, used = _day(after)
+            year_tokens = after[used:]
+        if day is None:
+            continue
+        year, year_used = _year(year_tokens)
+        if year is None or _has_number(year_tokens[year_used:]):
+            continue
+        return _date_match(year, MONTHS[token], day, 0.95)
+    return None
+
+
+def _date_match(year: int, month: int, day: int, confidence: float):
+    try:
+        answer = DateOfBirthAnswer(date_of_birth=date(year, month, day))
+    except (ValueError, ValidationError):
+        return None
+    return SlotMatch("date_of_birth", answer.date_of_birth.isoformat(), confidence)
+
+
+def parse_phone_number(text: str):
+    """
+    Parse a phone number given as digits or spoken ("oh seven seven double oh nine ...").
+    """
+    tokens = _words(text.replace("+", " plus "))
+    if any(token in MAGNITUDES for token in tokens):
+        return None
+
+    digits, repeat = "", 1
+    for token in tokens:
+        if token == "plus" and not digits:
+            digits = "+"
+        elif token in ("double", "triple"):
+            repeat = 2 if token == "double" else 3
+        elif token.isdigit():
+            digits += token[0] * (repeat - 1) + token
+            repeat = 1
+        elif token in DIGITS:
+            digits += str(DIGITS[token]) * repeat
+            repeat = 1
+        elif token in TEENS or token in TENS:
+            return None
+
+    try:
+        answer = PhoneNumberAnswer(phone_number=digits)
+    except ValidationError:
+        return None
+    # UK numbers have 10 digits after +44; anything else is left for the model to confirm
+    confident = answer.phone_number.startswith("+44") and len(answer.phone_number) == 13
+    return SlotMatch("phone_number", answer.phone_number, 0.95 if confident else 0.7)
+
+
+def parse_yes_no(text: str, field: str = "experienced_before"):
+    """
+    Parse a plain yes or no ("no, I haven't had this before"); hedged or qualified answers go to Grok.
+    """
+    lowered = " ".join(_words(text))
+    tokens = lowered.split()
+    if not tokens or len(tokens) > MAX_YES_NO_WORDS or any(hedge in lowered for hedge in HEDGES) or CONTRAST.search(lowered):
+        return None
+
+    negative = re.search(r"\b(no|nope|never|not|haven't|havent|hasn't|didn't|don't)\b", lowered)
+    positive = re.search(r"\b(yes|yeah|yep|yup|correct)\b|^i (have|did|do)\b|^i've\b", lowered)
+    if tokens[0] in ("yes", "yeah", "yep", "yup") and not negative:
+        answer = "yes"
+    elif tokens[0] in ("no", "nope", "never") and not re.search(r"\b(yes|yeah|yep|actually)\b", lowered):
+        answer = "no"
+    elif positive and not negative:
+        answer = "yes"
+    elif negative and not positive:
+        answer = "no"
+    else:
+        return None
+    return SlotMatch(field, YesNoAnswer(answer=answer).answer, 0.95)
+
+
+def parse_no_allergies(text: str):
+    """
+    Recognise answers that only say "no allergies"; any other words (an allergy, a hedge
+    such as "no idea" or "not that I know of") need the model.
+    """
+    lowered = " ".join(_words(text))
+    if not lowered or not NO_ALLERGIES.fullmatch(lowered):
+        return None
+    return SlotMatch("known_allergies", NoAllergiesAnswer().known_allergies, 0.95)
+
+
+PARSERS = {
+    "date_of_birth": parse_date_of_birth,
+    "phone_number": parse_phone_number,
+    "experienced_before": parse_yes_no,
+    "known_allergies": parse_no_allergies,
+}
+
+
+def extract_slot(field: str, text: str):
+    """
+    Parse the answer to the question about `field`, or return None to let Grok handle it.
+
+    Every answer is counted, so /metrics and the log show how often the fast path fires.
+    """
+    parser = PARSERS.get(field)
+    if not SLOT_FAST_PATH_ENABLED or parser is None:
+        FAST_PATH_TURNS.inc(field or "unknown", "skipped")
+        return None
+
+    match = parser(text)
+    if match is None or match.confidence < SLOT_FAST_PATH_MIN_CONFIDENCE:
+        FAST_PATH_TURNS.inc(field, "fallback")
+        logger.debug(f"Slot fast path unsure about {field} ({match.confidence if match else 'no match'}): {text!r}")
+        return None
+
+    FAST_PATH_TURNS.inc(field, "hit")
+    stats = fast_path_stats()
+    logger.info(f"Answered {field} locally as {match.value!r} "
+                f"(fast path {stats['hits']}/{stats['turns']} turns, {stats['hit_rate']:.0%})")
+    return match
+
+
+def fast_path_stats() -> dict:
+    counts = {"hit": 0, "fallback": 0, "skipped": 0}
+    for (_, result), value in FAST_PATH_TURNS.samples().items():
+        counts[result] += value
+    turns = sum(counts.values())
+    return {
+        "turns": int(turns),
+        "hits": int(counts["hit"]),
+        "fallbacks": int(counts["fallback"]),
+        "hit_rate": counts["hit"] / turns if turns else 0.0,
+    }
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import re
+import time
+from loguru import logger
+from services.conversation_state import ConversationState
+from services.grok_handler import process_response, stream_response
+from utils.metrics import registry
+
+# Start the Grok request from a stable partial transcript instead of waiting for the final one
+SPECULATIVE_LLM_ENABLED = os.getenv("SPECULATIVE_LLM_ENABLED", "true").lower() == "true"
+
+# A partial is stable once this many consecutive partials carry the same words
+SPECULATION_STABLE_PARTIALS = int(os.getenv("SPECULATION_STABLE_PARTIALS", "2"))
+
+# Shorter partials are not worth a request; they are usually the start of a longer answer
+SPECULATION_MIN_WORDS = int(os.getenv("SPECULATION_MIN_WORDS", "2"))
+
+SPECULATIONS = registry.counter(
+    "speculative_llm_requests_total",
+    "Speculative Grok requests by outcome: hit (reused), miss (cancelled and reissued) or abandoned.",
+    ("result",),
+)
+SPECULATION_SAVED = registry.histogram(
+    "speculative_llm_saved_seconds", "Time to the first reply token saved by each speculation hit."
+)
+
+NON_WORD = re.compile(r"[^\w\s']+")
+
+
+def transcript_key(text: str) -> str:
+    """
+    Words of a transcript without case or punctuation; final transcripts are formatted, partials are not.
+    """
+    return " ".join(NON_WORD.sub(" ", text.lower()).split())
+
+
+class Speculation:
+    """
+    A Grok request started from a partial transcript, on a copy of the conversation state.
+
+    The reply is buffered as it arrives. If the final transcript has the same words the
+    turn adopts the copy and the buffered reply (take()); otherwise the request is
+    cancelled (discard()) and the turn asks again from the final text.
+    """
+
+    def __init__(self, text: str, conversation: ConversationState, streaming: bool):
+        self.text = text
+        self.key = transcript_key(text)
+        self.state = ConversationState.from_dict(conversation.to_dict())
+        self.streaming = streaming
+        # Turns recorded when the copy was made; a turn finishing since then makes the copy stale
+        self.base_turns = len(conversation.transcript)
+        self.started = time.perf_counter()
+        self.first_output = None
+        self.reply = None
+        self._tokens = []
+        self._progress = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        try:
+            if self.streaming:
+                async for token in stream_response(self.text, self.state):
+                    if self.first_output is None:
+                        self.first_output = time.perf_counter()
+                    self._tokens.append(token)
+                    self._progress.set()
+            else:
+                self.reply, _ = await process_response(self.text, self.state)
+                self.first_output = time.perf_counter()
+        finally:
+            self._progress.set()
+
+    @property
+    def failed(self) -> bool:
+        return self._task.done() and (self._task.cancelled() or self._task.exception() is not None)
+
+    def matches(self, text: str, conversation: ConversationState) -> bool:
+        return (
+            self.key == transcript_key(text)
+            and self.base_turns == len(conversation.transcript)
+            and not self.failed
+        )
+
+    def take(self, final_at: float = None):
+        """
+        Record a hit and the time it saved: the request had a head start of up to
+        (final transcript time - start), bounded by when its first output arrived.
+        """
+        final_at = final_at or time.perf_counter()
+        ready_at = min(self.first_output or final_at, final_at)
+        saved = max(0.0, ready_at - self.started)
+        SPECULATIONS.inc("hit")
+        SPECULATION_SAVED.observe(saved)
+        logger.debug(f"Speculative reply reused, {saved:.3f}s saved: {self.text!r}")
+        return saved
+
+    def discard(self, result: str = "miss"):
+        self._task.cancel()
+        SPECULATIONS.inc(result)
+
+    async def tokens(self):
+        """
+        Replay the buffered reply tokens, then follow the request until it finishes.
+        """
+        index = 0
+        while True:
+            while index < len(self._tokens):
+                yield self._tokens[index]
+                index += 1
+            if self._task.done():
+                self._task.result()
+                return
+            self._progress.clear()
+            await self._progress.wait()
+
+    async def result(self) -> str:
+        """
+        The complete reply of a non-streaming speculation.
+        """
+        await asyncio.shield(self._task)
+        return self.reply
+
+
+def speculation_stats() -> dict:
+    hits, misses = SPECULATIONS.value("hit"), SPECULATIONS.value("miss")
+    _, saved, count = SPECULATION_SAVED.snapshot()
+    return {
+        "hits": int(hits),
+        "misses": int(misses),
+        "abandoned": int(SPECULATIONS.value("abandoned")),
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        "mean_saved_seconds": round(saved / count, 3) if count else 0.0,
+    }
@@ -0,0 +1,290 @@
+import asyncio
+import os
+import re
+import time
+import uuid
+from loguru import logger
+from services.eleven_labs_handler import synthesize_speech_async
+from services.grok_handler import stream_response
+from services.session_store import session_store
+
+# Stream Grok's reply into TTS sentence by sentence instead of waiting for the full completion
+STREAMING_TTS_ENABLED = os.getenv("STREAMING_TTS_ENABLED", "true").lower() == "true"
+
+# Sentences shorter than this are merged with the next one to avoid tiny TTS requests
+MIN_SENTENCE_CHARS = int(os.getenv("STREAMING_TTS_MIN_SENTENCE_CHARS", "20"))
+
+# Audio not collected by Twilio within this many seconds is discarded
+PENDING_AUDIO_TTL = int(os.getenv("STREAMING_TTS_PENDING_TTL", "300"))
+
+# With a shared session store, how long a worker waits for the next chunk another worker is synthesizing
+PENDING_AUDIO_WAIT = float(os.getenv("STREAMING_TTS_PENDING_WAIT", "15"))
+PENDING_AUDIO_POLL = float(os.getenv("STREAMING_TTS_PENDING_POLL_MS", "50")) / 1000
+
+# Public base URL Twilio uses to fetch follow-up audio; relative redirects are used when unset
+BASE_URL = os.getenv("BASE_URL", "")
+
+# Longest a call is held open for the media stream, in seconds
+STREAM_PAUSE_SECONDS = int(os.getenv("STREAM_PAUSE_SECONDS", "3600"))
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+# Remaining audio per call, collected by Twilio through the /twilio/calls/{call_sid}/speech redirect
+_pending_audio = {}
+# Tasks copying streamed audio URLs into a shared session store
+_publishers = set()
+
+
+async def split_sentences(tokens, min_chars: int = MIN_SENTENCE_CHARS):
+    """
+    Group a token stream into sentences as soon as each one is complete.
+
+    Args:
+        tokens: Async iterator of text fragments.
+        min_chars (int): Sentences shorter than this are held back and joined to the next.
+
+    Yields:
+        str: Complete sentences, followed by any trailing text when the stream ends.
+    """
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        parts = SENTENCE_BOUNDARY.split(buffer)
+        if len(parts) == 1:
+            continue
+
+        # Everything but the last part is complete; flush once it is long enough
+        complete = " ".join(part.strip() for part in parts[:-1] if part.strip())
+        if len(complete) >= min_chars:
+            yield complete
+            buffer = parts[-1]
+
+    if buffer.strip():
+        yield buffer.strip()
+
+
+async def _spoken_tokens(tokens):
+    """
+    Pass tokens through unless the reply is the final JSON summary, which is never spoken.
+    """
+    leading = ""
+    async for token in tokens:
+        if leading is not None:
+            leading += token
+            if not leading.strip():
+                continue
+            if leading.lstrip().startswith("{"):
+                async for _ in tokens:
+                    pass
+                return
+            token, leading = leading, None
+        yield token
+
+
+async def stream_speech(tokens, synthesize=synthesize_speech_async):
+    """
+    Turn a token stream into audio, synthesizing each sentence while later ones are generated.
+
+    Args:
+        tokens: Async iterator of text fragments from the LLM.
+        synthesize: Coroutine function converting text to an audio URL.
+
+    Yields:
+        str: Audio URLs in sentence order. The first one is available as soon as the first
+        sentence has been generated and synthesized.
+    """
+    queue = asyncio.Queue()
+
+    async def produce():
+        try:
+            async for sentence in split_sentences(_spoken_tokens(tokens)):
+                await queue.put(asyncio.ensure_future(synthesize(sentence)))
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            task = await queue.get()
+            if task is None:
+                break
+            yield await task
+        await producer
+    finally:
+        producer.cancel()
+        while not queue.empty():
+            task = queue.get_nowait()
+            if task is not None:
+                task.cancel()
+
+
+async def _collect_reply(tokens, reply: asyncio.Future):
+    """
+    Pass tokens through and resolve `reply` with the complete text once the stream ends,
+    or with None if it fails or is abandoned.
+    """
+    parts, finished = [], False
+    try:
+        async for token in tokens:
+            parts.append(token)
+            yield token
+        finished = True
+    finally:
+        if not reply.done():
+            reply.set_result("".join(parts) if finished else None)
+
+
+async def respond_with_speech(patient_input: str, conversation, tokens=None):
+    """
+    Stream Grok's reply to the patient's input straight into speech.
+
+    Args:
+        tokens: Reply tokens already being generated (e.g. by a speculative request);
+            when omitted Grok is asked here.
+
+    Returns:
+        tuple: The first audio URL (None if nothing is spoken), an async iterator over the
+        rest, and a future resolving to the complete reply text (None if the reply failed).
+    """
+    started = time.perf_counter()
+    reply = asyncio.get_running_loop().create_future()
+    tokens = tokens if tokens is not None else stream_response(patient_input, conversation)
+    audio = stream_speech(_collect_reply(tokens, reply))
+    try:
+        first_audio_url = await audio.__anext__()
+    except StopAsyncIteration:
+        return None, audio, reply
+    except Exception:
+        if not reply.done():
+            reply.set_result(None)
+        raise
+
+    logger.info(f"First audio ready after {time.perf_counter() - started:.3f}s: {first_audio_url}")
+    return first_audio_url, audio, reply
+
+
+def register_pending_audio(call_sid: str, audio):
+    """
+    Keep the rest of a streamed reply until Twilio asks for it.
+
+    With a shared session store the URLs are published to it as they are synthesized,
+    since Twilio's follow-up request may reach another worker.
+    """
+    if session_store.shared:
+        task = asyncio.ensure_future(_publish_pending_audio(call_sid, audio))
+        _publishers.add(task)
+        task.add_done_callback(_publishers.discard)
+        return
+
+    now = time.monotonic()
+    for sid, (_, created) in list(_pending_audio.items()):
+        if now - created > PENDING_AUDIO_TTL:
+            _pending_audio.pop(sid, None)
+    _pending_audio[call_sid] = (audio, now)
+
+
+async def next_pending_audio(call_sid: str):
+    """
+    Return the next audio URL queued for a call, or None once the reply is exhausted.
+    """
+    if session_store.shared:
+        return await _next_published_audio(call_sid)
+
+    entry = _pending_audio.get(call_sid)
+    if entry is None:
+        return None
+
+    try:
+        return await entry[0].__anext__()
+    except StopAsyncIteration:
+        _pending_audio.pop(call_sid, None)
+        return None
+
+
+async def _publish_pending_audio(call_sid: str, audio):
+    """
+    Store each audio URL of a reply under its own key as it is synthesized, then an end marker.
+
+    Keys are scoped by a reply id so a newer reply never mixes with an older one, and only
+    the reader writes the read position, so publisher and reader never overwrite each other.
+    """
+    reply = uuid.uuid4().hex
+    prefix = f"pending_audio:{call_sid}:{reply}"
+    await session_store.set(f"pending_audio:{call_sid}", {"reply": reply}, PENDING_AUDIO_TTL)
+    part = 0
+    try:
+        async for audio_url in audio:
+            await session_store.set(f"{prefix}:{part}", {"url": audio_url}, PENDING_AUDIO_TTL)
+            part += 1
+    except Exception as e:
+        logger.error(f"Failed to stream the rest of the reply for call {call_sid}: {e}")
+    finally:
+        await session_store.set(f"{prefix}:{part}", {"done": True}, PENDING_AUDIO_TTL)
+
+
+async def _next_published_audio(call_sid: str):
+    head = await session_store.get(f"pending_audio:{call_sid}")
+    if head is None:
+        return None
+
+    prefix = f"pending_audio:{call_sid}:{head['reply']}"
+    part = await session_store.get(f"{prefix}:next") or 0
+    deadline = time.monotonic() + PENDING_AUDIO_WAIT
+    while True:
+        entry = await session_store.get(f"{prefix}:{part}")
+        if entry is not None:
+            break
+        if time.monotonic() >= deadline:
+            logger.warning(f"Timed out waiting for reply audio {part} on call {call_sid}")
+            return None
+        await asyncio.sleep(PENDING_AUDIO_POLL)
+
+    if entry.get("done"):
+        return None
+    await session_store.set(f"{prefix}:next", part + 1, PENDING_AUDIO_TTL)
+    return entry["url"]
+
+
+def media_stream_url(base_url: str = None) -> str:
+    """
+    Websocket URL of the /stream/audio endpoint on the app's public host.
+    """
+    base_url = BASE_URL if base_url is None else base_url
+    return base_url.replace("https://", "wss://", 1).replace("http://", "ws://", 1) + "/stream/audio"
+
+
+async def mark_media_stream(call_sid: str, live: bool):
+    """
+    Record whether a call's audio is being streamed to /stream/audio, so TwiML sent later
+    in the call does not fork it a second time.
+    """
+    if not call_sid:
+        return
+    if live:
+        await session_store.set(f"media_stream:{call_sid}", True)
+    else:
+        await session_store.delete(f"media_stream:{call_sid}")
+
+
+async def build_listen_twiml(call_sid: str = None) -> str:
+    """
+    Build TwiML that keeps the call open for the caller's next answer once a reply has played.
+
+    The caller's audio is forked to /stream/audio unless the call's media stream is still
+    live, then the call pauses; a document that simply ended would hang up.
+    """
+    start = ""
+    if not call_sid or not await session_store.get(f"media_stream:{call_sid}"):
+        start = f'<Start><Stream url="{media_stream_url()}" track="inbound_track"/></Start>'
+    return f'<Response>{start}<Pause length="{STREAM_PAUSE_SECONDS}"/></Response>'
+
+
+def build_play_twiml(audio_url: str, call_sid: str = None) -> str:
+    """
+    Build TwiML that plays one audio chunk and redirects for the next; the redirect returns
+    build_listen_twiml() once the reply is exhausted, so the call stays open.
+    """
+    redirect = ""
+    if call_sid:
+        redirect = f'<Redirect method="POST">{BASE_URL}/twilio/calls/{call_sid}/speech</Redirect>'
+    return f"<Response><Play>{audio_url}</Play>{redirect}</Response>"
@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from loguru import logger
+
+# Cache settings
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".cache/tts")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# Payload bytes kept in TTS_CACHE_DIR; the oldest entries are removed beyond this
+TTS_CACHE_DISK_MAX_BYTES = int(os.getenv("TTS_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds an entry is served for; keep it below the lifetime of the hosted audio URLs
+TTS_CACHE_TTL = int(os.getenv("TTS_CACHE_TTL", "86400"))
+
+# A full disk tier is pruned to this share of its limit, so each scan frees room for many writes
+DISK_PRUNE_TARGET = 0.9
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text so trivially different phrasings share a cache entry.
+    """
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def cache_key(text: str, voice: str) -> str:
+    """
+    Build a content-addressed cache key from the normalized text and voice.
+    """
+    digest = hashlib.sha256(f"{voice}\x00{normalize_text(text)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TTSCache:
+    """
+    Two-tier cache for synthesized speech.
+
+    The memory tier is an LRU bounded by total payload bytes; the disk tier keeps entries
+    across restarts, bounded by `disk_max_bytes`, and drops the oldest files first. Entries
+    older than `ttl` seconds are misses in both tiers, since the cached audio URLs expire.
+    get_async()/put_async() keep disk access off the event loop.
+    """
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES,
+                 disk_max_bytes: int = TTS_CACHE_DISK_MAX_BYTES, ttl: int = TTS_CACHE_TTL):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._size = 0
+        # Bytes in the disk tier, measured once on the first write and then kept up to date by
+        # each write and prune; other workers write to it too, so each prune corrects it
+        self._disk_size = None
+        # Disk reads and writes run in threads; this guards the size and the disk counters
+        self._disk_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.expired = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.bin")
+
+    def _remember(self, key: str, payload: bytes, stored_at: float):
+        """
+        Insert into the memory tier, evicting least recently used entries over budget.
+        """
+        if len(payload) > self.max_bytes:
+            return
+        self._forget(key)
+        self._entries[key] = (payload, stored_at)
+        self._size += len(payload)
+        while self._size > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def _forget(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+    def _get_memory(self, key: str, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        payload, stored_at = entry
+        if now - stored_at < self.ttl:
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            return payload
+        self._forget(key)
+        return None
+
+    def _read_disk(self, key: str, now: float):
+        """
+        (payload, stored_at) of a live disk entry, or None. Expired files are removed.
+        """
+        path = self._path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if now - stored_at >= self.ttl:
+                self._remove_file(path)
+                with self._disk_lock:
+                    self.expired += 1
+                return None
+            with open(path, "rb") as f:
+                return f.read(), stored_at
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Failed to read TTS cache entry {key}: {e}")
+            return None
+
+    def _got_disk(self, key: str, entry):
+        if entry is None:
+            self.misses += 1
+            return None
+        payload, stored_at = entry
+        self.disk_hits += 1
+        self._remember(key, payload, stored_at)
+        return payload
+
+    def get(self, key: str):
+        """
+        Return the cached payload for a key, or None on a miss or once it has expired.
+        """
+        now = time.time()
+        payload = self._get_memory(key, now)
+        if payload is not None:
+            return payload
+        return self._got_disk(key, self._read_disk(key, now))
+
+    async def get_async(self, key: str):
+        """
+        get() for the event loop; only a memory miss goes to a thread to read the disk tier.
+        """
+        now = time.time()
+        payload = self._get_memory(key, now)
+        if payload is not None:
+            return payload
+        return self._got_disk(key, await asyncio.to_thread(self._read_disk, key, now))
+
+    def _write_disk(self, key: str, payload: bytes):
+        """
+        Write an entry atomically, so readers never see partial files, and account for its size.
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with self._disk_lock:
+            if self._disk_size is None:
+                self._disk_size = sum(size for _, _, size in self._disk_files())
+            try:
+                try:
+                    previous = os.path.getsize(path)
+                except FileNotFoundError:
+                    previous = 0
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Failed to write TTS cache entry {key}: {e}")
+                return
+
+            self._disk_size += len(payload) - previous
+            if self._disk_size > self.disk_max_bytes:
+                self._prune_disk()
+
+    def put(self, key: str, payload: bytes):
+        """
+        Store a payload in both tiers.
+        """
+        self._remember(key, payload, time.time())
+        self._write_disk(key, payload)
+
+    async def put_async(self, key: str, payload: bytes):
+        """
+        put() for the event loop; the disk write runs in a thread.
+        """
+        self._remember(key, payload, time.time())
+        await asyncio.to_thread(self._write_disk, key, payload)
+
+    def _disk_files(self) -> list:
+        """
+        (mtime, path, size) of every entry in the disk tier.
+        """
+        files = []
+        for directory, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                files.append((info.st_mtime, path, info.st_size))
+        return files
+
+    def _remove_file(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"Failed to remove TTS cache file {path}: {e}")
+            return False
+
+    def _prune_disk(self):
+        """
+        Remove expired files, then the oldest, until the disk tier is back under its target.
+        """
+        now = time.time()
+        files = sorted(self._disk_files())
+        size = sum(file_size for _, _, file_size in files)
+        target = self.disk_max_bytes * DISK_PRUNE_TARGET
+        removed = 0
+        for mtime, path, file_size in files:
+            if size <= target and now - mtime < self.ttl:
+                break
+            if self._remove_file(path):
+                size -= file_size
+                removed += 1
+        self._disk_size = size
+        self.disk_evictions += removed
+        logger.info(f"Pruned {removed} TTS cache files; {size} bytes left on disk")
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss counters and the usage of both tiers.
+        """
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+            "expired": self.expired,
+            "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "disk_bytes": self._disk_size,
+        }
+
+
+tts_cache = TTSCache()
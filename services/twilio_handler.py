@@ -1,7 +1,8 @@
 # File: services/twilio_handler.py
 
-from twilio.rest import Client
+import asyncio
 import os
+from utils.metrics import track_stage
 from loguru import logger
 
 # Load Twilio credentials from environment variables
@@ -9,10 +10,97 @@ TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 
-# Initialize the Twilio client
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+# Shared HTTP transport settings
+TWILIO_TIMEOUT = float(os.getenv("TWILIO_TIMEOUT", "10"))
+TWILIO_MAX_CONNECTIONS = int(os.getenv("TWILIO_MAX_CONNECTIONS", "20"))
+TWILIO_KEEPALIVE_SECONDS = float(os.getenv("TWILIO_KEEPALIVE_SECONDS", "30"))
 
-def send_reminder_message(phone_number: str, appointment_time: str):
+# Maximum Twilio API requests in flight across the process (SMS, new calls and TwiML updates)
+TWILIO_MAX_CONCURRENCY = int(os.getenv("TWILIO_MAX_CONCURRENCY", "10"))
+
+
+class TwilioAdapter:
+    """
+    Async Twilio REST client shared by the whole app.
+
+    Requests go through one pooled aiohttp session, so connections are reused, and a
+    semaphore caps how many are in flight, so an SMS burst cannot starve mid-call TwiML
+    updates. The session is created on first use inside the running event loop.
+    """
+
+    def __init__(self, account_sid: str = TWILIO_ACCOUNT_SID, auth_token: str = TWILIO_AUTH_TOKEN,
+                 max_concurrency: int = TWILIO_MAX_CONCURRENCY, http_client=None):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.max_concurrency = max_concurrency
+        # Optional replacement transport (a twilio AsyncHttpClient), e.g. a local fake for load tests
+        self.http_client = http_client
+        self._client = None
+        self._http_client = None
+        self._semaphore = None
+        self.requests = 0
+        self.failures = 0
+
+    def get_client(self):
+        """
+        Return the Twilio client, creating it and its pooled session on first use.
+
+        The Twilio SDK and aiohttp are imported here rather than at module import, which
+        keeps them out of app boot.
+        """
+        if self._client is None:
+            from aiohttp import ClientSession, ClientTimeout, TCPConnector
+            from twilio.http.async_http_client import AsyncTwilioHttpClient
+            from twilio.rest import Client
+
+            if self.http_client is not None:
+                self._http_client = self.http_client
+            else:
+                self._http_client = AsyncTwilioHttpClient(pool_connections=False, timeout=TWILIO_TIMEOUT)
+                self._http_client.session = ClientSession(
+                    connector=TCPConnector(limit=TWILIO_MAX_CONNECTIONS, keepalive_timeout=TWILIO_KEEPALIVE_SECONDS),
+                    timeout=ClientTimeout(total=TWILIO_TIMEOUT),
+                )
+            self._client = Client(self.account_sid, self.auth_token, http_client=self._http_client)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def _call(self, request):
+        client = self.get_client()
+        async with self._semaphore:
+            self.requests += 1
+            try:
+                with track_stage("twilio_request", "twilio"):
+                    return await request(client)
+            except Exception:
+                self.failures += 1
+                raise
+
+    async def send_sms(self, to: str, body: str, from_: str = TWILIO_PHONE_NUMBER):
+        return await self._call(lambda client: client.messages.create_async(body=body, from_=from_, to=to))
+
+    async def create_call(self, to: str, url: str, from_: str = TWILIO_PHONE_NUMBER):
+        return await self._call(lambda client: client.calls.create_async(to=to, from_=from_, url=url))
+
+    async def update_call(self, call_sid: str, twiml: str):
+        return await self._call(lambda client: client.calls(call_sid).update_async(twiml=twiml))
+
+    async def close(self):
+        """
+        Close the pooled session; a later request opens a new one.
+        """
+        if self._http_client is not None:
+            await self._http_client.close()
+        self._client = None
+        self._http_client = None
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "failures": self.failures}
+
+
+twilio_adapter = TwilioAdapter()
+
+async def send_reminder_message(phone_number: str, appointment_time: str):
     """
     Send an SMS reminder for an appointment.
 
@@ -22,18 +110,14 @@ def send_reminder_message(phone_number: str, appointment_time: str):
     """
     try:
         message_body = f"Reminder: You have an appointment scheduled for {appointment_time}. Please confirm your attendance."
-        message = twilio_client.messages.create(
-            body=message_body,
-            from_=TWILIO_PHONE_NUMBER,
-            to=phone_number
-        )
+        message = await twilio_adapter.send_sms(phone_number, message_body)
         logger.info(f"Sent reminder to {phone_number}: {message_body}")
         return message.sid
     except Exception as e:
         logger.error(f"Failed to send reminder to {phone_number}: {e}")
         raise
 
-def make_outgoing_call(phone_number: str, twiml_url: str):
+async def make_outgoing_call(phone_number: str, twiml_url: str):
     """
     Initiate an outgoing call to a patient.
 
@@ -42,13 +126,23 @@ def make_outgoing_call(phone_number: str, twiml_url: str):
         twiml_url (str): A URL that provides TwiML instructions for the call.
     """
     try:
-        call = twilio_client.calls.create(
-            to=phone_number,
-            from_=TWILIO_PHONE_NUMBER,
-            url=twiml_url
-        )
+        call = await twilio_adapter.create_call(phone_number, twiml_url)
         logger.info(f"Outgoing call initiated to {phone_number}")
         return call.sid
     except Exception as e:
         logger.error(f"Failed to make call to {phone_number}: {e}")
         raise
+
+async def update_call_twiml(call_sid: str, twiml: str):
+    """
+    Replace the TwiML running on a live call, e.g. to play the assistant's reply.
+
+    Args:
+        call_sid (str): The call to update.
+        twiml (str): TwiML document for Twilio to execute next.
+    """
+    try:
+        await twilio_adapter.update_call(call_sid, twiml)
+    except Exception as e:
+        logger.error(f"Failed to update call {call_sid}: {e}")
+        raise
@@ -0,0 +1,166 @@
+import os
+import wave
+from dataclasses import dataclass
+import numpy as np
+
+# Analysis frame length; Twilio delivers 20 ms frames
+VAD_FRAME_MS = 20
+
+# Frames louder than this (dBFS) can count as speech
+VAD_ENERGY_THRESHOLD_DB = float(os.getenv("VAD_ENERGY_THRESHOLD_DB", "-45"))
+
+# Speech must also be this far above the tracked background noise level
+VAD_NOISE_MARGIN_DB = float(os.getenv("VAD_NOISE_MARGIN_DB", "10"))
+
+# Frames whose zero-crossing rate exceeds this are treated as hiss or line noise, not voice
+VAD_MAX_ZCR = float(os.getenv("VAD_MAX_ZCR", "0.45"))
+
+# Speech must last this long before an utterance starts, so clicks and pops are ignored
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "120"))
+
+# Silence after speech that ends the utterance
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "400"))
+
+# Per-frame smoothing of the background noise estimate: it drops quickly to quieter frames and
+# rises slowly, so pauses between words keep it low while a steady hum is absorbed in a few seconds
+NOISE_FALL_RATE = 0.3
+NOISE_RISE_RATE = 0.01
+
+SPEECH_START = "speech_start"
+END_OF_UTTERANCE = "end_of_utterance"
+
+
+@dataclass
+class VADEvent:
+    """
+    A change in the caller's speech state. Times are seconds from the start of the stream.
+    """
+    kind: str
+    time: float
+    utterance_start: float = None
+
+
+def frame_features(samples: np.ndarray, frame_size: int) -> tuple:
+    """
+    Energy (dBFS) and zero-crossing rate of each whole frame, computed for all frames at once.
+
+    Args:
+        samples (np.ndarray): int16 samples; trailing samples short of a frame are ignored.
+        frame_size (int): Samples per frame.
+
+    Returns:
+        tuple: (energy_db, zcr) float arrays with one value per frame.
+    """
+    count = len(samples) // frame_size
+    frames = samples[:count * frame_size].reshape(count, frame_size).astype(np.float32)
+    power = np.mean(np.square(frames / 32768.0), axis=1)
+    energy_db = 10.0 * np.log10(power + 1e-10)
+    crossings = np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1])
+    zcr = crossings.mean(axis=1)
+    return energy_db, zcr
+
+
+class Endpointer:
+    """
+    Streaming voice-activity detector that reports when the caller starts and stops talking.
+
+    Audio of any length can be fed in; it is analysed in whole frames, carrying the remainder
+    over to the next call. An utterance starts after VAD_MIN_SPEECH_MS of speech frames and
+    ends after VAD_HANGOVER_MS of silence. Speech must clear both a fixed energy threshold and
+    the tracked background noise level, so a noisy line does not hold an utterance open.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 8000,
+        energy_threshold_db: float = VAD_ENERGY_THRESHOLD_DB,
+        noise_margin_db: float = VAD_NOISE_MARGIN_DB,
+        max_zcr: float = VAD_MAX_ZCR,
+        min_speech_ms: int = VAD_MIN_SPEECH_MS,
+        hangover_ms: int = VAD_HANGOVER_MS,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate * VAD_FRAME_MS // 1000
+        self.energy_threshold_db = energy_threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.max_zcr = max_zcr
+        self.min_speech_frames = max(1, min_speech_ms // VAD_FRAME_MS)
+        self.hangover_frames = max(1, hangover_ms // VAD_FRAME_MS)
+        self.noise_db = energy_threshold_db - noise_margin_db
+        self.in_speech = False
+        self.frames_processed = 0
+        self._remainder = np.empty(0, dtype=np.int16)
+        self._speech_run = 0
+        self._silence_run = 0
+        self._utterance_start = None
+
+    def process(self, samples: np.ndarray) -> list:
+        """
+        Analyse a batch of int16 samples.
+
+        Returns:
+            list[VADEvent]: Speech starts and ends detected in this batch, in order.
+        """
+        if len(self._remainder):
+            samples = np.concatenate((self._remainder, samples))
+        energy_db, zcr = frame_features(samples, self.frame_size)
+        self._remainder = samples[len(energy_db) * self.frame_size:].copy()
+
+        loud = (energy_db >= self.energy_threshold_db) & (zcr <= self.max_zcr)
+        events = []
+        for energy, is_loud in zip(energy_db.tolist(), loud.tolist()):
+            self.frames_processed += 1
+            is_speech = is_loud and energy >= self.noise_db + self.noise_margin_db
+            rate = NOISE_FALL_RATE if energy < self.noise_db else NOISE_RISE_RATE
+            self.noise_db += rate * (energy - self.noise_db)
+
+            if is_speech:
+                self._speech_run += 1
+                self._silence_run = 0
+                if not self.in_speech and self._speech_run >= self.min_speech_frames:
+                    self.in_speech = True
+                    self._utterance_start = self._frame_time(self.frames_processed - self._speech_run)
+                    events.append(VADEvent(SPEECH_START, self._utterance_start))
+            else:
+                self._speech_run = 0
+                self._silence_run += 1
+                if self.in_speech and self._silence_run >= self.hangover_frames:
+                    self.in_speech = False
+                    events.append(VADEvent(
+                        END_OF_UTTERANCE, self._frame_time(self.frames_processed), self._utterance_start
+                    ))
+        return events
+
+    def flush(self) -> list:
+        """
+        End the stream, closing any utterance still in progress.
+        """
+        if not self.in_speech:
+            return []
+        self.in_speech = False
+        return [VADEvent(END_OF_UTTERANCE, self._frame_time(self.frames_processed), self._utterance_start)]
+
+    def _frame_time(self, frame_index: int) -> float:
+        return frame_index * VAD_FRAME_MS / 1000
+
+
+def detect_utterances(samples: np.ndarray, sample_rate: int = 8000, **options) -> list:
+    """
+    Run the endpointer over a whole recording.
+
+    Returns:
+        list[tuple]: (start, end) seconds of each utterance.
+    """
+    endpointer = Endpointer(sample_rate, **options)
+    events = endpointer.process(samples) + endpointer.flush()
+    return [(event.utterance_start, event.time) for event in events if event.kind == END_OF_UTTERANCE]
+
+
+def read_wav(path: str) -> tuple:
+    """
+    Load a mono 16-bit WAV file as (samples, sample_rate).
+    """
+    with wave.open(path, "rb") as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError("Expected a mono 16-bit WAV file")
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2"), wav.getframerate()
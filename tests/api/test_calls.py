@@ -0,0 +1,56 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+import services.speech_pipeline as speech_pipeline
+from api.twilio_webhook import twilio_webhook_router
+from services.speech_pipeline import build_play_twiml, mark_media_stream
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(twilio_webhook_router, prefix="/twilio")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def _play(audio_urls):
+    for audio_url in audio_urls:
+        yield audio_url
+
+
+def test_play_twiml_redirects_for_more_audio():
+    assert build_play_twiml("https://audio/1.mp3", "CA1") == (
+        '<Response><Play>https://audio/1.mp3</Play>'
+        '<Redirect method="POST">/twilio/calls/CA1/speech</Redirect></Response>'
+    )
+
+
+@pytest.mark.asyncio
+async def test_last_twiml_of_a_reply_keeps_the_call_open(client, monkeypatch):
+    monkeypatch.setattr(speech_pipeline, "BASE_URL", "https://consult.example")
+    speech_pipeline.register_pending_audio("CA-keepalive", _play(["https://audio/2.mp3"]))
+
+    async with client:
+        played = await client.post("/twilio/calls/CA-keepalive/speech")
+        last = await client.post("/twilio/calls/CA-keepalive/speech")
+
+    assert "<Play>https://audio/2.mp3</Play>" in played.text
+    assert "/twilio/calls/CA-keepalive/speech</Redirect>" in played.text
+    # With no more audio the call must not fall off the end of the document and hang up
+    assert last.status_code == 200
+    assert last.text == (
+        '<Response><Start><Stream url="wss://consult.example/stream/audio" track="inbound_track"/></Start>'
+        f'<Pause length="{speech_pipeline.STREAM_PAUSE_SECONDS}"/></Response>'
+    )
+
+
+@pytest.mark.asyncio
+async def test_keeping_the_call_open_does_not_fork_a_live_stream_again(client):
+    await mark_media_stream("CA-live", True)
+    try:
+        async with client:
+            response = await client.post("/twilio/calls/CA-live/speech")
+    finally:
+        await mark_media_stream("CA-live", False)
+
+    assert response.text == f'<Response><Pause length="{speech_pipeline.STREAM_PAUSE_SECONDS}"/></Response>'
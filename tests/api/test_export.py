@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from fastapi import FastAPI
+import api.export
+from api.export import export_router
+from db.models import calls, consultation_summaries
+from db.queries import consultation_summary_values
+from services.export import EXPORT_COLUMNS, encode_csv, export_pages
+
+SUMMARY = {
+    "full_name": "Jane Smith", "date_of_birth": "1982-03-14", "phone_number": "07700 900123",
+    "reason_for_appointment": "Persistent cough", "experienced_before": "no", "duration_of_symptoms": "three weeks",
+    "current_medication": "None", "known_allergies": "Penicillin", "additional_notes": "",
+}
+
+
+async def _seed(db, start: datetime):
+    sid = f"CA-export-{start:%Y%m%d%H}"
+    completed = await db.execute(calls.insert().values(call_sid=f"{sid}-1", call_start=start))
+    unfinished = await db.execute(calls.insert().values(call_sid=f"{sid}-2", call_start=start + timedelta(minutes=1)))
+    await db.execute(consultation_summaries.insert().values(consultation_summary_values(completed, SUMMARY)))
+    return completed, unfinished
+
+
+@pytest.mark.asyncio
+async def test_export_has_one_row_per_call_with_its_summary(db):
+    start = datetime(2001, 1, 1, 9)
+    completed, unfinished = await _seed(db, start)
+
+    rows = [row async for page in export_pages(start, start + timedelta(hours=1), db, page_size=1) for row in page]
+
+    assert [row["call_id"] for row in rows] == [completed, unfinished]
+    assert rows[0]["full_name"] == "Jane Smith"
+    assert rows[0]["phone_number"] == "+447700900123"
+    assert rows[0]["known_allergies"] == "Penicillin"
+    assert rows[0]["experienced_before"] is False
+    assert rows[1]["full_name"] is None and rows[1]["summary_created_at"] is None
+
+
+@pytest.mark.asyncio
+async def test_csv_export_writes_the_header_and_dates(db):
+    start = datetime(2001, 2, 1, 9)
+    await _seed(db, start)
+
+    chunks = [chunk async for chunk in encode_csv(export_pages(start, start + timedelta(hours=1), db))]
+    lines = "".join(chunks).splitlines()
+
+    assert lines[0] == ",".join(EXPORT_COLUMNS)
+    assert len(lines) == 3
+    assert "1982-03-14" in lines[1]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api.export, "EXPORT_API_KEY", "s3cret")
+    app = FastAPI()
+    app.include_router(export_router, prefix="/export")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer wrong"}, {"Authorization": "s3cret"}])
+async def test_export_requires_the_api_key(client, headers):
+    response = await client.get("/export/calls", params={"start": "2001-01-01", "end": "2001-01-02"}, headers=headers)
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_export_streams_with_the_api_key(client, db):
+    start = datetime(2001, 3, 1, 9)
+    await _seed(db, start)
+
+    response = await client.get(
+        "/export/calls", params={"start": start.isoformat(), "end": (start + timedelta(hours=1)).isoformat(),
+                                 "format": "ndjson"},
+        headers={"Authorization": "Bearer s3cret"},
+    )
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 2
@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.sql import select
+import core.dispatch as dispatch
+from api.reminders import reminder_router
+from core.scheduler import ReminderScheduler, reminder_lease
+from db.models import appointments, patients
+from db.queries import get_due_reminders_page_query
+from utils.lease import DatabaseLease
+
+
+async def add_appointments(db, phone_number: str, times: list) -> list:
+    """
+    Insert a patient and one pending appointment per time; returns the appointment ids.
+    """
+    patient_id = await db.execute(patients.insert().values(phone_number=phone_number, name="Test Patient"))
+    return [
+        await db.execute(appointments.insert().values(patient_id=patient_id, appointment_time=time, reminder_sent=False))
+        for time in times
+    ]
+
+
+class SentMessages(list):
+    """
+    (phone number, appointment time) of each reminder sent; numbers in `failing` fail to send.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.failing = set()
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """
+    Replace the Twilio send with one that records each reminder and yields, so dispatches
+    overlap.
+    """
+    messages = SentMessages()
+    dispatch_reminders = dispatch.dispatch_reminders
+
+    async def send(phone_number, appointment_time):
+        await asyncio.sleep(0.01)
+        if phone_number in messages.failing:
+            raise RuntimeError("Twilio unavailable")
+        messages.append((phone_number, appointment_time))
+        return f"SM{len(messages)}"
+
+    async def fake_dispatch(appointments, **kwargs):
+        return await dispatch_reminders(appointments, send=send, rate_limit=0)
+
+    monkeypatch.setattr(dispatch, "dispatch_reminders", fake_dispatch)
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_endpoint_and_scheduler_runs_never_send_a_reminder_twice(db, sent):
+    times = [datetime(1990, 1, 1, 9, minute) for minute in range(5)]
+    ids = await add_appointments(db, "+15550100001", times)
+    scheduler = ReminderScheduler()
+
+    # Both see the same unsent rows; the lock makes the later one re-read them once marked
+    report, _ = await asyncio.gather(
+        dispatch.send_due_reminders(datetime(1990, 1, 2)),
+        scheduler._fire(dict(zip(ids, times))),
+    )
+
+    assert sorted(sent) == [("+15550100001", time) for time in times]
+    assert report.sent + scheduler.sent == len(times)
+    flags = await db.fetch_all(select(appointments.c.reminder_sent).where(appointments.c.id.in_(ids)))
+    assert all(row["reminder_sent"] for row in flags)
+
+
+async def add_patient_appointments(db, prefix: str, times: list) -> dict:
+    """
+    Insert one patient per appointment, so each reminder is identified by its phone number.
+
+    Returns:
+        dict: Phone number to appointment id.
+    """
+    phones = {}
+    for n, time in enumerate(times):
+        phone_number = f"{prefix}{n:02d}"
+        phones[phone_number] = (await add_appointments(db, phone_number, [time]))[0]
+    return phones
+
+
+@pytest.mark.asyncio
+async def test_pages_split_equal_appointment_times_by_id(db, sent):
+    # Seven appointments share one time, so page boundaries fall between equal timestamps
+    times = [datetime(1985, 1, 1, 9)] * 7 + [datetime(1985, 1, 1, 10)] * 2
+    phones = await add_patient_appointments(db, "+155501002", times)
+
+    first = await db.fetch_all(get_due_reminders_page_query(datetime(1985, 1, 2), None, 3))
+    after = (first[-1]["appointment_time"], first[-1]["id"])
+    second = await db.fetch_all(get_due_reminders_page_query(datetime(1985, 1, 2), after, 3))
+    assert [row["id"] for row in first + second] == sorted(phones.values())[:6]
+
+    report = await dispatch.send_due_reminders(datetime(1985, 1, 2), page_size=3)
+
+    assert report.pages == 3 and report.sent == 9 and report.failed == 0
+    assert sorted(phone for phone, _ in sent) == sorted(phones)
+    again = await dispatch.send_due_reminders(datetime(1985, 1, 2), page_size=3)
+    assert again.sent == 0 and len(sent) == 9
+
+
+@pytest.mark.asyncio
+async def test_each_batch_marks_only_its_sent_reminders(db, sent):
+    phones = await add_patient_appointments(db, "+155501003", [datetime(1980, 1, 1, 9, minute) for minute in range(5)])
+    # The fourth reminder, in the second batch, fails to send
+    failing = "+15550100303"
+    sent.failing.add(failing)
+
+    rows = await db.fetch_all(get_due_reminders_page_query(datetime(1980, 1, 2), None, 10))
+    report = await dispatch.send_reminders_in_batches(rows, batch_size=2)
+
+    assert (report.sent, report.failed) == (4, 1)
+    flags = await db.fetch_all(select(appointments.c.id, appointments.c.reminder_sent).where(
+        appointments.c.id.in_(phones.values())
+    ))
+    assert [row["id"] for row in flags if not row["reminder_sent"]] == [phones[failing]]
+
+    # The next run retries only the failed reminder
+    sent.failing.clear()
+    retry = await dispatch.send_due_reminders(datetime(1980, 1, 2))
+    assert retry.sent == 1 and sent[-1][0] == failing
+
+
+@pytest.mark.asyncio
+async def test_send_reminders_endpoint_requires_the_lease(db, sent):
+    app = FastAPI()
+    app.include_router(reminder_router, prefix="/reminders")
+    other = DatabaseLease(reminder_lease.name, holder="another-worker", db=db)
+
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            assert await other.acquire()
+            response = await client.get("/reminders/send_reminders")
+            assert response.status_code == 409
+
+            await other.release()
+            response = await client.get("/reminders/send_reminders")
+            assert response.status_code == 200
+            assert {"sent", "failed", "pages", "messages_per_second"} <= set(response.json())
+    finally:
+        await other.release()
+        await reminder_lease.release()
@@ -0,0 +1,18 @@
+import os
+import tempfile
+import pytest_asyncio
+
+# Modules read their settings at import; point the app database at a scratch SQLite file
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+
+
+@pytest_asyncio.fixture
+async def db():
+    """
+    The app database, created and migrated on the scratch file and closed after the test.
+    """
+    from utils.database import close_database, database, initialize_database
+
+    await initialize_database()
+    yield database
+    await close_database()
@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from sqlalchemy import exc
+from utils.database import POOL_TIMEOUTS, InstrumentedDatabase
+
+
+@pytest.mark.asyncio
+async def test_engine_is_created_on_first_use():
+    unconfigured = InstrumentedDatabase(None, name="unconfigured")
+    # Importing modules that hold a database needs no URL; using it does
+    with pytest.raises(RuntimeError, match="DATABASE_URL"):
+        await unconfigured.fetch_val("SELECT 1")
+    await unconfigured.disconnect()
+
+    scratch = InstrumentedDatabase("sqlite:///:memory:", name="scratch")
+    assert scratch._engine is None
+    assert await scratch.fetch_val("SELECT 1") == 1
+    assert scratch.dialect == "sqlite"
+    await scratch.disconnect()
+
+
+@pytest_asyncio.fixture
+async def scratch(tmp_path):
+    """
+    A file database with one pooled connection and a short pool timeout.
+    """
+    db = InstrumentedDatabase(
+        f"sqlite:///{tmp_path / 'database.db'}", name="test_pool", pool_size=1, max_overflow=0, pool_timeout=0.2
+    )
+    await db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    yield db
+    await db.disconnect()
+
+
+async def names(db) -> list:
+    return [row["name"] for row in await db.fetch_all("SELECT name FROM items ORDER BY id")]
+
+
+@pytest.mark.asyncio
+async def test_transaction_rolls_back_when_the_block_raises(scratch):
+    with pytest.raises(ValueError):
+        async with scratch.transaction():
+            await scratch.execute("INSERT INTO items (name) VALUES ('first')")
+            raise ValueError("abandon")
+
+    async with scratch.transaction():
+        await scratch.execute("INSERT INTO items (name) VALUES ('second')")
+    assert await names(scratch) == ["second"]
+
+
+@pytest.mark.asyncio
+async def test_nested_transactions_roll_back_to_their_savepoint(scratch):
+    async with scratch.transaction():
+        await scratch.execute("INSERT INTO items (name) VALUES ('outer')")
+        with pytest.raises(ValueError):
+            async with scratch.transaction():
+                await scratch.execute("INSERT INTO items (name) VALUES ('inner')")
+                raise ValueError("abandon inner")
+        async with scratch.transaction():
+            await scratch.execute("INSERT INTO items (name) VALUES ('kept')")
+        # Statements in the block see the transaction's own writes
+        assert await names(scratch) == ["outer", "kept"]
+
+    assert await names(scratch) == ["outer", "kept"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tasks_do_not_share_a_transaction(tmp_path):
+    db = InstrumentedDatabase(f"sqlite:///{tmp_path / 'tasks.db'}", name="test_tasks", pool_size=2, max_overflow=0)
+    await db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    inserted = asyncio.Event()
+    seen = []
+
+    async def reader():
+        await inserted.wait()
+        # Runs outside the other task's transaction, on its own connection
+        seen.append(await names(db))
+
+    try:
+        async with db.transaction():
+            await db.execute("INSERT INTO items (name) VALUES ('uncommitted')")
+            # A task started inside the block inherits the context, but not the transaction
+            task = asyncio.create_task(reader())
+            inserted.set()
+            await task
+        assert seen == [[]]
+        assert await names(db) == ["uncommitted"]
+    finally:
+        await db.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_pool_timeouts_are_counted(scratch):
+    timeouts = POOL_TIMEOUTS.value("test_pool")
+
+    async with scratch.transaction():
+        # The only connection belongs to the transaction; another task has to wait for it
+        with pytest.raises(exc.TimeoutError):
+            await asyncio.create_task(scratch.fetch_val("SELECT 1"))
+
+    assert scratch.timeouts == 1
+    assert POOL_TIMEOUTS.value("test_pool") == timeouts + 1
+    assert scratch.stats()["waiting"] == 0
+    assert await scratch.fetch_val("SELECT 1") == 1
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.sql import select
+from db.models import leases
+from utils.lease import DatabaseLease
+
+
+@pytest.mark.asyncio
+async def test_lease_is_held_by_one_worker_at_a_time(db):
+    first = DatabaseLease("test-exclusive", ttl=30, holder="worker-1", db=db)
+    second = DatabaseLease("test-exclusive", ttl=30, holder="worker-2", db=db)
+
+    assert await first.acquire() is True
+    assert await second.acquire() is False
+    assert first.held and not second.held
+
+    # The holder renews its own lease
+    assert await first.acquire() is True
+    await first.release()
+    await second.release()
+
+
+@pytest.mark.asyncio
+async def test_renewal_extends_the_expiry(db):
+    lease = DatabaseLease("test-renew", ttl=30, holder="worker-1", db=db)
+    query = select(leases.c.expires_at).where(leases.c.name == "test-renew")
+
+    await lease.acquire()
+    first_expiry = await db.fetch_val(query)
+    await lease.acquire()
+    assert await db.fetch_val(query) >= first_expiry
+    assert first_expiry > datetime.now() + timedelta(seconds=20)
+    await lease.release()
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_can_be_taken_over(db):
+    stale = DatabaseLease("test-expired", ttl=-1, holder="worker-1", db=db)
+    other = DatabaseLease("test-expired", ttl=30, holder="worker-2", db=db)
+
+    assert await stale.acquire() is True
+    assert await other.acquire() is True
+    assert await stale.acquire() is False
+    assert not stale.held
+    await other.release()
+
+
+@pytest.mark.asyncio
+async def test_release_frees_the_lease_and_ignores_other_holders(db):
+    first = DatabaseLease("test-release", ttl=30, holder="worker-1", db=db)
+    second = DatabaseLease("test-release", ttl=30, holder="worker-2", db=db)
+
+    await first.acquire()
+    # Releasing a lease held by another worker leaves it in place
+    await second.release()
+    assert await second.acquire() is False
+
+    await first.release()
+    assert not first.held
+    assert await second.acquire() is True
+    await second.release()
+    assert await db.fetch_val(select(leases.c.holder).where(leases.c.name == "test-release")) is None
+
+
+def test_renew_interval_is_a_third_of_the_ttl():
+    assert DatabaseLease("test-interval", ttl=30).renew_interval == 10
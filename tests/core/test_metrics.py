@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from httpx import ASGITransport, AsyncClient
+from fastapi import FastAPI
+from api.metrics import metrics_router
+from utils.metrics import STAGE_ERRORS, STAGE_IN_FLIGHT, STAGE_LATENCY, MetricsRegistry, instrumented, track_stage
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    histogram = MetricsRegistry().histogram("test_seconds", "Test latency.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "grok")
+
+    assert histogram.snapshot("grok") == ([2, 3, 4], 2.65, 4)
+    assert histogram.snapshot("other") == ([0, 0, 0], 0.0, 0)
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{stage="grok",le="0.1"} 2',
+        'test_seconds_bucket{stage="grok",le="1"} 3',
+        'test_seconds_bucket{stage="grok",le="+Inf"} 4',
+        'test_seconds_sum{stage="grok"} 2.65',
+        'test_seconds_count{stage="grok"} 4',
+    ]
+
+
+def test_registry_renders_each_metric_once():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test events.", ("result",))
+    assert registry.counter("test_total", "Registered again.", ("result",)) is counter
+    counter.inc("hit")
+    counter.inc("hit", amount=2)
+    registry.gauge("test_open", "Open things.").set(value=1.5)
+
+    assert registry.render() == "\n".join([
+        "# HELP test_total Test events.",
+        "# TYPE test_total counter",
+        'test_total{result="hit"} 3',
+        "# HELP test_open Open things.",
+        "# TYPE test_open gauge",
+        "test_open 1.5",
+    ]) + "\n"
+
+
+def test_track_stage_counts_latency_and_errors():
+    _, _, count = STAGE_LATENCY.snapshot("test_stage", "test")
+    errors = STAGE_ERRORS.value("test_stage", "test")
+
+    with track_stage("test_stage", "test"):
+        assert STAGE_IN_FLIGHT.value("test_stage", "test") == 1
+    with pytest.raises(ValueError):
+        with track_stage("test_stage", "test"):
+            raise ValueError("failed")
+
+    assert STAGE_LATENCY.snapshot("test_stage", "test")[2] == count + 2
+    assert STAGE_ERRORS.value("test_stage", "test") == errors + 1
+    assert STAGE_IN_FLIGHT.value("test_stage", "test") == 0
+
+
+@pytest.mark.asyncio
+async def test_instrumented_wraps_sync_and_async_functions():
+    @instrumented("test_async", "test", call_id_arg="call_sid")
+    async def answer(call_sid: str, text: str):
+        await asyncio.sleep(0)
+        return text
+
+    @instrumented("test_sync", "test")
+    def double(value):
+        return value * 2
+
+    assert await answer("CA1", text="hello") == "hello"
+    assert double(2) == 4
+    assert answer.__name__ == "answer"
+    assert STAGE_LATENCY.snapshot("test_async", "test")[2] >= 1
+    assert STAGE_LATENCY.snapshot("test_sync", "test")[2] >= 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_route_serves_the_text_format():
+    app = FastAPI()
+    app.include_router(metrics_router)
+    with track_stage("test_route", "test"):
+        pass
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE consultation_stage_duration_seconds histogram" in response.text
+    assert 'consultation_stage_duration_seconds_count{stage="test_route",provider="test"} 1' in response.text
+
+
+@pytest.mark.asyncio
+async def test_instrumented_async_generators_time_the_stream_and_first_item():
+    @instrumented("test_stream", "test", first_item_stage="test_stream_first")
+    async def tokens(fail: bool = False):
+        yield "a"
+        await asyncio.sleep(0.01)
+        yield "b"
+        if fail:
+            raise ValueError("stream broke")
+
+    streams = STAGE_LATENCY.snapshot("test_stream", "test")[2]
+    firsts = STAGE_LATENCY.snapshot("test_stream_first", "test")[2]
+    errors = STAGE_ERRORS.value("test_stream", "test")
+
+    assert [token async for token in tokens()] == ["a", "b"]
+    with pytest.raises(ValueError):
+        async for _ in tokens(fail=True):
+            pass
+    # A consumer that stops early is not an error
+    stream = tokens()
+    assert await stream.__anext__() == "a"
+    await stream.aclose()
+
+    assert STAGE_LATENCY.snapshot("test_stream", "test")[2] == streams + 3
+    assert STAGE_LATENCY.snapshot("test_stream_first", "test")[2] == firsts + 3
+    assert STAGE_ERRORS.value("test_stream", "test") == errors + 1
+    assert STAGE_IN_FLIGHT.value("test_stream", "test") == 0
+    # The first item arrives before the stream's sleep, so it is timed separately
+    assert STAGE_LATENCY.snapshot("test_stream_first", "test")[1] < STAGE_LATENCY.snapshot("test_stream", "test")[1]
@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+import pytest_asyncio
+import core.dispatch as dispatch
+import core.scheduler as scheduler_module
+from core.scheduler import REMINDER_LEAD, ReminderScheduler
+from db.init_db import init_db
+from db.models import appointments, patients
+from utils.database import InstrumentedDatabase
+from utils.lease import DatabaseLease
+
+EVERYTHING = (datetime.max, float("inf"))
+
+
+@pytest_asyncio.fixture
+async def scratch_db(tmp_path, monkeypatch):
+    """
+    A database of its own, so the scheduler only loads this test's appointments.
+    """
+    db = InstrumentedDatabase(f"sqlite:///{tmp_path / 'scheduler.db'}", name="scheduler_test")
+    await init_db(db.engine)
+    monkeypatch.setattr(scheduler_module, "database", db)
+    monkeypatch.setattr(dispatch, "database", db)
+    yield db
+    await db.disconnect()
+
+
+class SentMessages(list):
+    """
+    Phone numbers reminded, in send order; numbers in `failing` fail to send.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.failing = set()
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """
+    Replace the Twilio send with one recording each phone number.
+    """
+    messages = SentMessages()
+    dispatch_reminders = dispatch.dispatch_reminders
+
+    async def send(phone_number, appointment_time):
+        if phone_number in messages.failing:
+            raise RuntimeError("Twilio unavailable")
+        messages.append(phone_number)
+        return f"SM{len(messages)}"
+
+    async def fake_dispatch(appointments, **kwargs):
+        return await dispatch_reminders(appointments, send=send, rate_limit=0)
+
+    monkeypatch.setattr(dispatch, "dispatch_reminders", fake_dispatch)
+    return messages
+
+
+async def add_appointment(db, phone_number: str, appointment_time: datetime) -> int:
+    patient_id = await db.execute(patients.insert().values(phone_number=phone_number, name="Test Patient"))
+    return await db.execute(
+        appointments.insert().values(patient_id=patient_id, appointment_time=appointment_time, reminder_sent=False)
+    )
+
+
+async def eventually_leading(scheduler, timeout: float = 1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not (scheduler.leading and scheduler._wake is not None):
+        assert asyncio.get_running_loop().time() < deadline, "scheduler did not take the lease"
+        await asyncio.sleep(0.005)
+
+
+def due_in(seconds: float) -> datetime:
+    """
+    Appointment time whose reminder is due `seconds` from now.
+    """
+    return datetime.now() + REMINDER_LEAD + timedelta(seconds=seconds)
+
+
+def test_reminders_come_due_in_order():
+    scheduler = ReminderScheduler()
+    scheduler._bound = EVERYTHING
+    base = datetime(2030, 1, 1, 9)
+    scheduler.schedule(3, base + timedelta(hours=2))
+    scheduler.schedule(1, base + timedelta(hours=1))
+    scheduler.schedule(2, base + timedelta(hours=3))
+    # Moving an appointment leaves a stale heap entry that never fires
+    scheduler.schedule(2, base)
+
+    assert scheduler.next_due() == base - REMINDER_LEAD
+    assert list(scheduler._pop_due(base + timedelta(days=1))) == [2, 1, 3]
+    assert scheduler.next_due() is None
+
+
+def test_the_latest_reminder_is_evicted_at_the_bound():
+    scheduler = ReminderScheduler(max_jobs=2)
+    scheduler._bound = EVERYTHING
+    base = datetime(2030, 1, 1, 9)
+    scheduler.schedule(1, base)
+    scheduler.schedule(2, base + timedelta(hours=2))
+    scheduler.schedule(3, base + timedelta(hours=1))
+
+    assert scheduler._jobs == {1: base, 3: base + timedelta(hours=1)}
+    # The bound moves back before the evicted reminder, which is left to the database until then
+    assert scheduler._bound == (base + timedelta(hours=2), 1)
+    scheduler.schedule(4, base + timedelta(hours=5))
+    assert 4 not in scheduler._jobs
+
+
+def test_unbounded_schedule_is_left_to_the_database():
+    scheduler = ReminderScheduler()
+    scheduler.schedule(1, datetime(2030, 1, 1, 9))
+    assert scheduler._jobs == {}
+
+
+@pytest.mark.asyncio
+async def test_the_timer_rearms_for_the_next_reminder_after_firing(scratch_db, sent):
+    await add_appointment(scratch_db, "+15550200001", due_in(0.1))
+    await add_appointment(scratch_db, "+15550200002", due_in(0.6))
+    scheduler = ReminderScheduler(lease=DatabaseLease("test-scheduler-rearm", ttl=3, holder="me", db=scratch_db))
+
+    await scheduler.start()
+    try:
+        await asyncio.sleep(0.4)
+        assert sent == ["+15550200001"]
+        assert scheduler.leading and len(scheduler._jobs) == 1
+        await asyncio.sleep(0.5)
+        assert sent == ["+15550200001", "+15550200002"]
+    finally:
+        await scheduler.stop()
+    assert scheduler.stats()["sent"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_reminders_are_rearmed_for_a_retry(scratch_db, sent, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "REMINDER_RETRY_SECONDS", 60)
+    scheduler = ReminderScheduler()
+    scheduler._bound = EVERYTHING
+    soon, later = datetime.now() + timedelta(seconds=30), datetime.now() + timedelta(hours=2)
+    soon_id = await add_appointment(scratch_db, "+15550200003", soon)
+    later_id = await add_appointment(scratch_db, "+15550200004", later)
+    sent.failing = {"+15550200003", "+15550200004"}
+
+    await scheduler._fire({soon_id: soon, later_id: later})
+
+    # Only the appointment still far enough off is retried, a retry interval from now
+    assert scheduler.failed == 2
+    assert scheduler._jobs == {later_id: later}
+    assert scheduler.next_due() < datetime.now() + timedelta(seconds=61)
+
+
+@pytest.mark.asyncio
+async def test_nothing_is_sent_while_another_worker_holds_the_lease(scratch_db, sent):
+    await add_appointment(scratch_db, "+15550200005", due_in(-5))
+    other = DatabaseLease("test-scheduler-lease", ttl=30, holder="other", db=scratch_db)
+    assert await other.acquire()
+    scheduler = ReminderScheduler(lease=DatabaseLease("test-scheduler-lease", ttl=0.3, holder="me", db=scratch_db))
+
+    await scheduler.start()
+    try:
+        await asyncio.sleep(0.35)
+        assert not scheduler.leading
+        assert sent == []
+
+        # Taking over once the lease is free sends what is overdue
+        await other.release()
+        await asyncio.sleep(0.35)
+        assert scheduler.leading
+        assert sent == ["+15550200005"]
+    finally:
+        await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_resigning_straight_after_scheduling_does_not_hang(scratch_db, sent):
+    scheduler = ReminderScheduler(lease=DatabaseLease("test-scheduler-stop", ttl=3, holder="me", db=scratch_db))
+    await scheduler.start()
+    await eventually_leading(scheduler)
+
+    # schedule() wakes the timer; losing the lease in the same tick must still stop it
+    scheduler.schedule(1, datetime.now() + timedelta(hours=2))
+    try:
+        await asyncio.wait_for(scheduler._resign(), 2)
+        assert not scheduler.leading
+    finally:
+        await scheduler.stop()
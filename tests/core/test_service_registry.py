@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from utils.service_registry import ServiceRegistry
+
+
+def recording_registry(calls: list, failing: str = None) -> ServiceRegistry:
+    """
+    A registry of services that append "start <name>" / "stop <name>" to `calls`;
+    the service named `failing` raises on start.
+    """
+    def hook(action: str, name: str):
+        async def run():
+            if action == "start" and name == failing:
+                raise RuntimeError(f"{name} unavailable")
+            calls.append(f"{action} {name}")
+        return run
+
+    registry = ServiceRegistry()
+    registry.register("database", start=hook("start", "database"), stop=hook("stop", "database"))
+    # Stop-only services, such as provider clients created on first use
+    registry.register("twilio", stop=lambda: calls.append("stop twilio"))
+    registry.register("sheets", start=hook("start", "sheets"), stop=hook("stop", "sheets"))
+    registry.register("scheduler", start=hook("start", "scheduler"), stop=hook("stop", "scheduler"))
+    return registry
+
+
+@pytest.mark.asyncio
+async def test_services_start_in_order_and_stop_in_reverse():
+    calls = []
+    registry = recording_registry(calls)
+    await registry.start(warm_up=False)
+    await registry.stop()
+    assert calls == [
+        "start database", "start sheets", "start scheduler",
+        "stop scheduler", "stop sheets", "stop twilio", "stop database",
+    ]
+    assert set(registry.stats()["start_seconds"]) == {"database", "sheets", "scheduler"}
+
+
+@pytest.mark.asyncio
+async def test_a_failed_start_stops_the_services_already_started():
+    calls = []
+    registry = recording_registry(calls, failing="scheduler")
+    with pytest.raises(RuntimeError, match="scheduler unavailable"):
+        await registry.start(warm_up=False)
+    assert calls == ["start database", "start sheets", "stop sheets", "stop twilio", "stop database"]
+
+
+@pytest.mark.asyncio
+async def test_a_failed_stop_during_rollback_does_not_hide_the_start_error():
+    calls = []
+    registry = recording_registry(calls, failing="scheduler")
+    registry._services[2].stop = lambda: 1 / 0
+    with pytest.raises(RuntimeError, match="scheduler unavailable"):
+        await registry.start(warm_up=False)
+    assert calls == ["start database", "start sheets", "stop twilio", "stop database"]
+
+
+@pytest.mark.asyncio
+async def test_warm_up_runs_after_boot_and_failures_are_only_recorded():
+    registry = ServiceRegistry()
+    warmed = asyncio.Event()
+
+    async def warm_grok():
+        await asyncio.sleep(0.01)
+        warmed.set()
+
+    def warm_tts():
+        raise ConnectionError("ElevenLabs unreachable")
+
+    registry.register("grok", warm_up=warm_grok)
+    registry.register("tts", warm_up=warm_tts)
+    await registry.start(warm_up=True)
+    assert not warmed.is_set()
+
+    await registry.wait_warm()
+    assert warmed.is_set()
+    assert registry.stats()["warm_up_errors"] == {"tts": "ElevenLabs unreachable"}
+    assert set(registry.stats()["warm_up_seconds"]) == {"grok", "tts"}
+    await registry.stop()
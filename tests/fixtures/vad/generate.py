@@ -0,0 +1,79 @@
+"""
+Writes the endpointer's WAV fixtures and their labels; the output is deterministic, so
+rerunning it only changes the files when the generator changes.
+
+    python -m tests.fixtures.vad.generate
+
+Each `<name>.wav` (mono 16-bit) has a `<name>.json` next to it holding the utterances as
+[[start, end], ...] in seconds, the format benchmarks/bench_vad.py reads. Voiced speech is a
+harmonic series with syllable-rate amplitude changes, as in the benchmark's synthetic call.
+"""
+import json
+import os
+import wave
+import numpy as np
+
+FIXTURE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def voiced(seconds: float, sample_rate: int, pitch: float = 140, level: float = 5000) -> np.ndarray:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    harmonics = sum(np.sin(2 * np.pi * pitch * harmonic * t) / harmonic for harmonic in (1, 2, 3, 5))
+    return level * envelope * harmonics
+
+
+def recording(script: list, sample_rate: int, pitch: float = 140, level: float = 5000) -> tuple:
+    """
+    Build (audio, labels) from [(speech_seconds, pause_seconds), ...]; labels are the voiced spans.
+    """
+    segments, labels, position = [], [], 0.0
+    for speech_seconds, pause_seconds in script:
+        if speech_seconds:
+            segments.append(voiced(speech_seconds, sample_rate, pitch, level))
+            labels.append([round(position, 3), round(position + speech_seconds, 3)])
+            position += speech_seconds
+        segments.append(np.zeros(int(pause_seconds * sample_rate)))
+        position += pause_seconds
+    return np.concatenate(segments), labels
+
+
+def write(name: str, audio: np.ndarray, sample_rate: int, labels: list):
+    samples = np.clip(np.round(audio), -32768, 32767).astype("<i2")
+    with wave.open(os.path.join(FIXTURE_DIR, f"{name}.wav"), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    with open(os.path.join(FIXTURE_DIR, f"{name}.json"), "w") as f:
+        json.dump(labels, f)
+        f.write("\n")
+
+
+def main():
+    rng = np.random.default_rng(12)
+
+    # A name and a date of birth on a quiet line, with a short breath inside the second answer
+    audio, _ = recording([(0.0, 0.5), (1.2, 1.0), (0.9, 0.2), (0.7, 0.8)], 8000)
+    write("two_answers_8k", audio + rng.normal(0, 40, len(audio)), 8000, [[0.5, 1.7], [2.7, 4.5]])
+
+    # One answer on a line with hiss above the energy threshold, which the zero-crossing rate rejects
+    audio, labels = recording([(0.0, 1.5), (1.6, 1.2)], 8000, pitch=210, level=4000)
+    write("hiss_8k", audio + rng.normal(0, 400, len(audio)), 8000, labels)
+
+    # Wideband audio, as sent to the ASR after resampling
+    audio, labels = recording([(0.0, 0.4), (1.0, 0.9), (1.5, 0.7)], 16000, pitch=120)
+    write("wideband_16k", audio + rng.normal(0, 40, len(audio)), 16000, labels)
+
+    # The caller is still talking when the recording stops
+    audio, labels = recording([(0.0, 0.6), (1.1, 0.0)], 8000)
+    write("cut_off_8k", audio + rng.normal(0, 40, len(audio)), 8000, labels)
+
+    # Line noise and a click, with no speech at all
+    audio = rng.normal(0, 60, 8000 * 2)
+    audio[8000:8040] += 20000
+    write("line_noise_8k", audio, 8000, [])
+
+
+if __name__ == "__main__":
+    main()
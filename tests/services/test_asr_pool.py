@@ -0,0 +1,156 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+import pytest_asyncio
+import services.asr_pool as asr_pool_module
+from services.asr_pool import ASRSessionPool
+
+
+class FakeWebSocket:
+    """
+    Real-time ASR session that answers pings unless told otherwise.
+    """
+
+    def __init__(self, number: int, sample_rate: int, encoding: str):
+        self.number = number
+        self.format = (sample_rate, encoding)
+        self.state = SimpleNamespace(name="OPEN")
+        self.answers_pings = True
+        self.closed = False
+
+    async def ping(self):
+        pong = asyncio.get_running_loop().create_future()
+        if self.answers_pings:
+            pong.set_result(None)
+        return pong
+
+    async def close(self):
+        self.closed = True
+        self.state = SimpleNamespace(name="CLOSED")
+
+
+class FakeProvider:
+    def __init__(self):
+        self.sockets = []
+        self.failures = 0
+
+    async def connect(self, sample_rate: int, encoding: str):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("handshake failed")
+        websocket = FakeWebSocket(len(self.sockets), sample_rate, encoding)
+        self.sockets.append(websocket)
+        return websocket
+
+
+async def eventually(condition, timeout: float = 1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.005)
+
+
+@pytest.fixture
+def provider():
+    return FakeProvider()
+
+
+@pytest_asyncio.fixture
+async def pool(provider):
+    pool = ASRSessionPool(provider.connect, 16000, "pcm_s16le", size=2)
+    await pool.start()
+    await eventually(lambda: len(pool._idle) == 2)
+    yield pool
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_acquire_hands_out_a_ready_session_and_refills(pool, provider):
+    websocket = await pool.acquire()
+
+    assert websocket is provider.sockets[0]
+    assert pool.hits == 1 and pool.misses == 0
+    # The pool tops itself back up in the background
+    await eventually(lambda: len(pool._idle) == 2)
+    assert len(provider.sockets) == 3
+
+
+@pytest.mark.asyncio
+async def test_other_formats_and_an_empty_pool_connect_directly(pool, provider):
+    mulaw = await pool.acquire(sample_rate=8000, encoding="pcm_mulaw")
+    assert mulaw.format == (8000, "pcm_mulaw")
+    assert pool.misses == 1 and len(pool._idle) == 2
+
+    # Stopping straight after an acquisition woke the refill loop must not hang
+    await pool.stop()
+    assert (await pool.acquire()).format == (16000, "pcm_s16le")
+    assert pool.misses == 2 and pool.hits == 0
+
+
+@pytest.mark.asyncio
+async def test_closed_sessions_are_skipped_and_replaced(pool, provider):
+    closed, ready = provider.sockets
+    await closed.close()
+
+    assert await pool.acquire() is ready
+    assert pool.reconnects == 1 and pool.hits == 1
+    await eventually(lambda: len(pool._idle) == 2)
+    assert all(not websocket.closed for websocket, _ in pool._idle)
+
+
+@pytest.mark.asyncio
+async def test_sessions_failing_the_health_check_are_replaced(provider, monkeypatch):
+    monkeypatch.setattr(asr_pool_module, "ASR_POOL_HEALTH_INTERVAL", 0.02)
+    monkeypatch.setattr(asr_pool_module, "ASR_POOL_PING_TIMEOUT", 0.01)
+    pool = ASRSessionPool(provider.connect, 16000, "pcm_s16le", size=2)
+    await pool.start()
+    try:
+        await eventually(lambda: len(pool._idle) == 2)
+        silent = provider.sockets[0]
+        silent.answers_pings = False
+
+        await eventually(lambda: silent.closed and len(pool._idle) == 2)
+        assert pool.reconnects == 1
+        assert silent not in [websocket for websocket, _ in pool._idle]
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_sessions_idle_too_long_are_replaced(pool, provider, monkeypatch):
+    monkeypatch.setattr(asr_pool_module, "ASR_POOL_MAX_IDLE_SECONDS", 0)
+    old = [websocket for websocket, _ in pool._idle]
+
+    await pool._check_idle()
+
+    assert all(websocket.closed for websocket in old)
+    assert pool.reconnects == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_connections_are_counted_and_retried(provider, monkeypatch):
+    monkeypatch.setattr(asr_pool_module, "ASR_POOL_RETRY_DELAY", 0.01)
+    provider.failures = 1
+    pool = ASRSessionPool(provider.connect, 16000, "pcm_s16le", size=2)
+
+    await pool.start()
+    try:
+        await eventually(lambda: len(pool._idle) == 2)
+        assert pool.connect_failures == 1
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_closes_idle_sessions_and_stops_refilling(pool, provider):
+    task = pool._task
+    await pool.start()
+    assert pool._task is task
+
+    await pool.stop()
+
+    assert task.done() and not pool.running
+    assert all(websocket.closed for websocket in provider.sockets)
+    assert pool.stats()["idle"] == 0
+    await asyncio.sleep(0.02)
+    assert len(provider.sockets) == 2
@@ -0,0 +1,96 @@
+import warnings
+import numpy as np
+import pytest
+from services.audio_codec import (
+    PCM16_TO_ULAW, ULAW_TO_PCM16, Resampler, TelephonyTranscoder, pcm16_to_ulaw, ulaw_to_pcm16,
+)
+
+ALL_CODES = bytes(range(256))
+
+
+def tone(frequency: float, sample_rate: int, seconds: float, level: float = 10000) -> np.ndarray:
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    return np.rint(level * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+
+
+def test_decode_table_values():
+    assert ULAW_TO_PCM16.dtype == np.int16 and PCM16_TO_ULAW.dtype == np.uint8
+    # 0xFF and 0x7F are the two zeros; 0x00 and 0x80 the extremes
+    assert ULAW_TO_PCM16[[0x00, 0x7F, 0x80, 0xFF]].tolist() == [-32124, 0, 32124, 0]
+    assert (ULAW_TO_PCM16[:0x80] <= 0).all() and (ULAW_TO_PCM16[0x80:] >= 0).all()
+
+
+def test_matches_the_reference_codec():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        audioop = pytest.importorskip("audioop")
+    pcm = np.arange(-32768, 32768, dtype=np.int16)
+    assert (ulaw_to_pcm16(ALL_CODES) == np.frombuffer(audioop.ulaw2lin(ALL_CODES, 2), "<i2")).all()
+    assert (pcm16_to_ulaw(pcm) == np.frombuffer(audioop.lin2ulaw(pcm.tobytes(), 2), np.uint8)).all()
+
+
+def test_round_trip_keeps_every_code_but_negative_zero():
+    codes = pcm16_to_ulaw(ulaw_to_pcm16(ALL_CODES))
+    changed = np.nonzero(codes != np.arange(256))[0].tolist()
+    assert changed == [0x7F]
+    assert codes[0x7F] == 0xFF
+
+
+def test_encoding_error_stays_within_the_step_size():
+    samples = tone(440, 8000, 0.1)
+    decoded = ulaw_to_pcm16(pcm16_to_ulaw(samples)).astype(np.int32)
+    error = np.abs(decoded - samples)
+    # Mu-law steps grow with the magnitude: at most 1/16 of it, plus the smallest step
+    assert (error <= np.abs(samples.astype(np.int32)) // 16 + 8).all()
+
+
+def test_accepts_bytes_arrays_and_an_output_buffer():
+    samples = tone(300, 8000, 0.02)
+    codes = pcm16_to_ulaw(samples)
+    assert (pcm16_to_ulaw(samples.astype("<i2").tobytes()) == codes).all()
+    assert (ulaw_to_pcm16(memoryview(codes.tobytes())) == ulaw_to_pcm16(codes)).all()
+
+    out = np.empty(len(codes), dtype=np.int16)
+    assert ulaw_to_pcm16(codes, out=out) is out
+    assert (out == ULAW_TO_PCM16[codes]).all()
+
+
+def test_resampler_passes_through_equal_rates():
+    samples = tone(300, 8000, 0.02)
+    assert Resampler(8000, 8000).process(samples) is samples
+
+
+def test_resampler_interpolates_between_samples():
+    ramp = np.arange(10, dtype=np.int16) * 100
+    assert Resampler(8000, 16000).process(ramp).tolist() == list(range(0, 901, 50))
+    assert Resampler(16000, 8000).process(ramp).tolist() == list(range(0, 901, 200))
+
+
+@pytest.mark.parametrize("from_rate, to_rate", [(8000, 16000), (8000, 22050), (16000, 8000)])
+@pytest.mark.parametrize("chunk", [160, 37])
+def test_chunked_resampling_matches_one_batch(from_rate, to_rate, chunk):
+    samples = tone(440, from_rate, 0.5)
+    whole = Resampler(from_rate, to_rate).process(samples)
+
+    resampler = Resampler(from_rate, to_rate)
+    streamed = np.concatenate([resampler.process(samples[i:i + chunk]) for i in range(0, len(samples), chunk)])
+
+    assert len(streamed) == len(whole)
+    assert np.abs(streamed.astype(np.int32) - whole).max() <= 1
+    # Output runs up to the last input sample; the rest of the interval comes with the next batch
+    assert abs(len(whole) - ((len(samples) - 1) * to_rate / from_rate + 1)) <= 1
+
+
+def test_resampling_keeps_the_pitch():
+    resampled = Resampler(8000, 16000).process(tone(440, 8000, 1.0))
+    spectrum = np.abs(np.fft.rfft(resampled))
+    peak = np.argmax(spectrum) * 16000 / len(resampled)
+    assert peak == pytest.approx(440, abs=2)
+
+
+def test_transcoder_outputs_little_endian_pcm_at_the_asr_rate():
+    samples = tone(440, 8000, 0.02)
+    payload = pcm16_to_ulaw(samples).tobytes()
+    pcm = np.frombuffer(TelephonyTranscoder(16000).transcode(payload), "<i2")
+    assert abs(len(pcm) - 2 * len(samples)) <= 1
+    assert (pcm[::2][:len(samples)] == ulaw_to_pcm16(payload)[:len(pcm[::2])]).all()
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+import pytest
+from db.models import calls
+from services.assistant_logic import finalize_call
+from services.call_stats import (
+    CALL_DURATION_BUCKETS, bucket_percentile, default_stats_range, duration_bucket, get_call_stats, period_start,
+)
+
+
+def test_duration_bucket_uses_lower_bounds():
+    assert duration_bucket(0) == 0
+    assert duration_bucket(14.9) == 0
+    assert duration_bucket(15) == 15
+    assert duration_bucket(299) == 240
+    assert duration_bucket(10000) == CALL_DURATION_BUCKETS[-1]
+
+
+def test_period_start():
+    moment = datetime(2024, 5, 3, 14, 37, 12, 500)
+    assert period_start(moment, "hour") == datetime(2024, 5, 3, 14)
+    assert period_start(moment, "day") == datetime(2024, 5, 3)
+
+
+def test_bucket_percentile_interpolates_within_a_bucket():
+    # 10 calls of 60-90s and 10 of 90-120s
+    buckets = [(60, 10, 750.0), (90, 10, 1050.0)]
+    assert bucket_percentile(buckets, 0.5) == 90
+    assert bucket_percentile(buckets, 0.25) == 75
+    assert bucket_percentile(buckets, 0.9) == 114
+
+
+def test_bucket_percentile_uses_the_mean_of_the_open_last_bucket():
+    last = CALL_DURATION_BUCKETS[-1]
+    assert bucket_percentile([(0, 1, 5.0), (last, 2, 2 * last + 600)], 0.99) == last + 300
+
+
+def test_bucket_percentile_skips_empty_buckets_and_handles_no_calls():
+    assert bucket_percentile([], 0.5) is None
+    assert bucket_percentile([(0, 0, 0.0)], 0.5) is None
+    assert bucket_percentile([(0, 0, 0.0), (30, 4, 160.0)], 0.5) == 45
+
+
+def test_default_stats_range():
+    now = datetime(2024, 5, 3, 14, 37)
+    assert default_stats_range(now, "hour") == (datetime(2024, 5, 3), datetime(2024, 5, 3, 15))
+    assert default_stats_range(now, "day") == (datetime(2024, 4, 4), datetime(2024, 5, 4))
+
+
+@pytest.mark.asyncio
+async def test_finalizing_a_call_again_counts_it_once(db):
+    call_start = datetime.now().replace(microsecond=0) - timedelta(seconds=20)
+    call_id = await db.execute(calls.insert().values(call_sid="CA-finalize-test", call_start=call_start))
+    start, end = period_start(call_start, "hour"), period_start(call_start, "hour") + timedelta(hours=1)
+    before = (await get_call_stats(start, end))["calls"]
+
+    for _ in range(3):
+        await finalize_call(call_id)
+
+    stats = await get_call_stats(start, end)
+    assert stats["calls"] == before + 1
+    call = await db.fetch_one(calls.select().where(calls.c.id == call_id))
+    assert sum(bucket["calls"] for bucket in stats["duration_buckets"]) == stats["calls"]
+    assert call["call_duration"] >= 20
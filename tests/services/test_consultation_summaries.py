@@ -0,0 +1,98 @@
+from datetime import date
+import pytest
+from sqlalchemy import create_engine, select
+from db.migrations import backfill_consultation_summaries
+from db.models import calls, consultation_summaries, metadata, responses
+from db.queries import find_consultation_summaries_query
+from services.assistant_logic import save_consultation_summaries
+from utils.validators import ConsultationSummary
+
+SUMMARY = {
+    "full_name": " Ada Lovelace ", "date_of_birth": "1931-07-02", "phone_number": "07700 900456",
+    "reason_for_appointment": "Sprained wrist", "experienced_before": "Yes", "duration_of_symptoms": "two days",
+    "current_medication": ["Paracetamol", "Ibuprofen"], "known_allergies": "None", "additional_notes": "",
+}
+
+
+def test_summary_values_are_typed():
+    summary = ConsultationSummary(**SUMMARY).model_dump()
+    assert summary["full_name"] == "Ada Lovelace"
+    assert summary["date_of_birth"] == date(1931, 7, 2)
+    assert summary["phone_number"] == "+447700900456"
+    assert summary["experienced_before"] is True
+    assert summary["current_medication"] == "Paracetamol, Ibuprofen"
+    assert summary["additional_notes"] == ""
+
+
+@pytest.mark.parametrize("field, given, stored", [
+    ("date_of_birth", "2nd July 1931", None),
+    ("experienced_before", "not sure", None),
+    ("experienced_before", False, False),
+    ("phone_number", "ask my daughter", "ask my daughter"),
+    ("full_name", None, None),
+])
+def test_unexpected_values_are_kept_or_stored_as_null(field, given, stored):
+    assert ConsultationSummary(**{field: given}).model_dump()[field] == stored
+
+
+@pytest.mark.asyncio
+async def test_saved_summaries_are_found_by_each_index(db):
+    call_ids = [await db.execute(calls.insert().values(call_sid=f"CA-summaries-{n}")) for n in range(3)]
+    await save_consultation_summaries([
+        (call_ids[0], SUMMARY),
+        (call_ids[1], {**SUMMARY, "reason_for_appointment": "sprained ankle", "phone_number": "07700 900457"}),
+        (call_ids[2], {**SUMMARY, "reason_for_appointment": "Headache", "date_of_birth": "1931-07-03"}),
+    ])
+
+    async def found(**filters):
+        return sorted(row["call_id"] for row in await db.fetch_all(find_consultation_summaries_query(**filters)))
+
+    assert await found(date_of_birth=date(1931, 7, 2)) == call_ids[:2]
+    assert await found(phone_number="+447700900457") == [call_ids[1]]
+    assert await found(reason="SPRAINED") == call_ids[:2]
+    assert await found(reason="sprained w", date_of_birth=date(1931, 7, 2)) == [call_ids[0]]
+    assert await found(reason="sprained", limit=1) == [call_ids[1]]
+
+
+@pytest.mark.asyncio
+async def test_a_later_summary_for_a_call_replaces_the_first(db):
+    call_id = await db.execute(calls.insert().values(call_sid="CA-summaries-duplicate"))
+    other_id = await db.execute(calls.insert().values(call_sid="CA-summaries-other"))
+    long_name = "Augusta Ada King, Countess of Lovelace, née Byron, " * 3
+
+    await save_consultation_summaries([(call_id, SUMMARY)])
+    # Repeated in a later save and within one batch; the last one is kept
+    await save_consultation_summaries([
+        (call_id, {**SUMMARY, "reason_for_appointment": "Swollen wrist"}),
+        (other_id, SUMMARY),
+        (call_id, {**SUMMARY, "full_name": long_name, "reason_for_appointment": "Broken wrist"}),
+    ])
+
+    rows = await db.fetch_all(select(consultation_summaries).where(consultation_summaries.c.call_id == call_id))
+    assert [(row["full_name"], row["reason_for_appointment"]) for row in rows] == [(long_name.strip(), "Broken wrist")]
+    assert await db.fetch_val(
+        select(consultation_summaries.c.id).where(consultation_summaries.c.call_id == other_id)
+    ) is not None
+    await save_consultation_summaries([])
+
+
+def test_backfill_copies_legacy_final_summaries_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        metadata.create_all(connection)
+        connection.execute(calls.insert(), [{"id": n, "call_sid": f"CA-legacy-{n}"} for n in (1, 2, 3)])
+        connection.execute(responses.insert(), [
+            {"call_id": 1, "question": "Final Summary", "response": repr(SUMMARY)},
+            {"call_id": 1, "question": "Final Summary", "response": repr(SUMMARY)},
+            {"call_id": 2, "question": "Final Summary", "response": "{not a dict"},
+            {"call_id": 3, "question": "What is your full name?", "response": "Ada"},
+        ])
+        backfill_consultation_summaries(connection)
+        backfill_consultation_summaries(connection)
+
+        rows = connection.execute(select(consultation_summaries)).mappings().all()
+    engine.dispose()
+
+    assert [row["call_id"] for row in rows] == [1]
+    assert rows[0]["phone_number"] == "+447700900456"
+    assert rows[0]["date_of_birth"] == date(1931, 7, 2)
@@ -0,0 +1,116 @@
+from services.conversation_state import MAX_SUMMARY_VALUE_CHARS, ConversationState, estimate_tokens
+from services.grok_handler import FORM_FIELDS
+
+SYSTEM_PROMPT = "You are an NHS Consultation Assistant."
+
+
+def consultation(turns: list, recent_messages: int = 6) -> ConversationState:
+    """
+    State after the given (question, answer) turns, with answer None for an unanswered question.
+    """
+    state = ConversationState(FORM_FIELDS, recent_messages)
+    for question, answer in turns:
+        state.record_assistant(question)
+        if answer is not None:
+            state.record_user(answer)
+    return state
+
+
+def test_short_conversation_is_sent_whole_without_a_summary():
+    state = consultation([("What is your full name?", "Jane Doe"), ("What is your date of birth?", None)])
+    messages = state.build_messages(SYSTEM_PROMPT)
+    assert messages == [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "assistant", "content": "What is your full name?"},
+        {"role": "user", "content": "Jane Doe"},
+        {"role": "assistant", "content": "What is your date of birth?"},
+    ]
+
+
+def test_long_conversation_sends_a_summary_and_only_recent_turns():
+    state = consultation([
+        ("What is your full name?", "Jane Doe"),
+        ("What is your date of birth?", "14 March 1982"),
+        ("What is your phone number?", "07700 900123"),
+        ("What is your reason for booking this appointment?", "A persistent cough"),
+        ("Have you experienced these symptoms before?", None),
+    ], recent_messages=4)
+    messages = state.build_messages(SYSTEM_PROMPT)
+
+    assert messages[0] == {"role": "system", "content": SYSTEM_PROMPT}
+    summary = messages[1]["content"]
+    assert messages[1]["role"] == "system"
+    assert "- full_name: Jane Doe" in summary
+    assert "- date_of_birth: 14 March 1982" in summary
+    assert "- reason_for_appointment: A persistent cough" in summary
+    assert "Still missing: experienced_before, duration_of_symptoms" in summary
+    assert "Currently asking about: experienced_before" in summary
+
+    assert [message["content"] for message in messages[2:]] == [
+        "07700 900123",
+        "What is your reason for booking this appointment?",
+        "A persistent cough",
+        "Have you experienced these symptoms before?",
+    ]
+
+
+def test_request_size_stays_flat_as_the_call_grows():
+    state = ConversationState(FORM_FIELDS, recent_messages=4)
+    sizes = []
+    for turn in range(30):
+        state.record_assistant("Could you tell me a little more about that?")
+        state.record_user(f"Some more detail, part {turn}.")
+        sizes.append(len(state.build_messages(SYSTEM_PROMPT)))
+    assert len(state.transcript) == 60
+    assert set(sizes[2:]) == {6}
+
+
+def test_answers_are_filed_under_the_field_being_asked():
+    state = consultation([
+        ("Thanks. Are you currently taking any medication?", "Ibuprofen"),
+        ("Any others?", "and an inhaler"),
+    ])
+    # A clarification keeps the pending field, so the follow-up answer is appended
+    assert state.slots["current_medication"] == "Ibuprofen and an inhaler"
+    assert state.pending_field == "current_medication"
+
+
+def test_the_latest_cue_in_a_message_wins():
+    state = ConversationState(FORM_FIELDS)
+    assert state.detect_field("Thanks for your name. What is your date of birth?") == "date_of_birth"
+    assert state.detect_field("Could you repeat that?") is None
+
+
+def test_summary_truncates_long_answers():
+    state = consultation([("Is there anything else you would like the doctor to know?", "x" * 500)])
+    state.recent.clear()
+    summary = state.build_messages(SYSTEM_PROMPT)[1]["content"]
+    assert f"- additional_notes: {'x' * MAX_SUMMARY_VALUE_CHARS}..." in summary
+    assert "x" * (MAX_SUMMARY_VALUE_CHARS + 1) not in summary
+
+
+def test_round_trips_through_a_dict():
+    state = consultation([("What is your full name?", "Jane Doe"), ("What is your date of birth?", None)], 3)
+    state.record_usage(120, 15)
+    restored = ConversationState.from_dict(state.to_dict())
+    assert restored.build_messages(SYSTEM_PROMPT) == state.build_messages(SYSTEM_PROMPT)
+    assert restored.slots == state.slots
+    assert restored.pending_field == "date_of_birth"
+    assert restored.recent.maxlen == 3
+    assert restored.total_tokens() == {"prompt_tokens": 120, "completion_tokens": 15}
+
+
+def test_from_history_replays_plain_messages():
+    history = [
+        {"role": "assistant", "content": "What is your full name?"},
+        {"role": "user", "content": "Jane Doe"},
+    ]
+    state = ConversationState.from_history(FORM_FIELDS, history)
+    assert state.slots["full_name"] == "Jane Doe"
+    assert state.build_messages(SYSTEM_PROMPT)[1:] == history
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+import pytest
+import services.grok_handler as grok_handler
+from services.conversation_state import ConversationState
+from services.grok_handler import FORM_FIELDS, stream_response
+from utils.metrics import STAGE_LATENCY
+
+
+@pytest.mark.asyncio
+async def test_streamed_replies_are_timed_with_time_to_first_token(monkeypatch):
+    async def acreate(**kwargs):
+        assert kwargs["stream"] is True
+
+        async def chunks():
+            for token in ("What is ", "your date of birth?"):
+                yield {"choices": [{"delta": {"content": token}}]}
+        return chunks()
+
+    monkeypatch.setattr(grok_handler, "_openai", SimpleNamespace(ChatCompletion=SimpleNamespace(acreate=acreate)))
+    streams = STAGE_LATENCY.snapshot("stream_response", "grok")[2]
+    first_tokens = STAGE_LATENCY.snapshot("stream_response_first_token", "grok")[2]
+    state = ConversationState.from_history(FORM_FIELDS, [])
+
+    tokens = [token async for token in stream_response("Jane Smith", state)]
+
+    assert "".join(tokens) == "What is your date of birth?"
+    assert STAGE_LATENCY.snapshot("stream_response", "grok")[2] == streams + 1
+    assert STAGE_LATENCY.snapshot("stream_response_first_token", "grok")[2] == first_tokens + 1
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import pytest
+import services.assistant_logic as assistant_logic
+import services.media_stream as media_stream
+from db.models import calls, consultation_summaries
+from services.media_stream import MediaStreamSession
+from services.session_store import session_store
+
+SUMMARY = {
+    "full_name": "Grace Hopper", "date_of_birth": "1906-12-09", "phone_number": "07700 900789",
+    "reason_for_appointment": "Back pain", "experienced_before": "no", "duration_of_symptoms": "a week",
+    "current_medication": "None", "known_allergies": "None", "additional_notes": "",
+}
+
+
+class FakeResponder:
+    """
+    Stands in for respond_to_transcript: returns a streamed reply that completes on `finish`.
+    """
+
+    def __init__(self):
+        self.replies = []
+
+    async def __call__(self, call_sid, text, conversation, speculation=None):
+        reply = asyncio.get_running_loop().create_future()
+        self.replies.append((text, conversation, reply))
+        return reply
+
+    def finish(self, index: int, text: str):
+        _, conversation, reply = self.replies[index]
+        conversation.record_user(self.replies[index][0])
+        conversation.record_assistant(text)
+        reply.set_result(text)
+
+
+async def wait_for_replies(responder, count: int, timeout: float = 2.0):
+    """
+    Wait until `count` turns have asked for a reply; database writes between turns take a
+    variable amount of time.
+    """
+    deadline = asyncio.get_running_loop().time() + timeout
+    while len(responder.replies) < count:
+        assert asyncio.get_running_loop().time() < deadline, f"only {len(responder.replies)} replies requested"
+        await asyncio.sleep(0.005)
+
+
+@pytest.fixture
+def responder(monkeypatch):
+    fake = FakeResponder()
+    monkeypatch.setattr(media_stream, "respond_to_transcript", fake)
+    sheets_rows = []
+
+    async def enqueue(**row):
+        sheets_rows.append(row)
+    monkeypatch.setattr(assistant_logic.sheets_writer, "enqueue", enqueue)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_real_time_turn_saves_the_summary_and_finalizes_the_call(db, responder):
+    call_id = await db.execute(calls.insert().values(call_sid="CA-media-1"))
+    session = MediaStreamSession()
+    session.call_sid = "CA-media-1"
+
+    turn = asyncio.ensure_future(session._answer("That's everything."))
+    await asyncio.sleep(0.01)
+    responder.finish(0, json.dumps(SUMMARY))
+    await turn
+
+    summary = await db.fetch_one(consultation_summaries.select().where(consultation_summaries.c.call_id == call_id))
+    assert summary["full_name"] == "Grace Hopper"
+    call = await db.fetch_one(calls.select().where(calls.c.id == call_id))
+    assert call["call_end"] is not None
+    saved = await session_store.get("conversation:CA-media-1")
+    assert saved["transcript"][-1]["content"] == json.dumps(SUMMARY)
+
+
+@pytest.mark.asyncio
+async def test_media_stream_without_a_webhook_request_starts_its_call(db, responder):
+    session = MediaStreamSession()
+    session.call_sid = "CA-media-2"
+
+    turn = asyncio.ensure_future(session._answer("Jane Doe"))
+    await asyncio.sleep(0.01)
+    responder.finish(0, "What is your date of birth?")
+    await turn
+
+    call = await db.fetch_one(calls.select().where(calls.c.call_sid == "CA-media-2"))
+    assert call["id"] == session.call_id
+    assert call["call_end"] is not None
+
+
+@pytest.mark.asyncio
+async def test_turns_wait_for_the_previous_reply_to_finish(db, responder):
+    await db.execute(calls.insert().values(call_sid="CA-media-3"))
+    session = MediaStreamSession()
+    session.call_sid = "CA-media-3"
+
+    session._start_turn("Jane Doe")
+    session._start_turn("14 March 1982")
+    try:
+        await wait_for_replies(responder, 1)
+        await asyncio.sleep(0.01)
+        # The first reply is still streaming, so the second turn has not started
+        assert [text for text, _, _ in responder.replies] == ["Jane Doe"]
+
+        responder.finish(0, "What is your date of birth?")
+        await wait_for_replies(responder, 2)
+        # The state the second turn started from, and the one saved, include the first reply
+        saved = await session_store.get("conversation:CA-media-3")
+        assert saved["transcript"][-1]["content"] == "What is your date of birth?"
+
+        responder.finish(1, "What is your phone number?")
+        await asyncio.gather(*session._turns)
+    finally:
+        # Turns left running would outlive the fake responder
+        for turn in session._turns:
+            turn.cancel()
+        await asyncio.gather(*session._turns, return_exceptions=True)
+
+    saved = await session_store.get("conversation:CA-media-3")
+    assert [message["content"] for message in saved["transcript"]] == [
+        "Jane Doe", "What is your date of birth?", "14 March 1982", "What is your phone number?",
+    ]
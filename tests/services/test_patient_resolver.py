@@ -0,0 +1,83 @@
+import pytest
+from db.models import patients
+from services.patient_resolver import PatientResolver, _index_key
+from utils.validators import normalize_phone_number
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("07700 900123", "+447700900123"),
+    ("+44 (0)7700 900123", "+447700900123"),
+    ("0044 7700-900123", "+447700900123"),
+    ("+1 (415) 555-0100", "+14155550100"),
+    ("12345", None),
+    ("+44 7700 900123 456789", None),
+    ("", None),
+])
+def test_normalize_phone_number(raw, expected):
+    assert normalize_phone_number(raw) == expected
+
+
+def test_index_key_is_the_same_for_every_spelling():
+    assert _index_key("07700 900123") == _index_key("+447700900123") == 447700900123
+    assert _index_key("not a number") is None
+
+
+async def add_patient(db, phone_number: str) -> int:
+    return await db.execute(patients.insert().values(phone_number=phone_number, name="Test Patient"))
+
+
+@pytest.mark.asyncio
+async def test_loaded_numbers_resolve_in_any_spelling(db):
+    patient_id = await add_patient(db, "07700 900301")
+    resolver = PatientResolver()
+    await resolver.load()
+
+    assert await resolver.resolve("+447700900301") == patient_id
+    assert await resolver.resolve("0044 7700 900301") == patient_id
+    assert resolver.hits == 2 and resolver.misses == 0
+
+
+@pytest.mark.asyncio
+async def test_patients_added_after_the_load_are_found_in_the_database(db):
+    resolver = PatientResolver()
+    await resolver.load()
+    patient_id = await add_patient(db, "+447700900302")
+
+    assert await resolver.resolve("07700 900302") == patient_id
+    # The database answer is kept in the index
+    assert await resolver.resolve("07700 900302") == patient_id
+    assert resolver.misses == 1 and resolver.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_callers_are_remembered_until_invalidated(db):
+    resolver = PatientResolver(negative_ttl=60)
+    await resolver.load()
+
+    assert await resolver.resolve("+447700900303") is None
+    patient_id = await add_patient(db, "+447700900303")
+    assert await resolver.resolve("+447700900303") is None
+
+    resolver.invalidate("+447700900303")
+    assert await resolver.resolve("+447700900303") == patient_id
+
+
+@pytest.mark.asyncio
+async def test_remember_overrides_the_negative_cache(db):
+    resolver = PatientResolver()
+    assert await resolver.resolve("+447700900304") is None
+    resolver.remember("07700 900304", 42)
+    assert await resolver.resolve("+447700900304") == 42
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_the_refresh_task(db):
+    resolver = PatientResolver(ttl=3600)
+    await resolver.start()
+    task = resolver._refresh_task
+
+    await resolver.stop()
+
+    assert task.cancelled()
+    assert resolver._refresh_task is None
+    await resolver.stop()
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from sqlalchemy.sql import select
+from db.models import call_sessions
+from services.session_store import DatabaseSessionStore, MemorySessionStore, create_session_store
+
+
+@pytest.mark.asyncio
+async def test_memory_store_round_trip_and_delete():
+    store = MemorySessionStore()
+    await store.set("conversation:CA1", {"slots": {"full_name": "Jane"}})
+    assert await store.get("conversation:CA1") == {"slots": {"full_name": "Jane"}}
+    await store.delete("conversation:CA1")
+    assert await store.get("conversation:CA1") is None
+
+
+@pytest.mark.asyncio
+async def test_memory_store_expires_keys_on_get():
+    store = MemorySessionStore()
+    await store.set("conversation:CA1", {"turn": 1}, ttl=-1)
+    assert await store.get("conversation:CA1") is None
+    assert "conversation:CA1" not in store._data
+
+
+@pytest.mark.asyncio
+async def test_memory_store_purges_expired_keys_on_set():
+    store = MemorySessionStore(purge_interval=0)
+    await store.set("conversation:CA1", {"turn": 1}, ttl=-1)
+    await store.set("conversation:CA2", {"turn": 1}, ttl=-1)
+    await store.set("conversation:CA3", {"turn": 1})
+    assert set(store._data) == {"conversation:CA3"}
+
+
+@pytest.mark.asyncio
+async def test_memory_store_waits_for_the_purge_interval():
+    store = MemorySessionStore(purge_interval=3600)
+    await store.set("conversation:CA1", {"turn": 1}, ttl=-1)
+    await store.set("conversation:CA2", {"turn": 1})
+    assert set(store._data) == {"conversation:CA1", "conversation:CA2"}
+    await store.purge()
+    assert set(store._data) == {"conversation:CA2"}
+
+
+def test_create_session_store_rejects_unknown_kinds():
+    assert isinstance(create_session_store("memory"), MemorySessionStore)
+    with pytest.raises(ValueError):
+        create_session_store("redis")
+
+
+async def _stored_keys(db):
+    return {row["key"] for row in await db.fetch_all(select(call_sessions.c.key))}
+
+
+@pytest.mark.asyncio
+async def test_database_store_round_trip_upsert_and_delete(db):
+    store = DatabaseSessionStore(db)
+    await store.set("conversation:CA10", {"turn": 1})
+    await store.set("conversation:CA10", {"turn": 2})
+    assert await store.get("conversation:CA10") == {"turn": 2}
+    await store.delete("conversation:CA10")
+    assert await store.get("conversation:CA10") is None
+
+
+@pytest.mark.asyncio
+async def test_database_store_drops_expired_rows(db):
+    store = DatabaseSessionStore(db)
+    await store.set("conversation:CA11", {"turn": 1}, ttl=-1)
+    await store.set("conversation:CA12", {"turn": 1}, ttl=-1)
+    await store.set("conversation:CA13", {"turn": 1})
+
+    assert await store.get("conversation:CA11") is None
+    assert "conversation:CA11" not in await _stored_keys(db)
+
+    await store.purge()
+    keys = await _stored_keys(db)
+    assert "conversation:CA12" not in keys
+    assert "conversation:CA13" in keys
+    await store.delete("conversation:CA13")
+
+
+@pytest.mark.asyncio
+async def test_database_store_purges_in_the_background(db):
+    store = DatabaseSessionStore(db, purge_interval=0.01)
+    await store.start()
+    try:
+        await store.set("conversation:CA14", {"turn": 1}, ttl=-1)
+        for _ in range(100):
+            if "conversation:CA14" not in await _stored_keys(db):
+                break
+            await asyncio.sleep(0.01)
+        assert "conversation:CA14" not in await _stored_keys(db)
+    finally:
+        await store.stop()
+    assert store._purge_task is None
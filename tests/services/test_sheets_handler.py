@@ -0,0 +1,111 @@
+import asyncio
+import json
+import time
+import gspread
+import pytest
+import requests
+import services.sheets_handler as sheets_handler
+from services.sheets_handler import SheetsWriter, _is_retryable
+
+
+def api_error(status: int) -> gspread.exceptions.APIError:
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({"error": {"code": status, "message": "error", "status": "ERROR"}}).encode()
+    return gspread.exceptions.APIError(response)
+
+
+class FakeWorksheet:
+    """
+    Records appended batches; fails with the queued errors first.
+    """
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.batches = []
+        self.attempts = 0
+
+    def append_rows(self, rows):
+        self.attempts += 1
+        if self.errors:
+            error = self.errors.pop(0)
+            raise error() if callable(error) else error
+        self.batches.append(rows)
+
+
+@pytest.fixture
+def worksheet(monkeypatch):
+    sheet = FakeWorksheet()
+    monkeypatch.setattr(sheets_handler, "get_worksheet", lambda: sheet)
+    monkeypatch.setattr(sheets_handler, "SHEETS_RETRY_BASE_DELAY", 0.01)
+    return sheet
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (api_error(429), True),
+    (api_error(503), True),
+    (api_error(400), False),
+    (requests.exceptions.ConnectionError("connection reset"), True),
+    (requests.exceptions.ReadTimeout("read timed out"), True),
+    (TimeoutError(), True),
+    (ValueError("bad row"), False),
+])
+def test_retryable_errors(error, retryable):
+    assert _is_retryable(error) is retryable
+
+
+@pytest.mark.asyncio
+async def test_rows_are_written_in_batches_and_drained_on_stop(worksheet):
+    writer = SheetsWriter(batch_size=2, flush_interval=5)
+    await writer.start()
+    for call_id in range(5):
+        await writer.enqueue(call_id, "Question", "Answer")
+
+    await writer.stop()
+
+    assert [len(batch) for batch in worksheet.batches] == [2, 2, 1]
+    assert writer.rows_written == 5 and writer.rows_dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_dropped_connections_are_retried(worksheet):
+    worksheet.errors = [requests.exceptions.ConnectionError("connection reset"), api_error(503)]
+    writer = SheetsWriter(batch_size=1, flush_interval=5)
+    await writer.start()
+    await writer.enqueue(1, "Question", "Answer")
+
+    await writer.stop()
+
+    assert worksheet.attempts == 3
+    assert writer.rows_written == 1 and writer.rows_dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_other_errors_drop_the_batch_at_once(worksheet):
+    worksheet.errors = [api_error(400)]
+    writer = SheetsWriter(batch_size=1, flush_interval=5)
+    await writer.start()
+    await writer.enqueue(1, "Question", "Answer")
+
+    await writer.stop()
+
+    assert worksheet.attempts == 1 and writer.rows_dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_during_shutdown_stop_at_the_drain_timeout(worksheet, monkeypatch):
+    monkeypatch.setattr(sheets_handler, "SHEETS_RETRY_BASE_DELAY", 0.1)
+    monkeypatch.setattr(sheets_handler, "SHEETS_DRAIN_TIMEOUT", 0.15)
+    worksheet.errors = [lambda: api_error(503)] * 10
+    writer = SheetsWriter(batch_size=1, flush_interval=5)
+    await writer.start()
+    await writer.enqueue(1, "Question", "Answer")
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    await writer.stop()
+
+    # The retry due 0.1s after the first attempt fits in the drain; the next, 0.2s later, does not
+    assert time.perf_counter() - started < 0.5
+    assert worksheet.attempts == 2
+    assert writer.rows_dropped == 1 and writer.rows_written == 0
@@ -0,0 +1,92 @@
+import pytest
+from services.slot_extraction import (
+    SLOT_FAST_PATH_MIN_CONFIDENCE, extract_slot, parse_date_of_birth, parse_no_allergies, parse_phone_number,
+    parse_yes_no,
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("14/03/1982", "1982-03-14"),
+    ("1982-03-14", "1982-03-14"),
+    ("14th March 1982", "1982-03-14"),
+    ("March 14th 1982", "1982-03-14"),
+    ("the fourteenth of march nineteen eighty two", "1982-03-14"),
+    ("twenty first of june two thousand five", "2005-06-21"),
+    ("04/04/1982", "1982-04-04"),
+])
+def test_parse_date_of_birth_confident(text, expected):
+    match = parse_date_of_birth(text)
+    assert match.value == expected
+    assert match.confidence >= SLOT_FAST_PATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", ["03/04/1982", "14/03/82"])
+def test_parse_date_of_birth_ambiguous_goes_to_grok(text):
+    match = parse_date_of_birth(text)
+    assert match is not None
+    assert match.confidence < SLOT_FAST_PATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", ["31/02/1982", "I'm not sure", "may I ask why", "one hundred and five"])
+def test_parse_date_of_birth_rejects(text):
+    assert parse_date_of_birth(text) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("07700 900123", "+447700900123"),
+    ("+44 7700 900123", "+447700900123"),
+    ("oh seven seven double oh nine oh oh one two three", "+447700900123"),
+])
+def test_parse_phone_number_confident(text, expected):
+    match = parse_phone_number(text)
+    assert match.value == expected
+    assert match.confidence >= SLOT_FAST_PATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", ["seven hundred", "oh seven seven twenty", "I don't have one"])
+def test_parse_phone_number_rejects(text):
+    assert parse_phone_number(text) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Yes", "yes"),
+    ("yeah I have", "yes"),
+    ("No, I haven't had this before", "no"),
+    ("never", "no"),
+    ("I have", "yes"),
+])
+def test_parse_yes_no(text, expected):
+    assert parse_yes_no(text).value == expected
+
+
+@pytest.mark.parametrize("text", [
+    "maybe", "I'm not sure", "yes but only once", "no, well actually yes",
+    "it happened a few times last year when I was travelling for work abroad",
+])
+def test_parse_yes_no_rejects(text):
+    assert parse_yes_no(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "No", "none at all", "No, I don't have any allergies", "I have no known allergies",
+    "not allergic to anything", "nope", "No I don’t", "no thank you",
+])
+def test_parse_no_allergies(text):
+    match = parse_no_allergies(text)
+    assert match.value == "None"
+    assert match.confidence >= SLOT_FAST_PATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", [
+    "nope, penicillin", "No. Penicillin.", "no idea", "I don't know", "not that I know of",
+    "none except hay fever", "yes, penicillin", "no allergies apart from nuts", "penicillin",
+])
+def test_parse_no_allergies_rejects_anything_but_a_plain_no(text):
+    assert parse_no_allergies(text) is None
+
+
+def test_extract_slot_uses_the_confidence_threshold():
+    assert extract_slot("date_of_birth", "14/03/1982").value == "1982-03-14"
+    assert extract_slot("date_of_birth", "03/04/1982") is None
+    assert extract_slot("known_allergies", "nope, penicillin") is None
+    assert extract_slot("full_name", "Jane Smith") is None
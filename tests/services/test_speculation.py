@@ -0,0 +1,204 @@
+import asyncio
+import pytest
+import pytest_asyncio
+import services.media_stream as media_stream
+import services.speculation as speculation_module
+from services.grok_handler import new_conversation
+from services.media_stream import MediaStreamSession
+from services.speculation import SPECULATIONS, Speculation, transcript_key
+
+
+class FakeGrok:
+    """
+    Stands in for the Grok calls: records each request and replies once `release` is set.
+    """
+
+    def __init__(self, reply: str = "Thank you. What is your date of birth?"):
+        self.reply = reply
+        self.requests = []
+        self.release = asyncio.Event()
+
+    async def stream_response(self, text, state):
+        self.requests.append(text)
+        state.record_user(text)
+        words = self.reply.split(" ")
+        yield words[0]
+        await self.release.wait()
+        for word in words[1:]:
+            yield " " + word
+        state.record_assistant(self.reply)
+
+    async def process_response(self, text, state):
+        self.requests.append(text)
+        state.record_user(text)
+        await self.release.wait()
+        state.record_assistant(self.reply)
+        return self.reply, state
+
+
+@pytest.fixture
+def grok(monkeypatch):
+    fake = FakeGrok()
+    monkeypatch.setattr(speculation_module, "stream_response", fake.stream_response)
+    monkeypatch.setattr(speculation_module, "process_response", fake.process_response)
+    return fake
+
+
+async def _collect(tokens) -> str:
+    return "".join([token async for token in tokens])
+
+
+def test_transcript_key_ignores_case_and_punctuation():
+    assert transcript_key("Jane Doe.") == transcript_key("jane,  doe")
+    assert transcript_key("I don't know") == "i don't know"
+
+
+@pytest.mark.asyncio
+async def test_matching_final_transcript_reuses_the_buffered_reply(grok):
+    conversation = new_conversation()
+    speculation = Speculation("jane doe", conversation, streaming=True)
+    await asyncio.sleep(0)
+
+    assert speculation.matches("Jane Doe.", conversation)
+    hits = SPECULATIONS.value("hit")
+    assert speculation.take() >= 0
+    assert SPECULATIONS.value("hit") == hits + 1
+
+    grok.release.set()
+    assert await _collect(speculation.tokens()) == grok.reply
+    assert grok.requests == ["jane doe"]
+    # The turn adopts the speculation's copy of the state; the original is untouched
+    assert speculation.state.transcript[-1]["content"] == grok.reply
+    assert conversation.transcript == []
+
+
+@pytest.mark.asyncio
+async def test_tokens_replay_what_arrived_before_the_final_transcript(grok):
+    speculation = Speculation("jane doe", new_conversation(), streaming=True)
+    await asyncio.sleep(0)
+    assert speculation._tokens == ["Thank"]
+
+    collected = asyncio.ensure_future(_collect(speculation.tokens()))
+    await asyncio.sleep(0)
+    grok.release.set()
+    assert await collected == grok.reply
+
+
+@pytest.mark.asyncio
+async def test_different_words_do_not_match(grok):
+    conversation = new_conversation()
+    speculation = Speculation("jane", conversation, streaming=True)
+    assert not speculation.matches("Jane Doe", conversation)
+
+    misses = SPECULATIONS.value("miss")
+    speculation.discard()
+    await asyncio.sleep(0)
+    assert SPECULATIONS.value("miss") == misses + 1
+    assert speculation.failed
+
+
+@pytest.mark.asyncio
+async def test_a_turn_finished_since_the_copy_invalidates_it(grok):
+    conversation = new_conversation()
+    speculation = Speculation("jane doe", conversation, streaming=True)
+    conversation.record_assistant("What is your full name?")
+    assert not speculation.matches("jane doe", conversation)
+    speculation.discard()
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_failed_requests_do_not_match(grok, monkeypatch):
+    async def failing(text, state):
+        raise ConnectionError("Grok unavailable")
+        yield
+
+    monkeypatch.setattr(speculation_module, "stream_response", failing)
+    conversation = new_conversation()
+    speculation = Speculation("jane doe", conversation, streaming=True)
+    await asyncio.sleep(0)
+    assert speculation.failed
+    assert not speculation.matches("jane doe", conversation)
+    with pytest.raises(ConnectionError):
+        await _collect(speculation.tokens())
+
+
+@pytest.mark.asyncio
+async def test_non_streaming_result(grok):
+    speculation = Speculation("jane doe", new_conversation(), streaming=False)
+    grok.release.set()
+    assert await speculation.result() == grok.reply
+    assert speculation.first_output is not None
+
+
+@pytest_asyncio.fixture
+async def session(grok, monkeypatch):
+    monkeypatch.setattr(media_stream, "STREAMING_TTS_ENABLED", True)
+    session = MediaStreamSession()
+    session.speculative = True
+    yield session
+    session._abandon_speculation()
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_session_speculates_once_a_partial_is_stable(session, grok):
+    session._speculate("jane")
+    session._speculate("jane")
+    # Too short to be worth a request
+    assert session._speculation is None
+
+    session._speculate("jane doe")
+    assert session._speculation is None
+    session._speculate("Jane Doe")
+    assert session._speculation is not None
+    first = session._speculation
+
+    # The same words again keep the running request
+    session._speculate("jane doe")
+    assert session._speculation is first
+    assert session.speculations == 1
+
+
+@pytest.mark.asyncio
+async def test_session_claims_a_matching_speculation(session, grok):
+    session._speculate("jane doe")
+    session._speculate("jane doe")
+    speculation = session._speculation
+
+    assert session._claim_speculation("Jane Doe.") is speculation
+    assert session.conversation is speculation.state
+    assert session.speculation_hits == 1
+    assert session._speculation is None
+
+    grok.release.set()
+    assert await _collect(speculation.tokens()) == grok.reply
+
+
+@pytest.mark.asyncio
+async def test_session_cancels_a_speculation_the_final_transcript_changed(session, grok):
+    session._speculate("jane doe")
+    session._speculate("jane doe")
+    speculation = session._speculation
+    conversation = session.conversation
+
+    assert session._claim_speculation("Jane Doe-Smith") is None
+    await asyncio.sleep(0)
+    assert speculation.failed
+    assert session.conversation is conversation
+    assert session.speculation_hits == 0
+
+
+@pytest.mark.asyncio
+async def test_session_replaces_a_speculation_when_the_partial_changes(session, grok):
+    session._speculate("jane doe")
+    session._speculate("jane doe")
+    first = session._speculation
+    await asyncio.sleep(0)
+
+    session._speculate("jane doe smith")
+    session._speculate("jane doe smith")
+    await asyncio.sleep(0)
+    assert session._speculation is not first
+    assert first.failed
+    assert grok.requests == ["jane doe", "jane doe smith"]
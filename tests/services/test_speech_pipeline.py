@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from services.speech_pipeline import _collect_reply, split_sentences
+
+
+async def _tokens(*parts, error=None):
+    for part in parts:
+        yield part
+    if error:
+        raise error
+
+
+async def _drain(tokens):
+    return [token async for token in tokens]
+
+
+@pytest.mark.asyncio
+async def test_collect_reply_resolves_with_the_streamed_text():
+    reply = asyncio.get_running_loop().create_future()
+    tokens = await _drain(_collect_reply(_tokens("What is ", "your date ", "of birth?"), reply))
+    assert tokens == ["What is ", "your date ", "of birth?"]
+    assert reply.result() == "What is your date of birth?"
+
+
+@pytest.mark.asyncio
+async def test_collect_reply_resolves_none_when_the_stream_fails():
+    reply = asyncio.get_running_loop().create_future()
+    with pytest.raises(RuntimeError):
+        await _drain(_collect_reply(_tokens("Partial", error=RuntimeError("grok down")), reply))
+    assert reply.result() is None
+
+
+@pytest.mark.asyncio
+async def test_collect_reply_resolves_none_when_abandoned():
+    reply = asyncio.get_running_loop().create_future()
+    tokens = _collect_reply(_tokens("One. ", "Two."), reply)
+    await tokens.__anext__()
+    await tokens.aclose()
+    assert reply.result() is None
+
+
+@pytest.mark.asyncio
+async def test_split_sentences_merges_short_sentences():
+    sentences = await _drain(split_sentences(_tokens("Hi. ", "What is your full name, please? ", "Thanks"), 20))
+    assert sentences == ["Hi. What is your full name, please?", "Thanks"]
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+import types
+import pytest
+import services.tts_cache as tts_cache_module
+from services.tts_cache import TTSCache, cache_key, normalize_text
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Wall clock for the cache that tests move forward by hand.
+    """
+    clock = types.SimpleNamespace(now=time.time())
+    monkeypatch.setattr(tts_cache_module, "time", types.SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def _age(cache: TTSCache, key: str, seconds: float):
+    path = cache._path(key)
+    mtime = os.path.getmtime(path) - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_cache_key_ignores_case_and_spacing_but_not_voice():
+    assert normalize_text("  What is your\n date  of birth? ") == "what is your date of birth?"
+    assert cache_key("What is  your name?", "default") == cache_key("what is your name?", "default")
+    assert cache_key("What is your name?", "default") != cache_key("What is your name?", "other")
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    assert cache.get("a" * 64) is None
+    cache.put("a" * 64, b"https://audio/1.mp3")
+    assert cache.get("a" * 64) == b"https://audio/1.mp3"
+
+    # A new worker reads the disk tier and then serves from memory
+    restarted = TTSCache(str(tmp_path))
+    assert restarted.get("a" * 64) == b"https://audio/1.mp3"
+    assert restarted.get("a" * 64) == b"https://audio/1.mp3"
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.stats()["memory_hits"] == 1
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=10)
+    cache.put("a" * 64, b"1234")
+    cache.put("b" * 64, b"1234")
+    cache.get("a" * 64)
+    cache.put("c" * 64, b"1234")
+    assert set(cache._entries) == {"a" * 64, "c" * 64}
+    assert cache.stats()["bytes"] == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_in_memory(tmp_path, clock):
+    cache = TTSCache(str(tmp_path), ttl=60)
+    cache.put("a" * 64, b"https://audio/1.mp3")
+    clock.now += 30
+    assert cache.get("a" * 64) == b"https://audio/1.mp3"
+
+    # Age the file too, as the memory entry falls back to it
+    clock.now += 31
+    _age(cache, "a" * 64, 61)
+    assert cache.get("a" * 64) is None
+    assert cache.stats()["bytes"] == 0
+    assert cache.stats()["expired"] == 1
+
+
+def test_expired_disk_entries_are_misses_and_removed(tmp_path):
+    cache = TTSCache(str(tmp_path), ttl=60)
+    cache.put("a" * 64, b"https://audio/1.mp3")
+    _age(cache, "a" * 64, 120)
+
+    restarted = TTSCache(str(tmp_path), ttl=60)
+    assert restarted.get("a" * 64) is None
+    assert not os.path.exists(cache._path("a" * 64))
+    assert restarted.stats()["misses"] == 1
+
+
+def test_disk_tier_removes_the_oldest_entries_over_its_limit(tmp_path):
+    cache = TTSCache(str(tmp_path), disk_max_bytes=100)
+    keys = [str(index) * 64 for index in range(5)]
+    for age, key in enumerate(keys):
+        cache.put(key, b"x" * 30)
+        _age(cache, key, 100 - age)
+
+    # Each write past 100 bytes removes the oldest files until at most 90 are left
+    remaining = [key for key in keys if os.path.exists(cache._path(key))]
+    assert remaining == keys[2:]
+    assert cache.stats()["disk_bytes"] == 90
+    assert cache.stats()["disk_evictions"] == 2
+
+
+def test_disk_limit_counts_files_written_before_start(tmp_path):
+    TTSCache(str(tmp_path)).put("a" * 64, b"x" * 60)
+    _age(TTSCache(str(tmp_path)), "a" * 64, 10)
+
+    cache = TTSCache(str(tmp_path), disk_max_bytes=100)
+    cache.put("b" * 64, b"x" * 60)
+    assert not os.path.exists(cache._path("a" * 64))
+    assert os.path.exists(cache._path("b" * 64))
+    assert cache.stats()["disk_evictions"] == 1
+
+
+def test_rewriting_an_entry_does_not_count_it_twice(tmp_path):
+    cache = TTSCache(str(tmp_path), disk_max_bytes=100)
+    for _ in range(5):
+        cache.put("a" * 64, b"x" * 40)
+    assert cache.stats()["disk_bytes"] == 40
+    assert cache.stats()["disk_evictions"] == 0
+
+
+def test_the_disk_tier_is_measured_once_and_then_tracked(tmp_path, monkeypatch):
+    cache = TTSCache(str(tmp_path), disk_max_bytes=1000)
+    walks = []
+    disk_files = cache._disk_files
+    monkeypatch.setattr(cache, "_disk_files", lambda: walks.append(1) or disk_files())
+    for index in range(5):
+        cache.put(str(index) * 64, b"x" * 10)
+    assert len(walks) == 1
+    assert cache.stats()["disk_bytes"] == 50
+
+
+@pytest.mark.asyncio
+async def test_async_access_reads_and_writes_the_disk_off_the_event_loop(tmp_path, monkeypatch):
+    cache = TTSCache(str(tmp_path))
+    disk_threads = []
+    for name in ("_read_disk", "_write_disk"):
+        method = getattr(cache, name)
+        monkeypatch.setattr(cache, name, lambda *args, method=method: disk_threads.append(
+            threading.current_thread()) or method(*args))
+
+    assert await cache.get_async("a" * 64) is None
+    await cache.put_async("a" * 64, b"https://audio/1.mp3")
+    assert await cache.get_async("a" * 64) == b"https://audio/1.mp3"
+    assert await TTSCache(str(tmp_path)).get_async("a" * 64) == b"https://audio/1.mp3"
+
+    # The memory hit never touched the disk
+    assert len(disk_threads) == 2
+    assert threading.main_thread() not in disk_threads
+    assert cache.stats()["misses"] == 1 and cache.stats()["memory_hits"] == 1
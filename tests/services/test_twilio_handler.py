@@ -0,0 +1,86 @@
+import asyncio
+import json
+import logging
+import pytest
+from twilio.base.exceptions import TwilioRestException
+from twilio.http.async_http_client import AsyncHttpClient
+from twilio.http.response import Response
+from services.twilio_handler import TwilioAdapter
+
+
+class FakeHttpClient(AsyncHttpClient):
+    """
+    Twilio transport answering every request locally and recording the concurrency it saw.
+    """
+
+    def __init__(self, status: int = 201):
+        super().__init__(logging.getLogger("twilio.test"), True)
+        self.status = status
+        self.urls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.closed = 0
+
+    async def request(self, method, url, params=None, data=None, headers=None, auth=None,
+                      timeout=None, allow_redirects=False):
+        self.urls.append(url)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if self.status >= 400:
+            return Response(self.status, json.dumps({"code": 20500, "message": "Fake error", "status": self.status}))
+        prefix = "SM" if url.endswith("Messages.json") else "CA"
+        return Response(self.status, json.dumps({"sid": f"{prefix}{len(self.urls):032d}", "status": "queued"}))
+
+    async def close(self):
+        self.closed += 1
+
+
+@pytest.mark.asyncio
+async def test_the_pooled_session_is_reused_until_closed():
+    adapter = TwilioAdapter("AC" + "0" * 32, "token")
+    client = adapter.get_client()
+    session = adapter._http_client.session
+
+    assert adapter.get_client() is client
+    assert adapter._http_client.session is session
+
+    await adapter.close()
+    assert session.closed
+    assert adapter._client is None
+
+    # A request after close opens a new session
+    assert adapter.get_client() is not client
+    assert adapter._http_client.session is not session
+    await adapter.close()
+
+
+@pytest.mark.asyncio
+async def test_requests_share_one_transport_and_respect_the_concurrency_cap():
+    http_client = FakeHttpClient()
+    adapter = TwilioAdapter("AC" + "0" * 32, "token", max_concurrency=2, http_client=http_client)
+
+    messages = await asyncio.gather(*(adapter.send_sms(f"+4477009001{n:02d}", "Reminder", "+15005550006") for n in range(5)))
+    await adapter.update_call("CA" + "1" * 32, "<Response/>")
+
+    assert [message.sid[:2] for message in messages] == ["SM"] * 5
+    assert len(http_client.urls) == 6 and http_client.urls[-1].endswith(f"Calls/CA{'1' * 32}.json")
+    assert http_client.max_in_flight == 2
+    assert adapter.stats() == {"requests": 6, "failures": 0}
+
+    await adapter.close()
+    assert http_client.closed == 1
+    await adapter.close()
+    assert http_client.closed == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_requests_are_counted_and_raised():
+    adapter = TwilioAdapter("AC" + "0" * 32, "token", http_client=FakeHttpClient(status=500))
+
+    with pytest.raises(TwilioRestException):
+        await adapter.send_sms("+447700900100", "Reminder", "+15005550006")
+
+    assert adapter.stats() == {"requests": 1, "failures": 1}
+    await adapter.close()
@@ -0,0 +1,101 @@
+import json
+import os
+import wave
+import numpy as np
+import pytest
+from services.vad import (
+    END_OF_UTTERANCE, SPEECH_START, VAD_FRAME_MS, VAD_HANGOVER_MS, Endpointer, detect_utterances, frame_features,
+    read_wav,
+)
+
+# WAV recordings with labelled utterances; regenerate with python -m tests.fixtures.vad.generate
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures", "vad")
+FIXTURES = sorted(name[:-4] for name in os.listdir(FIXTURE_DIR) if name.endswith(".wav"))
+
+# Boundaries fall on frame edges, so allow one frame either way
+TOLERANCE = VAD_FRAME_MS / 1000 + 1e-6
+
+
+def load_fixture(name: str) -> tuple:
+    samples, sample_rate = read_wav(os.path.join(FIXTURE_DIR, f"{name}.wav"))
+    with open(os.path.join(FIXTURE_DIR, f"{name}.json")) as f:
+        labels = [tuple(label) for label in json.load(f)]
+    return samples, sample_rate, labels
+
+
+def test_fixtures_are_present():
+    assert {"two_answers_8k", "hiss_8k", "wideband_16k", "cut_off_8k", "line_noise_8k"} <= set(FIXTURES)
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_utterances_match_the_labels(name):
+    samples, sample_rate, labels = load_fixture(name)
+    duration = len(samples) / sample_rate
+    detected = detect_utterances(samples, sample_rate)
+
+    assert len(detected) == len(labels)
+    for (start, end), (label_start, label_end) in zip(detected, labels):
+        assert start == pytest.approx(label_start, abs=TOLERANCE)
+        # End of utterance is reported a hangover after the speech stops, or when the stream ends
+        expected_end = min(label_end + VAD_HANGOVER_MS / 1000, duration)
+        assert end == pytest.approx(expected_end, abs=TOLERANCE)
+
+
+@pytest.mark.parametrize("chunk", [160, 77, 1000])
+def test_streamed_chunks_give_the_same_events_as_one_batch(chunk):
+    samples, sample_rate, _ = load_fixture("two_answers_8k")
+    whole = Endpointer(sample_rate)
+    expected = whole.process(samples) + whole.flush()
+
+    streamed = Endpointer(sample_rate)
+    events = []
+    for offset in range(0, len(samples), chunk):
+        events += streamed.process(samples[offset:offset + chunk])
+    events += streamed.flush()
+
+    assert events == expected
+    assert [event.kind for event in events] == [SPEECH_START, END_OF_UTTERANCE] * 2
+
+
+def test_short_hangover_splits_at_a_breath():
+    samples, sample_rate, _ = load_fixture("two_answers_8k")
+    # The second answer has a 200 ms pause inside it
+    assert len(detect_utterances(samples, sample_rate, hangover_ms=100)) == 3
+    assert len(detect_utterances(samples, sample_rate, hangover_ms=300)) == 2
+
+
+def test_flush_closes_only_an_open_utterance():
+    samples, sample_rate, _ = load_fixture("cut_off_8k")
+    endpointer = Endpointer(sample_rate)
+    assert [event.kind for event in endpointer.process(samples)] == [SPEECH_START]
+    assert endpointer.in_speech
+
+    (event,) = endpointer.flush()
+    assert event.kind == END_OF_UTTERANCE
+    assert event.time == pytest.approx(len(samples) / sample_rate, abs=TOLERANCE)
+    assert endpointer.flush() == []
+
+
+def test_frame_features():
+    t = np.arange(1600) / 8000
+    tone = (16384 * np.sin(2 * np.pi * 400 * t)).astype(np.int16)
+    energy_db, zcr = frame_features(tone, 160)
+    assert len(energy_db) == 10
+    # A half-scale sine is 6 dB below full scale and 3 dB more for its crest factor
+    assert energy_db == pytest.approx(np.full(10, -9.03), abs=0.05)
+    assert zcr == pytest.approx(np.full(10, 2 * 400 / 8000), abs=0.01)
+
+    silence_db, _ = frame_features(np.zeros(330, dtype=np.int16), 160)
+    assert len(silence_db) == 2
+    assert (silence_db < -90).all()
+
+
+def test_read_wav_rejects_stereo(tmp_path):
+    path = str(tmp_path / "stereo.wav")
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(b"\x00\x00" * 320)
+    with pytest.raises(ValueError):
+        read_wav(path)
@@ -1,17 +1,266 @@
 # File: utils/database.py
-from databases import Database
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from sqlalchemy import exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from loguru import logger
+from config import settings
 from db.init_db import init_db  # Import the async init_db function
-import os
+from utils.metrics import registry, track_stage
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Initialize database instance with connection pool limits
-database = Database(
-    DATABASE_URL,
-    min_size=1,  # Minimum number of connections
-    max_size=5,  # Maximum number of connections (adjust based on your plan)
+# Connections kept open by the pool; the defaults for each APP_ENV are in config/
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", settings.DATABASE_POOL_SIZE))
+# Extra connections opened while every pooled one is in use, closed again when returned
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", settings.DATABASE_MAX_OVERFLOW))
+# Seconds a query waits for a free connection before it fails
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", settings.DATABASE_POOL_TIMEOUT))
+# Compiled statements kept per engine; entries are keyed by the statement's shape, not its values
+DATABASE_STATEMENT_CACHE_SIZE = int(os.getenv("DATABASE_STATEMENT_CACHE_SIZE", "500"))
+
+# Connection waits are milliseconds when the pool has room and approach the timeout when it does not
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+POOL_CHECKOUTS = registry.counter(
+    "db_pool_checkouts_total", "Connections taken from the database pool.", ("database",)
+)
+POOL_TIMEOUTS = registry.counter(
+    "db_pool_timeouts_total", "Queries that gave up waiting for a pooled connection.", ("database",)
+)
+POOL_WAIT_SECONDS = registry.histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection.", ("database",), buckets=POOL_WAIT_BUCKETS
 )
+POOL_WAITING = registry.gauge(
+    "db_pool_waiting", "Queries currently waiting for a pooled connection.", ("database",)
+)
+POOL_IN_USE = registry.gauge(
+    "db_pool_in_use", "Pooled connections currently checked out.", ("database",)
+)
+STATEMENT_CACHE = registry.counter(
+    "db_statement_cache_total", "Statements executed, by compiled-statement cache result.", ("database", "result")
+)
+
+# Drivers used when DATABASE_URL names only the database
+ASYNC_DRIVERS = {"postgres": "postgresql+asyncpg", "postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(url: str):
+    """
+    Parse a database URL, switching plain postgresql:// and sqlite:// URLs to their async drivers.
+    """
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername))
+
+
+class InstrumentedDatabase:
+    """
+    Async database on one SQLAlchemy engine, used for queries and by init_db for the schema.
+
+    Statements compiled once are reused from the engine's cache, so the query builders in
+    db/queries.py compile each statement shape once per process. Query latency, pool
+    checkouts, waits for a free connection and cache hits are recorded for /metrics.
+
+    Statements run on their own pooled connection, except inside `transaction()`, where
+    every statement of the task uses the transaction's connection.
+
+    The engine is created on first use, so modules holding the instance import without a
+    configured URL (benchmarks and tools that never touch the database).
+    """
+
+    def __init__(self, url: str, name: str = "main", pool_size: int = DATABASE_POOL_SIZE,
+                 max_overflow: int = DATABASE_MAX_OVERFLOW, pool_timeout: float = DATABASE_POOL_TIMEOUT):
+        self._url = url
+        self.name = name
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self._engine = None
+        self._statement_engine = None
+        self._transaction = ContextVar(f"{name}_transaction", default=None)
+        self.is_connected = False
+        self.checkouts = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def url(self):
+        if not self._url:
+            raise RuntimeError(f"No URL configured for the {self.name} database; set DATABASE_URL")
+        return async_url(self._url)
+
+    @property
+    def dialect(self) -> str:
+        return self.url.get_backend_name()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._create_engine()
+        return self._engine
+
+    def _create_engine(self):
+        url = self.url
+        # In-memory SQLite is a single shared connection and has no pool to size; file SQLite
+        # would open a connection per query without the explicit pool class
+        pool_options = {} if self.dialect == "sqlite" and url.database in (None, "", ":memory:") else {
+            "poolclass": AsyncAdaptedQueuePool,
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_pre_ping": self.dialect != "sqlite",
+        }
+        self._engine = create_async_engine(url, query_cache_size=DATABASE_STATEMENT_CACHE_SIZE, **pool_options)
+        # PostgreSQL statements outside a transaction autocommit, saving a BEGIN and COMMIT each;
+        # SQLite's driver only opens a transaction for writes, which execute() commits
+        self._statement_engine = (
+            self._engine.execution_options(isolation_level="AUTOCOMMIT") if self.dialect == "postgresql" else self._engine
+        )
+
+    async def connect(self):
+        """
+        Open a first connection, so a bad URL or unreachable server fails at startup.
+        """
+        async with self._checkout(self.engine):
+            pass
+        self.is_connected = True
+
+    async def disconnect(self):
+        if self._engine is not None:
+            await self._engine.dispose()
+        self.is_connected = False
+
+    @asynccontextmanager
+    async def _checkout(self, engine):
+        connection = engine.connect()
+        self.waiting += 1
+        POOL_WAITING.set(self.name, value=self.waiting)
+        started = time.perf_counter()
+        try:
+            await connection.start()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            POOL_TIMEOUTS.inc(self.name)
+            logger.warning(f"No {self.name} database connection free after {self.pool_timeout}s: {self.stats()}")
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.waiting -= 1
+            POOL_WAITING.set(self.name, value=self.waiting)
+            POOL_WAIT_SECONDS.observe(waited, self.name)
+
+        self.checkouts += 1
+        self.wait_seconds += waited
+        POOL_CHECKOUTS.inc(self.name)
+        POOL_IN_USE.inc(self.name)
+        try:
+            yield connection
+        finally:
+            POOL_IN_USE.dec(self.name)
+            await connection.close()
+
+    def _current_transaction(self):
+        current = self._transaction.get()
+        # Tasks started inside a transaction inherit the context but not the connection
+        if current is not None and current[0] is asyncio.current_task():
+            return current[1]
+        return None
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Run the statements inside the block in one transaction, committed when the block
+        exits and rolled back if it raises. Nested blocks use savepoints.
+        """
+        connection = self._current_transaction()
+        if connection is not None:
+            async with connection.begin_nested():
+                yield
+            return
+
+        async with self._checkout(self.engine) as connection:
+            async with connection.begin():
+                token = self._transaction.set((asyncio.current_task(), connection))
+                try:
+                    yield
+                finally:
+                    self._transaction.reset(token)
+
+    async def _execute(self, query, values=None):
+        if isinstance(query, str):
+            query = text(query)
+        connection = self._current_transaction()
+        if connection is not None:
+            result = await connection.execute(query, values)
+        else:
+            if self._engine is None:
+                self._create_engine()
+            async with self._checkout(self._statement_engine) as connection:
+                result = await connection.execute(query, values)
+                if self.dialect != "postgresql":
+                    await connection.commit()
+
+        cache_hit = getattr(result.context, "cache_hit", None)
+        STATEMENT_CACHE.inc(
+            self.name, "hit" if cache_hit is CACHE_HIT else "miss" if cache_hit is CACHE_MISS else "uncached"
+        )
+        return result
+
+    async def fetch_one(self, query, values: dict = None):
+        with track_stage("db_fetch_one", "database"):
+            return (await self._execute(query, values)).mappings().first()
+
+    async def fetch_all(self, query, values: dict = None):
+        with track_stage("db_fetch_all", "database"):
+            return (await self._execute(query, values)).mappings().all()
+
+    async def fetch_val(self, query, values: dict = None, column: int = 0):
+        with track_stage("db_fetch_val", "database"):
+            row = (await self._execute(query, values)).first()
+            return None if row is None else row[column]
+
+    async def execute(self, query, values: dict = None):
+        """
+        Run a statement; returns the new row's primary key for a single-row insert.
+        """
+        with track_stage("db_execute", "database"):
+            result = await self._execute(query, values)
+            if not result.context.isinsert:
+                return None
+            try:
+                return result.inserted_primary_key[0]
+            except exc.InvalidRequestError:
+                # Multi-row inserts have no single primary key
+                return None
+
+    async def execute_many(self, query, values: list):
+        with track_stage("db_execute_many", "database"):
+            await self._execute(query, values)
+
+    def stats(self) -> dict:
+        pool = self.engine.pool
+        return {
+            "pool_size": pool.size() if hasattr(pool, "size") else 1,
+            "in_use": pool.checkedout() if hasattr(pool, "checkedout") else 0,
+            "overflow": max(0, pool.overflow()) if hasattr(pool, "overflow") else 0,
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "mean_wait_ms": round(self.wait_seconds / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+            "timeouts": self.timeouts,
+            "statement_cache": {
+                result: STATEMENT_CACHE.value(self.name, result) for result in ("hit", "miss", "uncached")
+            },
+        }
+
+
+database = InstrumentedDatabase(DATABASE_URL)
 
 async def initialize_database():
     """
@@ -20,8 +269,8 @@ async def initialize_database():
     try:
         logger.info("Connecting to the database...")
         await database.connect()
-        await init_db()  # Await the async init_db function
-        logger.info("Database connection and initialization completed.")
+        await init_db(database.engine)  # Create and migrate the schema on the shared engine
+        logger.info(f"Database connection and initialization completed: {database.stats()}")
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
         raise
@@ -31,6 +280,7 @@ async def close_database():
     Close the database connection.
     """
     try:
+        logger.info(f"Database pool stats: {database.stats()}")
         await database.disconnect()
         logger.info("Database connection closed.")
     except Exception as e:
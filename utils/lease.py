@@ -0,0 +1,78 @@
+# File: utils/lease.py
+# Database leases, so a job runs in only one worker process at a time
+
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy.sql import or_, select
+from utils.database import database
+from db.models import leases
+from loguru import logger
+
+# A lease not renewed for this many seconds can be taken over by another worker
+LEASE_TTL_SECONDS = float(os.getenv("LEASE_TTL_SECONDS", "30"))
+
+# Identifies this process in the leases table
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class DatabaseLease:
+    """
+    A named lease in the leases table, held by at most one worker until it expires.
+
+    acquire() takes a free or expired lease, or renews one this worker already holds;
+    holders renew well within `ttl` (see renew_interval). Each step is a single UPDATE or
+    INSERT, and the holder is read back afterwards, so two workers racing for the lease
+    cannot both believe they won. Works on any database the app supports, SQLite included.
+    """
+
+    def __init__(self, name: str, ttl: float = LEASE_TTL_SECONDS, holder: str = WORKER_ID, db=database):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl)
+        self.holder = holder
+        self.database = db
+        self.held = False
+
+    @property
+    def renew_interval(self) -> float:
+        return self.ttl.total_seconds() / 3
+
+    async def acquire(self) -> bool:
+        """
+        Take or renew the lease; returns whether this worker now holds it.
+        """
+        now = datetime.now()
+        await self.database.execute(
+            leases.update()
+            .where(leases.c.name == self.name)
+            .where(or_(leases.c.holder == self.holder, leases.c.expires_at < now))
+            .values(holder=self.holder, expires_at=now + self.ttl)
+        )
+        holder = await self.database.fetch_val(select(leases.c.holder).where(leases.c.name == self.name))
+        if holder is None:
+            try:
+                await self.database.execute(
+                    leases.insert().values(name=self.name, holder=self.holder, expires_at=now + self.ttl)
+                )
+                holder = self.holder
+            except Exception:
+                # Another worker created the row first
+                holder = await self.database.fetch_val(select(leases.c.holder).where(leases.c.name == self.name))
+
+        held = holder == self.holder
+        if held != self.held:
+            logger.info(f"Lease {self.name!r} {'acquired' if held else 'lost'} by {self.holder}")
+        self.held = held
+        return held
+
+    async def release(self):
+        """
+        Give the lease up so another worker can take it straight away.
+        """
+        await self.database.execute(
+            leases.delete().where(leases.c.name == self.name).where(leases.c.holder == self.holder)
+        )
+        if self.held:
+            logger.info(f"Lease {self.name!r} released by {self.holder}")
+        self.held = False
@@ -0,0 +1,257 @@
+# File: utils/metrics.py
+# In-process metrics rendered in the Prometheus text exposition format
+
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import aclosing, contextmanager
+from loguru import logger
+
+# Latency buckets in seconds, from fast database queries up to slow provider calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stages slower than this are logged with their call id; call ids are not used as labels
+# because every call would create new time series
+SLOW_STAGE_SECONDS = float(os.getenv("METRICS_SLOW_STAGE_SECONDS", "2"))
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Metric:
+    """
+    Base for labelled metrics; one series per distinct combination of label values.
+    """
+    kind = ""
+
+    def __init__(self, name: str, description: str, label_names: tuple = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def samples(self) -> dict:
+        """
+        Current value of every series, keyed by label values.
+        """
+        with self._lock:
+            return dict(self._series)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            for labels, value in series:
+                lines.extend(self._render_series(labels, value))
+        return lines
+
+    def _render_series(self, labels: tuple, value) -> list:
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._series.get(labels, 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._series[labels] = value
+
+    def value(self, *labels) -> float:
+        return self._series.get(labels, 0)
+
+
+class Histogram(Metric):
+    """
+    Fixed-bucket histogram; observing is a binary search and three additions.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then sum
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def snapshot(self, *labels) -> tuple:
+        """
+        Return (cumulative bucket counts, sum, count) for one series.
+        """
+        counts, total = self._series.get(labels, [[0] * (len(self.buckets) + 1), 0.0])
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total, running
+
+    def _render_series(self, labels: tuple, value) -> list:
+        counts, total = value
+        lines, running = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            bucket_labels = _format_labels(self.label_names, labels, 'le="' + le + '"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {running}")
+        label_text = _format_labels(self.label_names, labels)
+        lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+        lines.append(f"{self.name}_count{label_text} {running}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the app's metrics and renders them for the /metrics route.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str, label_names: tuple = ()) -> Counter:
+        return self._register(Counter(name, description, label_names))
+
+    def gauge(self, name: str, description: str, label_names: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, description, label_names))
+
+    def histogram(self, name: str, description: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, label_names, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_LATENCY = registry.histogram(
+    "consultation_stage_duration_seconds", "Time spent in each pipeline stage.", ("stage", "provider")
+)
+STAGE_IN_FLIGHT = registry.gauge(
+    "consultation_stage_in_flight", "Pipeline stage executions currently running.", ("stage", "provider")
+)
+STAGE_ERRORS = registry.counter(
+    "consultation_stage_errors_total", "Pipeline stage executions that failed.", ("stage", "provider")
+)
+
+
+@contextmanager
+def track_stage(stage: str, provider: str, call_id=None):
+    """
+    Time a block as one execution of `stage`, counting it in flight while it runs and
+    as an error if it raises.
+
+    Args:
+        stage (str): Pipeline stage name.
+        provider (str): Service the stage depends on (e.g. "grok", "elevenlabs", "database").
+        call_id: Optional call id or SID, included in the slow-stage log line.
+    """
+    STAGE_IN_FLIGHT.inc(stage, provider)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage, provider)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_IN_FLIGHT.dec(stage, provider)
+        STAGE_LATENCY.observe(elapsed, stage, provider)
+        if elapsed >= SLOW_STAGE_SECONDS:
+            logger.warning(f"Slow {stage} ({provider}) took {elapsed:.2f}s" + (f" on call {call_id}" if call_id else ""))
+
+
+def record_stage_error(stage: str, provider: str):
+    """
+    Count a failure that the stage handled itself instead of raising.
+    """
+    STAGE_ERRORS.inc(stage, provider)
+
+
+def instrumented(stage: str, provider: str, call_id_arg: str = None, first_item_stage: str = None):
+    """
+    Decorator applying track_stage() to every call of a sync or async function, or to the
+    whole iteration of an async generator.
+
+    Args:
+        call_id_arg (str): Name of the parameter holding the call id, if any.
+        first_item_stage (str): For async generators, a stage under which the time until
+            the first item is also recorded (e.g. time to first token of a streamed reply).
+    """
+    def decorator(func):
+        position = None
+        if call_id_arg:
+            position = list(inspect.signature(func).parameters).index(call_id_arg)
+
+        def call_id_of(args, kwargs):
+            if position is None:
+                return None
+            return kwargs.get(call_id_arg, args[position] if len(args) > position else None)
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                first = True
+                with track_stage(stage, provider, call_id_of(args, kwargs)):
+                    async with aclosing(func(*args, **kwargs)) as items:
+                        async for item in items:
+                            if first and first_item_stage:
+                                STAGE_LATENCY.observe(time.perf_counter() - started, first_item_stage, provider)
+                            first = False
+                            yield item
+        elif inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with track_stage(stage, provider, call_id_of(args, kwargs)):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with track_stage(stage, provider, call_id_of(args, kwargs)):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,131 @@
+import asyncio
+import inspect
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+from loguru import logger
+from utils.metrics import registry
+
+# Warm provider clients (TTS cache, Twilio session, Google Sheets auth) in the background
+# after boot; off, each client is created by the first request that needs it
+SERVICE_WARMUP = os.getenv("SERVICE_WARMUP", "true").lower() == "true"
+
+SERVICE_START_SECONDS = registry.gauge(
+    "service_start_seconds", "Time each service took to start during boot.", ("service",)
+)
+SERVICE_WARM_UP_SECONDS = registry.gauge(
+    "service_warm_up_seconds", "Time each background warm-up took after boot.", ("service",)
+)
+
+
+@dataclass
+class Service:
+    """
+    Lifecycle hooks of one service; each may be a plain or async callable.
+    """
+    name: str
+    start: Optional[Callable] = None
+    stop: Optional[Callable] = None
+    warm_up: Optional[Callable] = None
+
+
+async def _call(hook: Callable):
+    result = hook()
+    if inspect.isawaitable(result):
+        await result
+
+
+class ServiceRegistry:
+    """
+    The app's long-lived services, started in registration order from app_lifespan and
+    stopped in reverse.
+
+    Provider clients are created on first use, so boot only does what the app needs to
+    accept a call. Warm-up hooks create those clients ahead of the first call in a
+    background task; boot does not wait for them and a failed warm-up is only logged.
+    """
+
+    def __init__(self):
+        self._services = []
+        self._warm_up_task = None
+        self.start_seconds = {}
+        self.warm_up_seconds = {}
+        self.warm_up_errors = {}
+
+    def register(self, name: str, start: Callable = None, stop: Callable = None, warm_up: Callable = None):
+        self._services.append(Service(name, start, stop, warm_up))
+
+    async def start(self, warm_up: bool = SERVICE_WARMUP):
+        """
+        Start every service in registration order. If one fails, those before it are
+        stopped again, in reverse, before the error is raised.
+        """
+        booted = time.perf_counter()
+        for index, service in enumerate(self._services):
+            if service.start is None:
+                continue
+            started = time.perf_counter()
+            try:
+                await _call(service.start)
+            except Exception as e:
+                logger.error(f"Failed to start {service.name}: {e}")
+                await self._stop_services(self._services[:index])
+                raise
+            self.start_seconds[service.name] = time.perf_counter() - started
+            SERVICE_START_SECONDS.set(service.name, value=self.start_seconds[service.name])
+        logger.info(f"Services started in {time.perf_counter() - booted:.3f}s: "
+                    + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.start_seconds.items()))
+
+        if warm_up and any(service.warm_up for service in self._services):
+            self._warm_up_task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self):
+        async def run(service: Service):
+            started = time.perf_counter()
+            try:
+                await _call(service.warm_up)
+            except Exception as e:
+                self.warm_up_errors[service.name] = str(e)
+                logger.warning(f"Warm-up of {service.name} failed; it will start on first use: {e}")
+            finally:
+                self.warm_up_seconds[service.name] = time.perf_counter() - started
+                SERVICE_WARM_UP_SECONDS.set(service.name, value=self.warm_up_seconds[service.name])
+
+        await asyncio.gather(*(run(service) for service in self._services if service.warm_up))
+        logger.info("Warm-up finished: " + ", ".join(
+            f"{name} {seconds:.3f}s" for name, seconds in self.warm_up_seconds.items()
+        ))
+
+    async def wait_warm(self):
+        """
+        Wait for the background warm-up, if one is running.
+        """
+        if self._warm_up_task is not None:
+            await asyncio.shield(self._warm_up_task)
+
+    async def stop(self):
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+            await asyncio.gather(self._warm_up_task, return_exceptions=True)
+            self._warm_up_task = None
+        await self._stop_services(self._services)
+
+    async def _stop_services(self, services: list):
+        for service in reversed(services):
+            if service.stop is None:
+                continue
+            try:
+                await _call(service.stop)
+            except Exception as e:
+                logger.error(f"Failed to stop {service.name}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "start_seconds": {name: round(seconds, 4) for name, seconds in self.start_seconds.items()},
+            "warm_up_seconds": {name: round(seconds, 4) for name, seconds in self.warm_up_seconds.items()},
+            "warm_up_errors": dict(self.warm_up_errors),
+        }
+
+
+service_registry = ServiceRegistry()
@@ -1,8 +1,116 @@
-from pydantic import BaseModel, Field
+import re
+from datetime import date
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, field_validator
+
+# Country code assumed for numbers dialled in national format (leading 0)
+DEFAULT_COUNTRY_CODE = "44"
 
 class StartCallRequest(BaseModel):
-    phone_number: str = Field(..., regex=r"^\d{10,15}$")
+    phone_number: str = Field(..., pattern=r"^\d{10,15}$")
 
 class ProcessResponseRequest(BaseModel):
     call_id: int
-    response_text: str
\ No newline at end of file
+    response_text: str
+
+def normalize_phone_number(phone_number: str, default_country_code: str = DEFAULT_COUNTRY_CODE):
+    """
+    Normalize a phone number to E.164, e.g. "07700 900123" -> "+447700900123".
+
+    Returns None if the input cannot be a valid E.164 number.
+    """
+    if not phone_number:
+        return None
+
+    # Drop the "(0)" trunk prefix written in numbers like +44 (0)7700 900123
+    cleaned = re.sub(r"[^\d+]", "", phone_number.replace("(0)", ""))
+    if cleaned.startswith("+"):
+        digits = cleaned[1:]
+    elif cleaned.startswith("00"):
+        digits = cleaned[2:]
+    elif cleaned.startswith("0"):
+        digits = default_country_code + cleaned[1:]
+    else:
+        digits = cleaned
+
+    if not digits.isdigit() or not 8 <= len(digits) <= 15:
+        return None
+    return f"+{digits}"
+
+class DateOfBirthAnswer(BaseModel):
+    date_of_birth: date
+
+    @field_validator("date_of_birth")
+    @classmethod
+    def plausible(cls, value: date) -> date:
+        if value > date.today() or value.year < 1900:
+            raise ValueError("date of birth out of range")
+        return value
+
+class PhoneNumberAnswer(BaseModel):
+    phone_number: str
+
+    @field_validator("phone_number")
+    @classmethod
+    def e164(cls, value: str) -> str:
+        normalized = normalize_phone_number(value)
+        if normalized is None:
+            raise ValueError("not a phone number")
+        return normalized
+
+class YesNoAnswer(BaseModel):
+    answer: Literal["yes", "no"]
+
+class NoAllergiesAnswer(BaseModel):
+    known_allergies: Literal["None"] = "None"
+
+class ConsultationSummary(BaseModel):
+    """
+    Grok's final JSON summary, typed for the consultation_summaries table.
+
+    Values Grok did not format as asked are kept where possible: a date of birth that is
+    not YYYY-MM-DD or an answer other than yes/no is stored as NULL, and a phone number
+    that cannot be normalized is stored as given.
+    """
+    full_name: Optional[str] = None
+    date_of_birth: Optional[date] = None
+    phone_number: Optional[str] = None
+    reason_for_appointment: Optional[str] = None
+    experienced_before: Optional[bool] = None
+    duration_of_symptoms: Optional[str] = None
+    current_medication: Optional[str] = None
+    known_allergies: Optional[str] = None
+    additional_notes: Optional[str] = None
+
+    @field_validator("full_name", "reason_for_appointment", "duration_of_symptoms",
+                     "current_medication", "known_allergies", "additional_notes", mode="before")
+    @classmethod
+    def text(cls, value):
+        if isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        return str(value).strip() if value is not None else None
+
+    @field_validator("date_of_birth", mode="before")
+    @classmethod
+    def iso_date(cls, value):
+        if isinstance(value, date) or value is None:
+            return value
+        try:
+            return date.fromisoformat(str(value).strip())
+        except ValueError:
+            return None
+
+    @field_validator("phone_number", mode="before")
+    @classmethod
+    def e164_or_given(cls, value):
+        if value is None:
+            return None
+        value = str(value).strip()
+        return normalize_phone_number(value) or value[:32] or None
+
+    @field_validator("experienced_before", mode="before")
+    @classmethod
+    def yes_no(cls, value):
+        if isinstance(value, bool) or value is None:
+            return value
+        return {"yes": True, "no": False}.get(str(value).strip().lower())